@@ -38,3 +38,6 @@ def configure_backends(options):
     if ("hash-password" in options
         and ast.literal_eval(options["hash-password"])):
         SHOULD_HASH_PASSWORD = options["hash-password"]
+
+    from keystone.backends import backendutils
+    backendutils.configure(options)
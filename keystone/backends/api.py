@@ -171,6 +171,67 @@ class BaseTokenAPI(object):
     def get_all(self):
         raise NotImplementedError
 
+    def get_validation_data(self, id):
+        """ Get a token with its user, tenants and role grants
+
+        Optional; backends that can't look all of these up at once should
+        leave this unimplemented.
+
+        :param id: string - the token id
+        :returns: tuple of (token, user, tenant, user_tenant, tenant_roles,
+            global_roles) or None if the token does not exist
+
+        """
+        raise NotImplementedError
+
+    def get_validation_data_for_all(self, ids):
+        """ Same as get_validation_data(), for many tokens at once
+
+        Optional, like get_validation_data().
+
+        :param ids: list of token ids
+        :returns: dict of token id to the tuple returned by
+            get_validation_data(), for the tokens that exist
+
+        """
+        raise NotImplementedError
+
+    def delete_expired(self, limit):
+        """ Delete up to limit tokens that have expired
+
+        Also forgets revocations of tokens that have expired, if the backend
+        keeps a revocation list.
+
+        :param limit: int - the maximum number of tokens to delete
+        :returns: the number of tokens deleted
+
+        """
+        raise NotImplementedError
+
+    def revoke(self, id):
+        """ Delete a token and add it to the revocation list
+
+        :param id: string - the token id
+        """
+        raise NotImplementedError
+
+    def revoke_for_user(self, user_id):
+        """ Delete all tokens of a user and add them to the revocation list
+
+        :param user_id: string - the user id
+        """
+        raise NotImplementedError
+
+    def get_revoked(self, since):
+        """ Get the tokens revoked after a revision of the revocation list
+
+        :param since: int - revision the caller already knows about
+        :returns: tuple of (current revision, list of revoked tokens (with
+            token_id and expires) that have not expired yet)
+
+        """
+        raise NotImplementedError
+
 
 class BaseTenantAPI(object):
     def __init__(self, *args, **kw):
@@ -1,8 +1,83 @@
+import logging
+import time
+
+from eventlet import semaphore
+from eventlet import tpool
+
 from keystone.backends import models
 import keystone.backends as backends
+from keystone.common import config
 # pylint: disable=E0611
 from passlib.hash import sha512_crypt as sc
 
+LOG = logging.getLogger(__name__)
+
+# Password hashing is slow on purpose. Run on the eventlet hub it stalls
+# every other green thread, so it can be handed to native threads instead::
+#
+#     password_hash_workers = 4
+#
+# At most that many hashes run at once; further callers queue for a free
+# worker. 0 (the default) hashes in the calling green thread. The threads come
+# from eventlet.tpool, which has EVENTLET_THREADPOOL_SIZE (20) of them.
+POOL = None
+
+
+class HashPool(object):
+    """ Runs password hashing in a bounded set of native threads """
+
+    def __init__(self, size):
+        self.size = size
+        self._slots = semaphore.Semaphore(size)
+        self.queued = 0
+        self.max_queued = 0
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def execute(self, func, *args):
+        """ Calls func(*args) in a native thread once a worker is free """
+        start = time.time()
+        if not self._slots.acquire(blocking=False):
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                self._slots.acquire()
+            finally:
+                self.queued -= 1
+        try:
+            wait = time.time() - start
+            self.calls += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            return tpool.execute(func, *args)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """ Returns the queue depth and wait times seen so far """
+        return {'size': self.size,
+                'queued': self.queued,
+                'max_queued': self.max_queued,
+                'calls': self.calls,
+                'total_wait': self.total_wait,
+                'max_wait': self.max_wait}
+
+
+def configure(options):
+    """ Reads password_hash_workers and starts or drops the hash pool """
+    global POOL
+    size = config.get_option(options, 'password_hash_workers', type='int',
+                             default=0)
+    POOL = HashPool(size) if size > 0 else None
+    LOG.debug("Password hash workers: %s" % size)
+
+
+def _run(func, *args):
+    if POOL is None:
+        return func(*args)
+    return POOL.execute(func, *args)
+
 
 def __get_hashed_password(password):
     if password is not None and len(password) > 0:
@@ -29,7 +104,7 @@ def check_password(raw_password, enc_password):
     if not raw_password:
         return False
     if backends.SHOULD_HASH_PASSWORD:
-        return sc.verify(raw_password, enc_password)
+        return _run(sc.verify, raw_password, enc_password)
     else:
         return enc_password == raw_password
 
@@ -47,4 +122,4 @@ def __make_password(raw_password):
 #Refer http://packages.python.org/passlib/lib/passlib.hash.sha512_crypt.html
 #Using the default properties as of now.Salt gets generated automatically.
 def __get_hexdigest(raw_password):
-    return sc.encrypt(raw_password)
+    return _run(sc.encrypt, raw_password)
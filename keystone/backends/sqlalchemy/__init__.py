@@ -159,6 +159,12 @@ def get_session():
     return _DRIVER.get_session()
 
 
+def dispose_engine():
+    """Closes the connections in the engine's pool"""
+    if _DRIVER and _DRIVER._engine is not None:  # pylint: disable=W0212
+        _DRIVER._engine.dispose()  # pylint: disable=W0212
+
+
 def unregister_models():
     global _DRIVER
     if _DRIVER:
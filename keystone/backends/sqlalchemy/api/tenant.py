@@ -103,12 +103,16 @@ class TenantAPI(api.BaseTenantAPI):
 
     @staticmethod
     def id_to_uid(id, session=None):
+        if id is None:
+            return None
         session = session or get_session()
         tenant = session.query(models.Tenant).filter_by(id=id).first()
         return tenant.uid if tenant else None
 
     @staticmethod
     def uid_to_id(uid, session=None):
+        if uid is None:
+            return None
         session = session or get_session()
         tenant = session.query(models.Tenant).filter_by(uid=uid).first()
         return tenant.id if tenant else None
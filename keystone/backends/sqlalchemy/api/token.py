@@ -15,9 +15,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from keystone.backends.sqlalchemy import get_session, models
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+
+from keystone.backends.sqlalchemy import get_session, models, aliased
 from keystone.backends import api
-from keystone.models import Token
+from keystone.models import Role, Tenant, Token, User
+
+# Maximum number of token ids per query, which keeps bulk lookups under the
+# bound parameter limits of the databases we support
+BATCH_SIZE = 500
 
 
 # pylint: disable=E1103,W0221
@@ -121,6 +129,187 @@ class TokenAPI(api.BaseTokenAPI):
 
         return TokenAPI.to_model_list(results)
 
+    def delete_expired(self, limit, session=None):
+        if not session:
+            session = get_session()
+
+        now = datetime.now()
+        with session.begin():
+            ids = [row[0] for row in session.query(models.Token.id).
+                   filter(models.Token.expires < now).limit(limit)]
+            if ids:
+                session.query(models.Token).\
+                    filter(models.Token.id.in_(ids)).\
+                    delete(synchronize_session=False)
+
+            # The newest revocation is kept, as its id is the revision of
+            # the revocation list
+            revision = session.query(func.max(models.RevokedToken.id)).\
+                scalar()
+            if revision is not None:
+                session.query(models.RevokedToken).\
+                    filter(models.RevokedToken.expires < now).\
+                    filter(models.RevokedToken.id < revision).\
+                    delete(synchronize_session=False)
+
+        return len(ids)
+
+    @staticmethod
+    def _revoke(token_refs, session):
+        for token_ref in token_refs:
+            revoked_ref = models.RevokedToken()
+            revoked_ref.update({'token_id': token_ref.id,
+                                'expires': token_ref.expires})
+            session.add(revoked_ref)
+            session.delete(token_ref)
+
+    def revoke(self, id, session=None):
+        if not session:
+            session = get_session()
+
+        with session.begin():
+            token_refs = session.query(models.Token).filter_by(id=id).all()
+            self._revoke(token_refs, session)
+
+    def revoke_for_user(self, user_id, session=None):
+        if not session:
+            session = get_session()
+
+        if hasattr(api.USER, 'uid_to_id'):
+            user_id = api.USER.uid_to_id(user_id)
+
+        with session.begin():
+            token_refs = session.query(models.Token).\
+                filter_by(user_id=user_id).all()
+            self._revoke(token_refs, session)
+
+    def get_revoked(self, since, session=None):
+        if not session:
+            session = get_session()
+
+        revision = session.query(func.max(models.RevokedToken.id)).scalar()
+        results = session.query(models.RevokedToken).\
+            filter(models.RevokedToken.id > since).\
+            filter(models.RevokedToken.expires > datetime.now()).\
+            order_by(models.RevokedToken.id).all()
+
+        return (revision or 0, results)
+
+    @staticmethod
+    def _joins_supported():
+        """ Joined lookups only work if users, tenants and roles are stored
+        in the same database as the tokens """
+        package = __name__.rsplit('.', 1)[0]
+        return all(type(ref).__module__.startswith(package)
+                   for ref in (api.USER, api.TENANT, api.ROLE))
+
+    def get_validation_data(self, id, session=None):
+        """ Returns everything needed to validate a token in one query
+
+        :param id: string - the token id
+        :returns: tuple of (token, user, tenant, user_tenant, tenant_roles,
+            global_roles) where tenant is the tenant the token is scoped to
+            and user_tenant is the user's default tenant (both may be None),
+            or None if the token does not exist
+        :raises: NotImplementedError if users, tenants or roles are not
+            stored in this backend
+        """
+        return self.get_validation_data_for_all([id], session).get(id)
+
+    def get_validation_data_for_all(self, ids, session=None):
+        """ Same as get_validation_data(), for many tokens at once
+
+        The tokens are looked up with one query per BATCH_SIZE ids.
+
+        :param ids: list of token ids
+        :returns: dict of token id to the tuple returned by
+            get_validation_data(), for the tokens that exist
+        """
+        if not TokenAPI._joins_supported():
+            raise NotImplementedError
+
+        if not session:
+            session = get_session()
+
+        ids = list(set(ids))
+        rows_by_token = {}
+        for i in range(0, len(ids), BATCH_SIZE):
+            for row in TokenAPI._query_validation_rows(session,
+                                                      ids[i:i + BATCH_SIZE]):
+                rows_by_token.setdefault(row[0].id, []).append(row)
+
+        return dict((token_id, TokenAPI._to_validation_data(rows))
+                    for token_id, rows in rows_by_token.iteritems())
+
+    @staticmethod
+    def _query_validation_rows(session, ids):
+        token = aliased(models.Token)
+        user = aliased(models.User)
+        tenant = aliased(models.Tenant)
+        user_tenant = aliased(models.Tenant)
+        grant = aliased(models.UserRoleAssociation)
+        role = aliased(models.Role)
+
+        return session.query(token, user, tenant, user_tenant, grant, role).\
+            outerjoin((user, user.id == token.user_id)).\
+            outerjoin((tenant, tenant.id == token.tenant_id)).\
+            outerjoin((user_tenant, user_tenant.id == user.tenant_id)).\
+            outerjoin((grant, and_(grant.user_id == user.id,
+                                   or_(grant.tenant_id == None,
+                                       grant.tenant_id == token.tenant_id)))).\
+            outerjoin((role, role.id == grant.role_id)).\
+            filter(token.id.in_(ids)).\
+            order_by(token.id, grant.id).\
+            all()
+
+    @staticmethod
+    def _to_validation_data(rows):
+        """ Builds the get_validation_data() tuple from the joined rows of
+        one token """
+        (token_ref, user_ref, tenant_ref, user_tenant_ref) = rows[0][:4]
+
+        dtenant = None
+        if tenant_ref:
+            dtenant = Tenant(id=tenant_ref.uid, name=tenant_ref.name,
+                             description=tenant_ref.desc,
+                             enabled=bool(tenant_ref.enabled))
+        duser_tenant = None
+        if user_tenant_ref:
+            duser_tenant = Tenant(id=user_tenant_ref.uid,
+                                  name=user_tenant_ref.name,
+                                  description=user_tenant_ref.desc,
+                                  enabled=bool(user_tenant_ref.enabled))
+        duser = None
+        if user_ref:
+            duser = User(id=user_ref.uid, password=user_ref.password,
+                         name=user_ref.name,
+                         tenant_id=duser_tenant.id if duser_tenant else None,
+                         email=user_ref.email,
+                         enabled=bool(user_ref.enabled))
+        dtoken = Token(id=token_ref.id,
+                       user_id=duser.id if duser else None,
+                       expires=token_ref.expires,
+                       tenant_id=dtenant.id if dtenant else None)
+
+        tenant_roles = []
+        global_roles = []
+        for row in rows:
+            (grant_ref, role_ref) = row[4:]
+            if grant_ref is None or role_ref is None:
+                continue
+            if grant_ref.tenant_id is None:
+                global_roles.append(Role(id=role_ref.id, name=role_ref.name,
+                                         description=role_ref.desc,
+                                         service_id=role_ref.service_id))
+            elif dtenant:
+                tenant_roles.append(Role(id=role_ref.id, name=role_ref.name,
+                                         description=role_ref.desc,
+                                         service_id=role_ref.service_id,
+                                         tenant_id=dtenant.id))
+
+        return (dtoken, duser, dtenant, duser_tenant, tenant_roles,
+                global_roles)
+
 
 def get():
     return TokenAPI()
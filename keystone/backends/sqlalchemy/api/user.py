@@ -108,12 +108,16 @@ class UserAPI(api.BaseUserAPI):
 
     @staticmethod
     def id_to_uid(id, session=None):
+        if id is None:
+            return None
         session = session or get_session()
         user = session.query(models.User).filter_by(id=id).first()
         return user.uid if user else None
 
     @staticmethod
     def uid_to_id(uid, session=None):
+        if uid is None:
+            return None
         session = session or get_session()
         user = session.query(models.User).filter_by(uid=uid).first()
         return user.id if user else None
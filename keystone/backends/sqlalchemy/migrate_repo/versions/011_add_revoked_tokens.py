@@ -0,0 +1,31 @@
+"""
+Adds the token revocation list
+"""
+# pylint: disable=C0103
+
+
+import sqlalchemy
+
+
+meta = sqlalchemy.MetaData()
+
+revoked_token = {}
+revoked_token['id'] = sqlalchemy.Column('id', sqlalchemy.Integer,
+        primary_key=True, autoincrement=True)
+revoked_token['token_id'] = sqlalchemy.Column('token_id',
+        sqlalchemy.String(255))
+revoked_token['expires'] = sqlalchemy.Column('expires', sqlalchemy.DateTime)
+revoked_tokens = sqlalchemy.Table('revoked_tokens', meta,
+        *revoked_token.values())
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    revoked_tokens.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    revoked_tokens.drop()
@@ -0,0 +1,67 @@
+"""
+Adds indexes on the columns looked up when authenticating and validating
+tokens
+"""
+# pylint: disable=C0103
+
+
+import sqlalchemy
+
+
+meta = sqlalchemy.MetaData()
+
+
+token = {}
+token['id'] = sqlalchemy.Column('id', sqlalchemy.String(255),
+    primary_key=True, unique=True)
+token['user_id'] = sqlalchemy.Column('user_id', sqlalchemy.Integer)
+token['tenant_id'] = sqlalchemy.Column('tenant_id', sqlalchemy.Integer)
+token['expires'] = sqlalchemy.Column('expires', sqlalchemy.DateTime)
+tokens = sqlalchemy.Table('tokens', meta, *token.values())
+
+credential = {}
+credential['id'] = sqlalchemy.Column('id', sqlalchemy.Integer,
+    primary_key=True, autoincrement=True)
+credential['key'] = sqlalchemy.Column('key', sqlalchemy.String(255))
+credentials = sqlalchemy.Table('credentials', meta, *credential.values())
+
+user_role = {}
+user_role['id'] = sqlalchemy.Column('id', sqlalchemy.Integer,
+    primary_key=True)
+user_role['user_id'] = sqlalchemy.Column('user_id', sqlalchemy.Integer)
+user_role['tenant_id'] = sqlalchemy.Column('tenant_id', sqlalchemy.Integer)
+user_roles = sqlalchemy.Table('user_roles', meta, *user_role.values())
+
+endpoint = {}
+endpoint['id'] = sqlalchemy.Column('id', sqlalchemy.Integer,
+    primary_key=True)
+endpoint['tenant_id'] = sqlalchemy.Column('tenant_id', sqlalchemy.Integer)
+endpoints = sqlalchemy.Table('endpoints', meta, *endpoint.values())
+
+
+# endpoints.endpoint_template_id already leads the unique index on
+# (endpoint_template_id, tenant_id), and user_roles.user_id the one on
+# (user_id, role_id, tenant_id)
+indexes = [
+    sqlalchemy.Index('ix_tokens_user_id_tenant_id_expires',
+        token['user_id'], token['tenant_id'], token['expires']),
+    sqlalchemy.Index('ix_tokens_expires', token['expires']),
+    sqlalchemy.Index('ix_credentials_key', credential['key']),
+    sqlalchemy.Index('ix_user_roles_user_id_tenant_id',
+        user_role['user_id'], user_role['tenant_id']),
+    sqlalchemy.Index('ix_endpoints_tenant_id', endpoint['tenant_id']),
+]
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for index in indexes:
+        index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for index in indexes:
+        index.drop(migrate_engine)
@@ -15,7 +15,7 @@
 # limitations under the License.
 
 from sqlalchemy import Column, String, Integer, ForeignKey, \
-    UniqueConstraint, Boolean, DateTime
+    UniqueConstraint, Boolean, DateTime, Index
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, object_mapper
@@ -90,7 +90,9 @@ class UserRoleAssociation(Base, KeystoneBase):
     user_id = Column(Integer, ForeignKey('users.id'))
     role_id = Column(Integer, ForeignKey('roles.id'))
     tenant_id = Column(Integer, ForeignKey('tenants.id'))
-    __table_args__ = (UniqueConstraint("user_id", "role_id", "tenant_id"), {})
+    __table_args__ = (UniqueConstraint("user_id", "role_id", "tenant_id"),
+                      Index("ix_user_roles_user_id_tenant_id", "user_id",
+                            "tenant_id"), {})
 
     user = relationship('User')
     role = relationship('Role')
@@ -102,7 +104,8 @@ class Endpoints(Base, KeystoneBase):
     tenant_id = Column(Integer)
     endpoint_template_id = Column(Integer, ForeignKey('endpoint_templates.id'))
     __table_args__ = (
-        UniqueConstraint("endpoint_template_id", "tenant_id"), {})
+        UniqueConstraint("endpoint_template_id", "tenant_id"),
+        Index("ix_endpoints_tenant_id", "tenant_id"), {})
 
 
 # Define objects
@@ -160,6 +163,7 @@ class Credentials(Base, KeystoneBase):
     type = Column(String(20))  # ('Password','APIKey','EC2')
     key = Column(String(255))
     secret = Column(String(255))
+    __table_args__ = (Index("ix_credentials_key", "key"), {})
 
 
 class Token(Base, KeystoneBase):
@@ -169,6 +173,18 @@ class Token(Base, KeystoneBase):
     user_id = Column(Integer)
     tenant_id = Column(Integer)
     expires = Column(DateTime)
+    __table_args__ = (
+        Index("ix_tokens_user_id_tenant_id_expires", "user_id", "tenant_id",
+              "expires"),
+        Index("ix_tokens_expires", "expires"), {})
+
+
+class RevokedToken(Base, KeystoneBase):
+    """ A revoked token; id is the revision of the revocation list """
+    __tablename__ = 'revoked_tokens'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_id = Column(String(255))
+    expires = Column(DateTime)
 
 
 class EndpointTemplates(Base, KeystoneBase):
@@ -14,10 +14,10 @@
 
 """Python HTTP clients for accessing Keystone's Service and Admin APIs."""
 
-import httplib
 import json
 import logging
 
+from keystone.common import bufferedhttp
 import keystone.common.exception
 
 LOG = logging.getLogger(__name__)
@@ -54,19 +54,15 @@ class ServiceClient(object):
         :param headers: Dictionary of HTTP headers
         :returns: httplib.HTTPResponse object
 
+        Connections are kept open and shared with other clients of the same
+        Keystone service (see bufferedhttp.ConnectionPool).
+
         """
         LOG.debug("Connecting to %s" % self.auth_address)
-        if (self.is_ssl):
-            connection = httplib.HTTPSConnection(self.auth_address,
-                                                 cert_file=self.cert_file)
-        else:
-            connection = httplib.HTTPConnection(self.auth_address)
-        connection.request(verb, path, body=body, headers=headers)
-
-        response = connection.getresponse()
-        response.body = response.read()
+        pool = bufferedhttp.get_pool(self.host, self.port, ssl=self.is_ssl,
+                                     cert_file=self.cert_file)
+        response = pool.request(verb, path, body=body, headers=headers)
         status_int = int(response.status)
-        connection.close()
 
         if status_int < 200 or status_int >= 300:
             msg = "Client received HTTP %d" % status_int
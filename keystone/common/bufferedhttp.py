@@ -24,17 +24,28 @@ BufferedHTTPResponse.
     If you use this, be sure that the libraries you are using do not access
     the socket directly (xmlrpclib, I'm looking at you :/), and instead
     make all calls through httplib.
+
+ConnectionPool keeps HTTP/1.1 connections to one host open between requests,
+so that callers such as the auth_token middleware do not pay for a TCP (and
+TLS) handshake on every call to Keystone.
 """
 
 from urllib import quote
 import logging
+import select
+import socket
 import time
 
+from eventlet import semaphore
 # pylint: disable=E0611
-from eventlet.green.httplib import CONTINUE, HTTPConnection, HTTPMessage, \
-    HTTPResponse, HTTPSConnection, _UNKNOWN
+from eventlet.green.httplib import CONTINUE, HTTPConnection, HTTPException, \
+    HTTPMessage, HTTPResponse, HTTPSConnection, _UNKNOWN
 
 DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 60
+# Requests that can safely be sent again if a reused connection fails
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'DELETE')
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +102,7 @@ class BufferedHTTPConnection(HTTPConnection):
 
     # pylint: disable=W0201
     def putrequest(self, method, url, skip_host=0, skip_accept_encoding=0):
+        self._request_time = time.time()
         self._method = method
         self._path = url
         return HTTPConnection.putrequest(self, method, url, skip_host,
@@ -107,7 +119,7 @@ class BufferedHTTPConnection(HTTPConnection):
         response = HTTPConnection.getresponse(self)
         logger.debug(("HTTP PERF: %(time).5f seconds to %(method)s "
                         "%(host)s:%(port)s %(path)s)"),
-           {'time': time.time() - self._connected_time, 'method': self._method,
+           {'time': time.time() - self._request_time, 'method': self._method,
             'host': self.host, 'port': self.port, 'path': self._path})
         return response
 
@@ -180,3 +192,132 @@ def http_connect_raw(ipaddr, port, method, path, headers=None,
     # pylint: disable=E1103
     conn.endheaders()
     return conn
+
+
+class ConnectionPool(object):
+    """Keep-alive HTTP connections to one host, shared by green threads
+
+    At most max_size connections are open at once; callers beyond that wait
+    for one to be returned. Idle connections are closed after idle_timeout
+    seconds, or when the server has closed them. A request that fails on a
+    reused connection is sent again on a new one only if it is idempotent.
+    """
+
+    # pylint: disable=R0913
+    def __init__(self, host, port, ssl=False, key_file=None, cert_file=None,
+                 timeout=None, max_size=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.key_file = key_file
+        self.cert_file = cert_file
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._slots = semaphore.Semaphore(max_size)
+        # (connection, time it was returned), most recently used last
+        self._idle = []
+
+    def _connect(self):
+        if self.ssl:
+            return HTTPSConnection('%s:%s' % (self.host, self.port),
+                                   key_file=self.key_file,
+                                   cert_file=self.cert_file,
+                                   timeout=self.timeout)
+        return BufferedHTTPConnection('%s:%s' % (self.host, self.port),
+                                      timeout=self.timeout)
+
+    @staticmethod
+    def _is_usable(conn):
+        """An idle connection is only usable if its socket is open and has
+        nothing to read: a readable idle socket has been closed (or garbled)
+        by the server."""
+        if conn.sock is None:
+            return False
+        try:
+            readable = select.select([conn.sock], [], [], 0)[0]
+        except (select.error, socket.error, ValueError):
+            return False
+        return not readable
+
+    def _get(self):
+        """Returns an idle connection, or a new one if none is usable, and
+        whether it was reused"""
+        now = time.time()
+        while self._idle:
+            conn, returned = self._idle.pop()
+            if now - returned < self.idle_timeout and self._is_usable(conn):
+                return conn, True
+            conn.close()
+        return self._connect(), False
+
+    def _send(self, conn, method, path, body, headers):
+        conn.request(method, path, body, headers or {})
+        response = conn.getresponse()
+        response.body = response.read()
+        return response
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends a request and reads the whole response
+
+        :param method: HTTP method to request ('GET', 'PUT', 'POST', etc.)
+        :param path: request path, including any query string
+        :param body: request body
+        :param headers: dictionary of headers
+        :returns: the HTTPResponse, with its content in response.body
+        """
+        self._slots.acquire()
+        try:
+            conn, reused = self._get()
+            try:
+                response = self._send(conn, method, path, body, headers)
+            except (socket.error, HTTPException):
+                conn.close()
+                # The server may have dropped the connection while it was
+                # idle, but it may also have received the request already
+                if not reused or method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+                logger.debug("Reconnecting to %s:%s" % (self.host, self.port))
+                conn = self._connect()
+                try:
+                    response = self._send(conn, method, path, body, headers)
+                except Exception:
+                    conn.close()
+                    raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._idle.append((conn, time.time()))
+            return response
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes all idle connections"""
+        while self._idle:
+            self._idle.pop()[0].close()
+
+
+_POOLS = {}
+
+
+# pylint: disable=R0913
+def get_pool(host, port, ssl=False, key_file=None, cert_file=None,
+             timeout=None, max_size=DEFAULT_POOL_SIZE,
+             idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Returns the ConnectionPool shared by all callers in this process that
+    connect to host:port with the same ssl, key_file, cert_file and timeout.
+    max_size and idle_timeout are taken from the first call.
+    """
+    key = (host, int(port), ssl, key_file, cert_file, timeout)
+    pool = _POOLS.get(key)
+    if pool is None:
+        pool = _POOLS[key] = ConnectionPool(host, int(port), ssl=ssl,
+                                            key_file=key_file,
+                                            cert_file=cert_file,
+                                            timeout=timeout,
+                                            max_size=max_size,
+                                            idle_timeout=idle_timeout)
+    return pool
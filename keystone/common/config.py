@@ -24,10 +24,8 @@ import logging.config
 from logging import FileHandler
 import optparse
 import os
-from paste import deploy
 import sys
 import ConfigParser
-from keystone.common.wsgi import add_console_handler
 
 DEFAULT_LOG_FORMAT = "%(asctime)s %(levelname)8s [%(name)s] %(message)s"
 DEFAULT_LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -35,6 +33,38 @@ DEFAULT_LOG_DIR = "/var/log/keystone"
 DEFAULT_LOG_FILE = "keystone.log"
 
 
+def find_console_handler(logger):
+    """Returns a stream handler, if any"""
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler) and \
+                handler.stream == sys.stderr:
+            return handler
+
+
+def add_console_handler(logger, level=logging.INFO):
+    """
+    Add a Handler which writes log messages to sys.stderr (usually the console)
+    """
+    console = find_console_handler(logger)
+
+    if not console:
+        console = logging.StreamHandler()
+        console.setLevel(level)
+        # set a format which is simpler for console use
+        formatter = logging.Formatter(
+            "%(name)-12s: %(levelname)-8s %(message)s")
+        # tell the handler to use this format
+        console.setFormatter(formatter)
+        # add the handler to the root logger
+        logger.debug("Adding console handler at level %s" % level)
+        logger.addHandler(console)
+    elif console.level != level:
+        logger.debug("Setting console handler level to %s from %s" % (level,
+                                                                console.level))
+        console.setLevel(level)
+    return console
+
+
 def parse_options(parser, cli_args=None):
     """
     Returns the parsed CLI options, command to run and its arguments, merged
@@ -268,6 +298,7 @@ def load_paste_config(app_name, options, args):
         raise RuntimeError("Unable to locate any configuration file. "\
                             "Cannot load application %s" % app_name)
     try:
+        from paste import deploy
         conf = deploy.appconfig("config:%s" % conf_file, name=app_name)
         conf.global_conf.update(get_non_paste_configs(conf_file))
         return conf_file, conf
@@ -351,6 +382,7 @@ def load_paste_app(app_name, options, args):
             for key, value in sorted(items.items()):
                 logger.info("%(key)-20s %(value)s" % locals())
             logger.info("*" * 50)
+        from paste import deploy
         app = deploy.loadapp("config:%s" % conf_file, name=app_name,
             global_conf=conf.global_conf)
     except (LookupError, ImportError) as e:
@@ -0,0 +1,103 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" In-process LRU cache with per-entry expiry
+
+Used by middleware that runs inside other services, so it only depends on
+the standard library. Entries are kept in a doubly linked list, most
+recently used first, so that lookups, inserts and evictions are O(1).
+"""
+
+import time
+
+# Positions in a list node
+_PREV, _NEXT, _KEY, _VALUE, _EXPIRES = range(5)
+
+
+class LRUCache(object):
+    """ Holds at most max_size entries, each until its expiry time """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._nodes = {}
+        # Sentinel: _root[_NEXT] is the most recently used node,
+        # _root[_PREV] the least recently used one
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, None]
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _unlink(self, node):
+        node[_PREV][_NEXT] = node[_NEXT]
+        node[_NEXT][_PREV] = node[_PREV]
+
+    def _link_first(self, node):
+        root = self._root
+        node[_PREV] = root
+        node[_NEXT] = root[_NEXT]
+        root[_NEXT][_PREV] = node
+        root[_NEXT] = node
+
+    def get(self, key, now=None):
+        """ Returns the value cached for key, or None if it is missing or
+        has expired """
+        node = self._nodes.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        if node[_EXPIRES] <= (time.time() if now is None else now):
+            self.pop(key)
+            self.misses += 1
+            return None
+        self._unlink(node)
+        self._link_first(node)
+        self.hits += 1
+        return node[_VALUE]
+
+    def set(self, key, value, expires):
+        """ Caches value for key until expires (epoch seconds) """
+        if self.max_size <= 0:
+            return
+        node = self._nodes.get(key)
+        if node is not None:
+            self._unlink(node)
+            node[_VALUE] = value
+            node[_EXPIRES] = expires
+        else:
+            if len(self._nodes) >= self.max_size:
+                self.pop(self._root[_PREV][_KEY])
+            node = [None, None, key, value, expires]
+            self._nodes[key] = node
+        self._link_first(node)
+
+    def pop(self, key):
+        """ Drops the entry for key, returning its value (or None) """
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return None
+        self._unlink(node)
+        return node[_VALUE]
+
+    def clear(self):
+        self._nodes.clear()
+        self._root[:] = [self._root, self._root, None, None, None]
+
+    def stats(self):
+        return {'size': len(self._nodes), 'hits': self.hits,
+                'misses': self.misses}
@@ -0,0 +1,89 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Pooled memcache clients for green threads
+
+memcache.Client objects hold their sockets open, but are not safe to share
+between green threads that are talking to the server at the same time.
+ClientPool keeps up to pool_size clients per server and lends one to each
+call, so sockets are reused across requests without being interleaved.
+
+Keys are spread over the servers by consistent hashing, so that adding or
+removing a server only moves the keys of its neighbours on the ring.
+"""
+
+import bisect
+import hashlib
+
+from eventlet import pools
+
+DEFAULT_POOL_SIZE = 10
+# Points on the ring per server
+REPLICAS = 100
+
+
+def parse_servers(servers):
+    """ Splits a comma or space separated list of host:port strings """
+    return servers.replace(',', ' ').split()
+
+
+def _hash(value):
+    return int(hashlib.md5(value).hexdigest()[:8], 16)
+
+
+class ClientPool(object):
+    """ Memcache client with the get/set/delete API of memcache.Client,
+    backed by a pool of clients per server """
+
+    def __init__(self, servers, pool_size=DEFAULT_POOL_SIZE):
+        # pylint: disable=F0401
+        import memcache
+
+        self.servers = servers
+        self._pools = {}
+        for server in servers:
+            self._pools[server] = pools.Pool(max_size=pool_size,
+                create=lambda server=server: memcache.Client([server]))
+
+        ring = []
+        for server in servers:
+            for i in range(REPLICAS):
+                ring.append((_hash('%s-%s' % (server, i)), server))
+        ring.sort()
+        self._points = [point for point, _server in ring]
+        self._ring = [server for _point, server in ring]
+
+    def server_for(self, key):
+        """ Returns the server that holds key """
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._ring[index]
+
+    def _call(self, key, method, *args, **kwargs):
+        pool = self._pools[self.server_for(key)]
+        client = pool.get()
+        try:
+            return getattr(client, method)(key, *args, **kwargs)
+        finally:
+            pool.put(client)
+
+    def get(self, key):
+        return self._call(key, 'get')
+
+    def set(self, key, value, time=0):
+        return self._call(key, 'set', value, time=time)
+
+    def delete(self, key):
+        return self._call(key, 'delete')
@@ -0,0 +1,205 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Signed tokens
+
+When token signing is enabled, Keystone hands out token ids that carry the
+validated claims (user, tenant, roles, expiry) along with an HMAC-SHA256
+signature, so that middleware holding the same keys can verify them without
+calling Keystone.
+
+A signed token looks like ``<key id>.<claims>.<signature>``, where claims is
+the url-safe base64 encoding of the JSON document::
+
+    {"id": "<token id as stored by Keystone>",
+     "expires": "%Y-%m-%dT%H:%M:%S.%f",
+     "user": {"id": "...", "name": "..."},
+     "tenant": {"id": "...", "name": "..."},
+     "roles": ["<role name>", ...]}
+
+Keys are files in a directory shared by Keystone and the middleware: the
+file name is the key id and the file content is the secret. Keystone signs
+with the key whose id sorts last, and both sides accept every key in the
+directory. To rotate, add a new key file (e.g. named after today's date),
+and delete the old one once the tokens it signed have expired. The directory
+is re-read whenever files are added or removed.
+
+This module only depends on the standard library so that it can be used by
+middleware deployed without the rest of Keystone.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+
+LOG = logging.getLogger(__name__)
+
+# Seconds between checks of the key directory for added or removed keys
+CHECK_INTERVAL = 10
+
+
+class InvalidToken(Exception):
+    """ The token is not a well formed, correctly signed token """
+    pass
+
+
+class UnknownKey(InvalidToken):
+    """ The token was signed with a key that is not (yet) available """
+    pass
+
+
+class KeyRing(object):
+    """ The signing keys found in a directory """
+
+    def __init__(self, key_dir, check_interval=CHECK_INTERVAL):
+        self.key_dir = key_dir
+        self.check_interval = check_interval
+        self._keys = {}
+        self._mtime = None
+        self._checked = None
+
+    def _load(self):
+        now = time.time()
+        if self._checked is not None and \
+                now - self._checked < self.check_interval:
+            return
+        self._checked = now
+
+        try:
+            mtime = os.stat(self.key_dir).st_mtime
+        except OSError, e:
+            LOG.warn("Cannot read signing keys from %s: %s" %
+                     (self.key_dir, e))
+            self._keys = {}
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+
+        keys = {}
+        for key_id in os.listdir(self.key_dir):
+            # key ids are part of the token, so they cannot contain dots
+            # (which also skips hidden files and editor backups)
+            if '.' in key_id:
+                continue
+            path = os.path.join(self.key_dir, key_id)
+            if not os.path.isfile(path):
+                continue
+            with open(path) as key_file:
+                secret = key_file.read().strip()
+            if secret:
+                keys[key_id] = secret
+        LOG.debug("Loaded signing keys %s from %s" % (sorted(keys),
+                                                      self.key_dir))
+        self._keys = keys
+        self._mtime = mtime
+
+    def get(self, key_id):
+        """ Returns the secret of the given key, or None """
+        self._load()
+        return self._keys.get(key_id)
+
+    def current(self):
+        """ Returns (key id, secret) of the key new tokens are signed with """
+        self._load()
+        if not self._keys:
+            raise UnknownKey("No signing keys found in %s" % self.key_dir)
+        key_id = max(self._keys)
+        return (key_id, self._keys[key_id])
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip('=')
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(str(data) + '=' * (-len(data) % 4))
+
+
+def _signature(secret, key_id, payload):
+    return _encode(hmac.new(secret, '%s.%s' % (key_id, payload),
+                            hashlib.sha256).digest())
+
+
+def _equals(a, b):
+    """ Compares two strings in constant time """
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a, b):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
+
+def is_signed(token):
+    """ Tells whether a token id is in the signed token format """
+    return isinstance(token, basestring) and token.count('.') == 2
+
+
+def sign(claims, keys):
+    """ Returns a signed token carrying the given claims """
+    key_id, secret = keys.current()
+    payload = _encode(json.dumps(claims))
+    return '%s.%s.%s' % (key_id, payload,
+                         _signature(secret, key_id, payload))
+
+
+def _split(token):
+    if not is_signed(token):
+        raise InvalidToken("Not a signed token")
+    return token.split('.')
+
+
+def _load_claims(payload):
+    try:
+        return json.loads(_decode(payload))
+    except (TypeError, ValueError), e:
+        raise InvalidToken("Malformed claims: %s" % e)
+
+
+def verify(token, keys):
+    """ Checks the signature of a signed token and returns its claims.
+
+    Raises UnknownKey if the signing key is not in keys, and InvalidToken if
+    the token is malformed or the signature does not match. Expiry is left
+    to the caller.
+    """
+    key_id, payload, signature = _split(token)
+    secret = keys.get(key_id)
+    if secret is None:
+        raise UnknownKey("Unknown signing key %s" % key_id)
+    if not _equals(signature, _signature(secret, key_id, payload)):
+        raise InvalidToken("Bad signature")
+    return _load_claims(payload)
+
+
+def token_id(token):
+    """ Returns the id Keystone stores for a token.
+
+    That is the id in the claims for signed tokens and the token itself
+    otherwise. The signature is not checked: the stored id is a bearer
+    token in its own right, so it is no use to anyone but the token holder.
+    """
+    if not is_signed(token):
+        return token
+    try:
+        return _load_claims(_split(token)[1])['id']
+    except (InvalidToken, KeyError, TypeError):
+        return token
@@ -0,0 +1,55 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Coalescing of concurrent identical calls between green threads
+
+When many green threads ask for the same thing at once (e.g. validation of a
+token that just dropped out of a cache), only the first one does the work;
+the others wait for it and get the same result, or the same exception.
+"""
+
+import sys
+
+from eventlet import event
+
+
+class Group(object):
+    """ Runs at most one call per key at a time """
+
+    def __init__(self):
+        self._calls = {}
+        # Number of calls that waited for another one instead of running
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """ Returns func(*args, **kwargs), or the result of the call already
+        running for key """
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            return call.wait()
+
+        call = self._calls[key] = event.Event()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            exc_info = sys.exc_info()
+            del self._calls[key]
+            call.send_exception(*exc_info)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        del self._calls[key]
+        call.send(result)
+        return result
@@ -0,0 +1,201 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" In-memory cache of static files (contracts, dev guides, XSDs, etc.)
+
+Each file is read from disk the first time it is asked for. Files up to
+MAX_CACHED_SIZE are kept in memory along with their ETag and, when it is
+worth it, a gzipped copy for clients that accept one. Larger files are
+streamed from disk in CHUNK_SIZE pieces, so that a response never holds the
+whole file in memory, using the server's wsgi.file_wrapper (e.g. sendfile)
+if it has one.
+
+Requests whose If-None-Match or If-Modified-Since headers show the client
+already has the file are answered with 304 Not Modified.
+"""
+
+import calendar
+from email import utils as email_utils
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from StringIO import StringIO
+
+from webob import Response
+
+from keystone.logic.types import fault
+
+LOG = logging.getLogger(__name__)
+
+# Larger files are not kept in memory
+MAX_CACHED_SIZE = 1024 * 1024
+# Bytes read from disk at a time when streaming a file
+CHUNK_SIZE = 65536
+# Gzipped copies are only kept if smaller than this fraction of the file
+GZIP_RATIO = 0.9
+
+
+def is_not_modified(req, etag, mtime):
+    """Returns True if the conditional headers of req show that the client
+    already has the content with the given ETag and modification time"""
+    if_none_match = req.environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+
+    if_modified_since = req.environ.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since:
+        # IE sends "<date>; length=146"
+        since = email_utils.parsedate(if_modified_since.split(';')[0])
+        if since is not None:
+            return calendar.timegm(since) >= mtime
+
+    return False
+
+
+def accepts_gzip(req):
+    """Returns True if the Accept-Encoding header of req allows gzip"""
+    for coding in req.environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = coding.split(';')
+        if params[0].strip().lower() not in ('gzip', '*'):
+            continue
+        for param in params[1:]:
+            name, _sep, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _gzip(body):
+    out = StringIO()
+    gz = gzip.GzipFile(fileobj=out, mode='wb')
+    gz.write(body)
+    gz.close()
+    return out.getvalue()
+
+
+class FileIter(object):
+    """ Response body reading a file chunk by chunk """
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        while True:
+            chunk = self.fileobj.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self.fileobj.close()
+
+
+class StaticFile(object):
+    """ A file's validators and, unless it is too large, its content """
+
+    def __init__(self, filename):
+        self.filename = filename
+        stats = os.stat(filename)
+        self.size = stats.st_size
+        self.mtime = int(stats.st_mtime)
+        self.last_modified = email_utils.formatdate(self.mtime, usegmt=True)
+        self.body = None
+        self.gzipped = None
+        self.gzipped_etag = None
+        if self.size <= MAX_CACHED_SIZE:
+            with open(filename, 'rb') as fileobj:
+                self.body = fileobj.read()
+            self.etag = '"%s"' % hashlib.md5(self.body).hexdigest()
+            gzipped = _gzip(self.body)
+            if len(gzipped) < len(self.body) * GZIP_RATIO:
+                self.gzipped = gzipped
+                # The gzip header holds a timestamp, so the ETag of this
+                # representation is derived from the content's instead
+                self.gzipped_etag = '"%s-gzip"' % self.etag.strip('"')
+        else:
+            self.etag = '"%x-%x"' % (self.mtime, self.size)
+
+    def response(self, req, mimetype):
+        """Returns a response serving this file (or a 304) to req"""
+        use_gzip = self.gzipped is not None and accepts_gzip(req)
+        etag = self.gzipped_etag if use_gzip else self.etag
+
+        resp = Response()
+        resp.content_type = mimetype or 'text/plain'
+        resp.headers['ETag'] = etag
+        resp.headers['Last-Modified'] = self.last_modified
+        if self.gzipped is not None:
+            resp.headers['Vary'] = 'Accept-Encoding'
+
+        if is_not_modified(req, etag, self.mtime):
+            resp.status = "304 Not Modified"
+        elif self.body is None:
+            file_wrapper = req.environ.get('wsgi.file_wrapper', FileIter)
+            resp.app_iter = file_wrapper(open(self.filename, 'rb'),
+                                         CHUNK_SIZE)
+            resp.content_length = self.size
+        elif use_gzip:
+            resp.body = self.gzipped
+            resp.content_encoding = 'gzip'
+        else:
+            resp.body = self.body
+        return resp
+
+
+class ContentCache(object):
+    """ Serves the files under root, loading each one once """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root) + os.sep
+        self._files = {}
+
+    def get(self, filename):
+        """Returns the StaticFile for filename (relative to root), or raises
+        a fault if it is outside root or does not exist"""
+        path = os.path.abspath(os.path.join(self.root,
+                                            filename.strip('/\\')))
+        static_file = self._files.get(path)
+        if static_file is not None:
+            return static_file
+
+        if not path.startswith(self.root):
+            raise fault.ForbiddenFault("Access denied.")
+        if not os.path.isfile(path):
+            raise fault.ItemNotFoundFault("File does not exist.")
+        if not os.access(path, os.R_OK):
+            raise fault.ForbiddenFault(
+                "You do not have permission to access this file.")
+
+        LOG.debug("Loading static file '%s'" % path)
+        # Only files that exist are cached, so the cache cannot grow
+        # beyond the content of root
+        static_file = self._files[path] = StaticFile(path)
+        return static_file
+
+    def response(self, req, filename, mimetype=None):
+        """Returns a response serving filename to req"""
+        static_file = self.get(filename)
+        if not mimetype:
+            mimetype = mimetypes.guess_type(static_file.filename)[0]
+        return static_file.response(req, mimetype)
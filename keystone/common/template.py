@@ -44,16 +44,8 @@ import cgi
 import re
 import os
 import functools
-import time
 import tokenize
-import mimetypes
-from webob import Response
 from paste.util.template import TemplateError
-# from paste.util.datetimeutil import parse_date
-import datetime
-
-import keystone.logic.types.fault as fault
-from keystone.logic.types.fault import ForbiddenFault
 
 TEMPLATES = {}
 DEBUG = False
@@ -300,58 +292,6 @@ class SimpleTemplate(BaseTemplate):
         return ''.join(stdout)
 
 
-def static_file(resp, req, filename, root, guessmime=True, mimetype=None,
-        download=False):
-    """ Opens a file in a safe way and returns a HTTPError object with status
-        code 200, 305, 401 or 404. Sets Content-Type, Content-Length and
-        Last-Modified header. Obeys If-Modified-Since header and HEAD requests.
-    """
-    root = os.path.abspath(root) + os.sep
-    filename = os.path.abspath(os.path.join(root, filename.strip('/\\')))
-    if not filename.startswith(root):
-        return ForbiddenFault("Access denied.")
-    if not os.path.exists(filename) or not os.path.isfile(filename):
-        return fault.ItemNotFoundFault("File does not exist.")
-    if not os.access(filename, os.R_OK):
-        return ForbiddenFault(
-            "You do not have permission to access this file.")
-
-    if not mimetype and guessmime:
-        resp.content_type = mimetypes.guess_type(filename)[0]
-    else:
-        resp.content_type = mimetype or 'text/plain'
-
-    if download:
-        download = os.path.basename(filename)
-        resp.content_disposition = 'attachment; filename="%s"' % download
-
-    stats = os.stat(filename)
-    lm = time.strftime("%a, %d %b %Y %H:%M:%S GMT",
-        time.gmtime(stats.st_mtime))
-    resp.last_modified = lm
-    ims = req.environ.get('HTTP_IF_MODIFIED_SINCE')
-    if ims:
-        ims = ims.split(";")[0].strip()  # IE sends "<date>; length=146"
-        try:
-            ims = datetime.datetime.fromtimestamp(stats.st_mtime)
-            ims = datetime.datetime.ctime(ims)
-            filetime = datetime.datetime.fromtimestamp(stats.st_mtime)
-            if ims is not None and ims >= filetime:
-                resp.date = time.strftime(
-                    "%a, %d %b %Y %H:%M:%S GMT", time.gmtime())
-                return Response(body=None, status=304,
-                                headerlist=resp.headerlist)
-        except:
-            # TODO(Ziad): handle this better
-            pass
-    resp.content_length = stats.st_size
-    if req.method == 'HEAD':
-        return Response(body=None, status=200, headerlist=resp.headerlist)
-    else:
-        return Response(body=open(filename).read(), status=200,
-            headerlist=resp.headerlist)
-
-
 def template(tpl, template_adapter=SimpleTemplate, **kwargs):
     '''
     Get a rendered template as a string iterator.
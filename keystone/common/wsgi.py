@@ -21,51 +21,40 @@
 Utility methods for working with WSGI servers
 """
 
+import errno
 import json
 import logging
+import os
+import signal
 import sys
 import datetime
 import ssl
+import weakref
 
+import eventlet.hubs
+from eventlet import semaphore
 import eventlet.wsgi
 eventlet.patcher.monkey_patch(all=False, socket=True)
 import routes.middleware
 from webob import Response
 import webob.dec
 
+# Lives in config so that loading config does not load the WSGI stack
+from keystone.common.config import add_console_handler
+from keystone.logic.types import fault
+from keystone import utils
+
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
+# Seconds between checks for exited worker processes
+WORKER_POLL_INTERVAL = 1
 
-def find_console_handler(logger):
-    """Returns a stream handler, if any"""
-    for handler in logger.handlers:
-        if isinstance(handler, logging.StreamHandler) and \
-                handler.stream == sys.stderr:
-            return handler
+# Called in the parent process before each worker is forked, e.g. to close
+# database connections that must not be shared with the worker
+BEFORE_FORK = []
 
-
-def add_console_handler(logger, level=logging.INFO):
-    """
-    Add a Handler which writes log messages to sys.stderr (usually the console)
-    """
-    console = find_console_handler(logger)
-
-    if not console:
-        console = logging.StreamHandler()
-        console.setLevel(level)
-        # set a format which is simpler for console use
-        formatter = logging.Formatter(
-            "%(name)-12s: %(levelname)-8s %(message)s")
-        # tell the handler to use this format
-        console.setFormatter(formatter)
-        # add the handler to the root logger
-        logger.debug("Adding console handler at level %s" % level)
-        logger.addHandler(console)
-    elif console.level != level:
-        logger.debug("Setting console handler level to %s from %s" % (level,
-                                                                console.level))
-        console.setLevel(level)
-    return console
+# Servers created in this process, for get_stats()
+_SERVERS = weakref.WeakKeyDictionary()
 
 
 class WritableLogger(object):
@@ -81,6 +70,87 @@ class WritableLogger(object):
         self.logger.log(self.level, msg.strip("\n"))
 
 
+def get_stats():
+    """Returns the stats() of every server in this process, by name"""
+    return sorted((server.stats() for server in _SERVERS.keys()),
+                  key=lambda stats: stats['name'])
+
+
+class AdmissionControl(object):
+    """WSGI wrapper that limits the requests an application handles at once
+
+    Up to max_in_flight requests are passed to the application, and up to
+    max_queue more wait for one of those to finish. Any others are rejected
+    straight away with a 503 serviceUnavailable fault, rather than left to
+    time out.
+    """
+
+    def __init__(self, application, max_in_flight, max_queue=0):
+        self.application = application
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.slots = semaphore.Semaphore(max_in_flight)
+        self.queued = 0
+        self.rejected = 0
+
+    def __call__(self, environ, start_response):
+        if self.slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            return self._reject(environ, start_response)
+
+        self.queued += 1
+        try:
+            self.slots.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            result = self.application(environ, start_response)
+        except:
+            self.slots.release()
+            raise
+        if isinstance(result, (list, tuple)):
+            # The body is ready, only sending it is left
+            self.slots.release()
+            return result
+        return _ReleasingIterable(result, self.slots.release)
+
+    def _reject(self, environ, start_response):
+        logger.warn("Rejecting %s %s: %s requests in progress, %s queued" % (
+            environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'),
+            self.max_in_flight, self.queued))
+        req = webob.Request(environ)
+        resp = utils.send_error(503, req, fault.ServiceUnavailableFault(
+            "Service is busy", "Too many requests in progress, try again "
+            "later"))
+        return resp(environ, start_response)
+
+    def stats(self):
+        return {'in_flight': self.max_in_flight - self.slots.counter,
+                'queued': self.queued, 'rejected': self.rejected,
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue}
+
+
+class _ReleasingIterable(object):
+    """Response body that calls release() once the server has closed it"""
+
+    def __init__(self, result, release):
+        self.result = result
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            if self.release is not None:
+                self.release()
+                self.release = None
+
+
 def run_server(application, port):
     """Run a WSGI server with the given application."""
     logger.debug("Running WSGI server on 0.0.0.0:%s" % port)
@@ -89,30 +159,171 @@ def run_server(application, port):
 
 
 class Server(object):
-    """Server class to manage multiple WSGI sockets and applications."""
+    """Server class to manage multiple WSGI sockets and applications.
+
+    With workers > 0, start() only opens the listening socket, and wait()
+    forks that many worker processes to serve it. The parent process
+    restarts workers that die, and stops them all on SIGTERM or SIGHUP.
+    Sockets opened by all such servers are served by the same workers, by
+    whichever server's wait() is called first.
+
+    Each server has its own pool of `threads` green threads, one per open
+    connection. With max_in_flight > 0, requests to each of its sockets
+    are also subject to AdmissionControl. Requests waiting in its
+    queue hold a green thread, so threads should exceed max_in_flight plus
+    max_queue: once the pool is full, connections wait in the listen
+    backlog instead.
+    """
     started = False
-
-    def __init__(self, threads=1000):
+    # (server, application, socket) waiting to be served by workers
+    _pending = []
+
+    def __init__(self, threads=1000, workers=0, max_in_flight=0,
+                 max_queue=0):
+        self.name = None
+        self.pool_size = threads
+        self.workers = workers
         self.pool = eventlet.GreenPool(threads)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.admission = []
         self.socket_info = {}
         self.threads = {}
+        self.children = set()
+        # Cleared by _stop_workers(), even before wait() is called
+        self.running = True
+        _SERVERS[self] = True
 
     def start(self, application, port, host='0.0.0.0', key=None, backlog=128):
         """Run a WSGI server with the given application."""
         logger.debug("start server '%s' on %s:%s" % (key, host, port))
         socket = eventlet.listen((host, port), backlog=backlog)
-        thread = self.pool.spawn(self._run, application, socket)
+        self._serve(application, socket, key)
+
+    def _serve(self, application, socket, key):
+        self.name = self.name or key
+        if self.max_in_flight > 0:
+            application = AdmissionControl(application, self.max_in_flight,
+                                           self.max_queue)
+            self.admission.append(application)
         if key:
             self.socket_info[key] = socket
-            self.threads[key] = thread
+        if self.workers:
+            Server._pending.append((self, application, socket))
+        else:
+            thread = self.pool.spawn(self._run, application, socket)
+            if key:
+                self.threads[key] = thread
 
     def wait(self):
         """Wait until all servers have completed running."""
+        if self.workers:
+            self._run_workers()
+            return
         try:
             self.pool.waitall()
         except KeyboardInterrupt:
             pass
 
+    def _run_workers(self):
+        """Fork workers, and restart them when they die until stopped"""
+        served = Server._pending[:]
+        del Server._pending[:]
+        signal.signal(signal.SIGTERM, self._stop_workers)
+        signal.signal(signal.SIGHUP, self._stop_workers)
+        logger.info("Starting %s workers" % self.workers)
+        try:
+            while self.running:
+                while len(self.children) < self.workers:
+                    self._start_worker(served)
+                self._reap_workers()
+                eventlet.sleep(WORKER_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+        logger.info("Stopping %s workers" % len(self.children))
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError, e:
+                if e.errno != errno.ESRCH:
+                    raise
+        while self.children:
+            try:
+                pid = os.wait()[0]
+            except OSError, e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno != errno.ECHILD:
+                    raise
+                break
+            self.children.discard(pid)
+
+    def _stop_workers(self, *_args):
+        self.running = False
+
+    def _reap_workers(self):
+        """Forget workers that have exited, so that they are replaced"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError, e:
+                if e.errno != errno.ECHILD:
+                    raise
+                return
+            if not pid:
+                return
+            if pid in self.children:
+                self.children.remove(pid)
+                logger.error("Worker %s exited with status %s" % (pid,
+                                                                  status))
+
+    def _start_worker(self, served):
+        for callback in BEFORE_FORK:
+            callback()
+        pid = os.fork()
+        if pid:
+            logger.info("Started worker %s" % pid)
+            self.children.add(pid)
+            return
+
+        # In the worker: the parent decides when to stop
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        status = 0
+        try:
+            # Do not share the parent's hub (and its poll set)
+            eventlet.hubs.use_hub()
+            servers = []
+            for server, application, socket in served:
+                if server not in servers:
+                    server.pool = eventlet.GreenPool(server.pool_size)
+                    servers.append(server)
+                server.pool.spawn(server._run, application, socket)
+            for server in servers:
+                server.pool.waitall()
+        except Exception:  # pylint: disable=W0703
+            logger.exception("Worker %s failed" % os.getpid())
+            status = 1
+        # Never return to the caller of wait() in the parent's stead
+        os._exit(status)  # pylint: disable=W0212
+
+    def stats(self):
+        """Returns the occupancy of the green thread pool and, if limited,
+        the requests in progress, queued and rejected"""
+        stats = {'name': self.name, 'pool_size': self.pool_size,
+                 'running': self.pool.running(), 'free': self.pool.free(),
+                 'waiting': self.pool.waiting()}
+        if self.admission:
+            stats.update(max_in_flight=self.max_in_flight,
+                         max_queue=self.max_queue, in_flight=0, queued=0,
+                         rejected=0)
+            for admission in self.admission:
+                for name in ('in_flight', 'queued', 'rejected'):
+                    stats[name] += admission.stats()[name]
+        return stats
+
     def _run(self, application, socket):
         """Start a WSGI server in a new green thread."""
         logger.debug("_run called")
@@ -138,10 +349,7 @@ class SslServer(Server):
                                       keyfile=keyfile,
                                       server_side=True, cert_reqs=cert_reqs,
                                       ca_certs=ca_certs)
-        thread = self.pool.spawn(self._run, application, sslsocket)
-        if key:
-            self.socket_info[key] = sslsocket
-            self.threads[key] = thread
+        self._serve(application, sslsocket, key)
 
 
 class Middleware(object):
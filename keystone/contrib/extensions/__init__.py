@@ -28,7 +28,8 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
 
 class BaseExtensionConfigurer(object):
-    def configure_extensions(self, extension_type, mapper, options):
+    def configure_extensions(self, extension_type, mapper, options,
+                             identity_service=None):
         supported_extensions = options.get(CONFIG_EXTENSION_PROPERTY,
                                            DEFAULT_EXTENSIONS)
         for supported_extension in supported_extensions.split(','):
@@ -39,7 +40,8 @@ class BaseExtensionConfigurer(object):
                 extension_module = utils.import_module(supported_extension)
                 if hasattr(extension_module, 'ExtensionHandler'):
                     extension_class = extension_module.ExtensionHandler()
-                    extension_class.map_extension_methods(mapper, options)
+                    extension_class.map_extension_methods(mapper, options,
+                                                          identity_service)
                     self.extension_handlers.append(extension_class)
             except Exception as err:
                 logger.exception("Could not load extension for %s:%s %s" %
@@ -25,10 +25,10 @@ EXTENSION_ADMIN_PREFIX = 'admin'
 
 
 class AdminExtensionConfigurer(BaseExtensionConfigurer):
-    def configure(self, mapper, options):
+    def configure(self, mapper, options, identity_service=None):
         self.configure_extensions(
                 EXTENSION_ADMIN_PREFIX,
-                mapper, options)
+                mapper, options, identity_service)
 
 
 def get_extension_configurer():
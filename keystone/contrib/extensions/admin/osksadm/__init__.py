@@ -25,11 +25,13 @@ from keystone.controllers.credentials import CredentialsController
 
 
 class ExtensionHandler(BaseExtensionHandler):
-    def map_extension_methods(self, mapper, options):
-        tenant_controller = TenantController(options)
-        roles_controller = RolesController(options)
-        user_controller = UserController(options)
-        credentials_controller = CredentialsController(options)
+    def map_extension_methods(self, mapper, options, identity_service=None):
+        tenant_controller = TenantController(
+            options, identity_service=identity_service)
+        roles_controller = RolesController(options, identity_service)
+        user_controller = UserController(options, identity_service)
+        credentials_controller = CredentialsController(options,
+                                                       identity_service)
 
         # Tenant Operations
         mapper.connect("/tenants", controller=tenant_controller,
@@ -96,7 +98,7 @@ class ExtensionHandler(BaseExtensionHandler):
             conditions=dict(method=["DELETE"]))
 
         # Services Operations
-        services_controller = ServicesController(options)
+        services_controller = ServicesController(options, identity_service)
         mapper.connect("/OS-KSADM/services",
                     controller=services_controller,
                     action="get_services",
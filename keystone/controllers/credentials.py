@@ -33,9 +33,10 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
 class CredentialsController(wsgi.Controller):
     """Controller for Credentials related operations"""
-    def __init__(self, options):
+    def __init__(self, options, identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
 
     @utils.wrap_error
     def get_credentials(self, req, user_id):
@@ -34,9 +34,10 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 class EndpointTemplatesController(wsgi.Controller):
     """Controller for EndpointTemplates related operations"""
 
-    def __init__(self, options):
+    def __init__(self, options, identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
 
     @utils.wrap_error
     def get_endpoint_templates(self, req):
@@ -34,9 +34,10 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 class RolesController(wsgi.Controller):
     """Controller for Role related operations"""
 
-    def __init__(self, options):
+    def __init__(self, options, identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
 
     # Not exposed yet.
     @utils.wrap_error
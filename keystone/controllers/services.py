@@ -34,9 +34,10 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 class ServicesController(wsgi.Controller):
     """Controller for Service related operations"""
 
-    def __init__(self, options):
+    def __init__(self, options, identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
 
     @utils.wrap_error
     def create_service(self, req):
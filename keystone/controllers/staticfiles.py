@@ -19,17 +19,19 @@
 """
 Static Files Controller
 
-Serves static files like PDF, WADL, etc...
+Serves static files like PDF, WADL, etc... from an in-memory cache shared by
+all the controllers in the process (see keystone.common.static).
 """
 import logging
 import os
-from webob import Response
 
 from keystone import utils
-from keystone.common import template, wsgi
+from keystone.common import static, wsgi
 
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
+CONTENT = static.ContentCache(utils.get_app_root())
+
 
 class StaticFilesController(wsgi.Controller):
     """Controller for contract documents"""
@@ -39,33 +41,25 @@ class StaticFilesController(wsgi.Controller):
 
     @utils.wrap_error
     def get_pdf_contract(self, req, pdf, root="content/"):
-        resp = Response()
-        filepath = root + pdf
-        return template.static_file(resp, req, filepath,
-            root=utils.get_app_root(), mimetype="application/pdf")
+        return CONTENT.response(req, root + pdf, mimetype="application/pdf")
 
     @utils.wrap_error
     def get_wadl_contract(self, req, wadl, root):
-        resp = Response()
-        return template.static_file(resp, req, root + wadl,
-            root=utils.get_app_root(), mimetype="application/vnd.sun.wadl+xml")
+        return CONTENT.response(req, root + wadl,
+            mimetype="application/vnd.sun.wadl+xml")
 
     @utils.wrap_error
     def get_xsd_contract(self, req, xsd, root="content/"):
-        resp = Response()
-        return template.static_file(resp, req, root + "xsd/" + xsd,
-            root=utils.get_app_root(), mimetype="application/xml")
+        return CONTENT.response(req, root + "xsd/" + xsd,
+            mimetype="application/xml")
 
     @utils.wrap_error
     def get_xsd_atom_contract(self, req, xsd, root="content/"):
-        resp = Response()
-        return template.static_file(resp, req, root + "xsd/atom/" + xsd,
-            root=utils.get_app_root(), mimetype="application/xml")
+        return CONTENT.response(req, root + "xsd/atom/" + xsd,
+            mimetype="application/xml")
 
     @utils.wrap_error
     def get_static_file(self, req, path, file, mimetype=None, root="content/"):
-        resp = Response()
-
         if mimetype is None:
             if utils.is_xml_response(req):
                 mimetype = "application/xml"
@@ -83,5 +77,4 @@ class StaticFilesController(wsgi.Controller):
                 resp_file = "%s.json" % resp_file
 
         logger.debug("Returning contents from file '%s'" % resp_file)
-        return template.static_file(resp, req, resp_file,
-            root=utils.get_app_root(), mimetype=mimetype)
+        return CONTENT.response(req, resp_file, mimetype=mimetype)
@@ -34,9 +34,11 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 class TenantController(wsgi.Controller):
     """Controller for Tenant related operations"""
 
-    def __init__(self, options, is_service_operation=None):
+    def __init__(self, options, is_service_operation=None,
+                 identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
 
         self.is_service_operation = is_service_operation
         logger.debug("Initializing: 'Service API' mode=%s" %
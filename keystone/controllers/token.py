@@ -26,6 +26,7 @@ calls from the request routers.
 import logging
 
 from keystone import utils
+from keystone.common import singleflight
 from keystone.common import wsgi
 from keystone.logic import extension_reader
 from keystone.logic.types import auth
@@ -39,9 +40,11 @@ logger = logging.getLogger(__name__)  # pylint: disable=C0103
 class TokenController(wsgi.Controller):
     """Controller for token related operations"""
 
-    def __init__(self, options):
+    def __init__(self, options, identity_service=None):
         self.options = options
-        self.identity_service = service.IdentityService(options)
+        self.identity_service = (identity_service or
+                                 service.IdentityService(options))
+        self.validations = singleflight.Group()
         logger.debug("Token controller init with HP-IDM extension: %s" % \
                 extension_reader.is_extension_supported(self.options, 'hpidm'))
 
@@ -71,15 +74,34 @@ class TokenController(wsgi.Controller):
         return utils.send_result(200, req,
             self.identity_service.authenticate_ec2(creds))
 
-    def _validate_token(self, req, token_id):
-        """Validates the token, and that it belongs to the specified tenant"""
+    def _get_validation_scope(self, req):
+        """Returns the tenant and service IDs tokens are validated for"""
         belongs_to = req.GET.get('belongsTo')
         service_ids = None
         if extension_reader.is_extension_supported(self.options, 'hpidm'):
             # service IDs are only relevant if hpidm extension is enabled
             service_ids = req.GET.get('HP-IDM-serviceId')
-        return self.identity_service.validate_token(
-            utils.get_auth_token(req), token_id, belongs_to, service_ids)
+        return (belongs_to, service_ids)
+
+    def _validate_token(self, req, token_id):
+        """Validates the token, and that it belongs to the specified tenant
+
+        Concurrent requests validating the same token with the same admin
+        token and scope share a single validation.
+        """
+        belongs_to, service_ids = self._get_validation_scope(req)
+        key = (utils.get_auth_token(req), token_id, belongs_to, service_ids)
+        return self.validations.do(key, self.identity_service.validate_token,
+                                   *key)
+
+    @utils.wrap_error
+    def validate_tokens(self, req):
+        """Validates all tokens listed in the request body at once"""
+        token_ids = utils.get_normalized_request_content(auth.TokenIds, req)
+        belongs_to, service_ids = self._get_validation_scope(req)
+        return utils.send_result(200, req,
+            self.identity_service.validate_tokens(utils.get_auth_token(req),
+                token_ids.ids, belongs_to, service_ids))
 
     @utils.wrap_error
     def validate_token(self, req, token_id):
@@ -98,6 +120,17 @@ class TokenController(wsgi.Controller):
             self.identity_service.revoke_token(utils.get_auth_token(req),
                 token_id))
 
+    @utils.wrap_error
+    def get_revoked_tokens(self, req):
+        """Lists the tokens revoked after the revision given as 'since'"""
+        try:
+            since = int(req.GET.get('since', 0))
+        except ValueError:
+            raise fault.BadRequestFault("Expecting an integer 'since'")
+        return utils.send_result(200, req,
+            self.identity_service.get_revoked_tokens(
+                utils.get_auth_token(req), since))
+
     @utils.wrap_error
     def endpoints(self, req, token_id):
         marker, limit, url = get_marker_limit_and_url(req)
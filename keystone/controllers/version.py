@@ -19,13 +19,21 @@
 """
 Version Controller
 
+The version and multiple choice documents only depend on the template, the
+response format and the protocol, host and port the request came in on, so
+each is rendered once and served from memory, with an ETag and Last-Modified
+header. Load balancers poll these URLs, so conditional requests are answered
+with 304 Not Modified.
 """
+from email import utils as email_utils
+import hashlib
 import logging
 import os
 from webob import Response
 
 from keystone import utils
 from keystone import version
+from keystone.common import static
 from keystone.common import template
 from keystone.common import wsgi
 
@@ -36,6 +44,63 @@ POSSIBLE_TOPDIR = os.path.normpath(os.path.join(os.path.dirname(__file__),
 
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
+# Most documents kept in _DOCUMENTS
+MAX_DOCUMENTS = 64
+
+# Maps (file, extension, protocol, host, port, path) to (body, etag, mtime)
+_DOCUMENTS = {}
+
+
+def render_document(file, extension, environ, **kwargs):
+    """Returns (body, etag, mtime) for a version document, rendering it
+    only the first time it is asked for"""
+    hostname = environ.get("SERVER_NAME")
+    port = environ.get("SERVER_PORT")
+    if 'HTTPS' in environ:
+        protocol = 'https'
+    else:
+        protocol = 'http'
+
+    key = (file, extension, protocol, hostname, port,
+           kwargs.get('RESOURCE_PATH'))
+    document = _DOCUMENTS.get(key)
+    if document is None:
+        resp_file = os.path.join(POSSIBLE_TOPDIR,
+            "keystone/content/%s.%s.tpl" % (file, extension))
+        body = template.template(resp_file,
+            PROTOCOL=protocol,
+            HOST=hostname,
+            PORT=port,
+            API_VERSION=version.API_VERSION,
+            API_VERSION_STATUS=version.API_VERSION_STATUS,
+            API_VERSION_DATE=version.API_VERSION_DATE,
+            **kwargs)
+        if isinstance(body, unicode):
+            body = body.encode('UTF-8')
+        document = (body, '"%s"' % hashlib.md5(body).hexdigest(),
+                    int(os.path.getmtime(resp_file)))
+        if len(_DOCUMENTS) >= MAX_DOCUMENTS:
+            _DOCUMENTS.clear()
+        _DOCUMENTS[key] = document
+    return document
+
+
+def document_response(req, status, content_type, document):
+    """Returns a response for document, or a 304 if req is conditional and
+    the client already has it"""
+    body, etag, mtime = document
+    resp = Response(status=status)
+    resp.charset = 'UTF-8'
+    resp.content_type = content_type
+    resp.headers['ETag'] = etag
+    resp.headers['Last-Modified'] = email_utils.formatdate(mtime,
+                                                           usegmt=True)
+    if static.is_not_modified(req, etag, mtime):
+        resp.status = "304 Not Modified"
+    else:
+        resp.body = body
+    return resp
+
 
 class VersionController(wsgi.Controller):
     """Controller for version related methods"""
@@ -45,37 +110,15 @@ class VersionController(wsgi.Controller):
 
     @utils.wrap_error
     def get_version_info(self, req, file="version"):
-        resp = Response()
-        resp.charset = 'UTF-8'
         if utils.is_xml_response(req):
-            resp_file = os.path.join(POSSIBLE_TOPDIR,
-                "keystone/content/%s.xml.tpl" % file)
-            resp.content_type = "application/xml"
+            extension, content_type = 'xml', "application/xml"
         elif utils.is_atom_response(req):
-            resp_file = os.path.join(POSSIBLE_TOPDIR,
-                "keystone/content/%s.atom.tpl" % file)
-            resp.content_type = "application/atom+xml"
-        else:
-            resp_file = os.path.join(POSSIBLE_TOPDIR,
-                "keystone/content/%s.json.tpl" % file)
-            resp.content_type = "application/json"
-
-        hostname = req.environ.get("SERVER_NAME")
-        port = req.environ.get("SERVER_PORT")
-        if 'HTTPS' in req.environ:
-            protocol = 'https'
+            extension, content_type = 'atom', "application/atom+xml"
         else:
-            protocol = 'http'
-
-        resp.unicode_body = template.template(resp_file,
-            PROTOCOL=protocol,
-            HOST=hostname,
-            PORT=port,
-            API_VERSION=version.API_VERSION,
-            API_VERSION_STATUS=version.API_VERSION_STATUS,
-            API_VERSION_DATE=version.API_VERSION_DATE)
+            extension, content_type = 'json', "application/json"
 
-        return resp
+        document = render_document(file, extension, req.environ)
+        return document_response(req, "200 OK", content_type, document)
 
     @utils.wrap_error
     def get_multiple_choice(self, req, file="multiple_choice", path=None):
@@ -89,32 +132,12 @@ class VersionController(wsgi.Controller):
         if path is None:
             path = ''
         logger.debug("300 Multiple Choices response: %s" % path)
-        resp = Response(status="300 Multiple Choices")
-        resp.charset = 'UTF-8'
         if utils.is_xml_response(req):
-            resp_file = os.path.join(POSSIBLE_TOPDIR,
-                "keystone/content/%s.xml.tpl" % file)
-            resp.content_type = "application/xml"
+            extension, content_type = 'xml', "application/xml"
         else:
-            resp_file = os.path.join(POSSIBLE_TOPDIR,
-                "keystone/content/%s.json.tpl" % file)
-            resp.content_type = "application/json"
-
-        hostname = req.environ.get("SERVER_NAME")
-        port = req.environ.get("SERVER_PORT")
-        if 'HTTPS' in req.environ:
-            protocol = 'https'
-        else:
-            protocol = 'http'
-
-        resp.unicode_body = template.template(resp_file,
-            PROTOCOL=protocol,
-            HOST=hostname,
-            PORT=port,
-            API_VERSION=version.API_VERSION,
-            API_VERSION_STATUS=version.API_VERSION_STATUS,
-            API_VERSION_DATE=version.API_VERSION_DATE,
-            RESOURCE_PATH=path
-            )
+            extension, content_type = 'json', "application/json"
 
-        return resp
+        document = render_document(file, extension, req.environ,
+                                   RESOURCE_PATH=path)
+        return document_response(req, "300 Multiple Choices", content_type,
+                                 document)
@@ -65,6 +65,14 @@ ACCEPT_HEADERS = {
 
 DEFAULT_RESPONSE_ENCODING = 'json'
 
+# Paths served without an API version
+UNVERSIONED_PATHS = frozenset(['/', ''])
+
+# Most (Accept, path suffix) pairs remembered by negotiate(). Clients send
+# few distinct Accept headers, but nothing stops them from sending more.
+MAX_NEGOTIATED = 256
+_NEGOTIATED = {}
+
 
 class NormalizingFilter(object):
     """Middleware filter to handle URL and Accept header normalization"""
@@ -73,70 +81,109 @@ class NormalizingFilter(object):
         # app is the next app in WSGI chain - eventually the OpenStack service
         self.app = app
         self.conf = conf
+        self.version_controller = None
 
     def __call__(self, env, start_response):
         # Inspect the request for mime type and API version
-        env = normalize_accept_header(env)
         env = normalize_path_prefix(env)
-        env = normalize_path_suffix(env)
-        env['PATH_INFO'] = normalize_starting_slash(env.get('PATH_INFO'))
-        env['PATH_INFO'] = normalize_trailing_slash(env['PATH_INFO'])
+        path_info, suffix = split_path_suffix(env['PATH_INFO'])
+        response_encoding, api_version = negotiate(env.get('HTTP_ACCEPT'),
+                                                   suffix)
+        # A version in the path takes precedence over the Accept header
+        if api_version and 'KEYSTONE_API_VERSION' not in env:
+            env['KEYSTONE_API_VERSION'] = api_version
+
+        env['PATH_INFO'] = normalize_trailing_slash(
+            normalize_starting_slash(path_info))
 
         # Fall back on defaults, if necessary
-        env['KEYSTONE_RESPONSE_ENCODING'] = env.get(
+        env['KEYSTONE_RESPONSE_ENCODING'] = response_encoding or env.get(
             'KEYSTONE_RESPONSE_ENCODING') or DEFAULT_RESPONSE_ENCODING
-        env['HTTP_ACCEPT'] = 'application/' + (env.get(
-            'KEYSTONE_RESPONSE_ENCODING') or DEFAULT_RESPONSE_ENCODING)
+        env['HTTP_ACCEPT'] = 'application/' + env['KEYSTONE_RESPONSE_ENCODING']
 
         if 'KEYSTONE_API_VERSION' not in env:
             # Version was not specified in path or headers
             # return multiple choice unless the version controller can handle
             # this request
-            if env['PATH_INFO'] not in ['/', '']:
-                from keystone.controllers.version import VersionController
-                controller = VersionController(options=None)
-                response = controller.get_multiple_choice(req=Request(env),
-                                file='multiple_choice')
-                return response(env, start_response)
+            if env['PATH_INFO'] not in UNVERSIONED_PATHS:
+                return self.multiple_choice(env, start_response)
 
         return self.app(env, start_response)
 
+    def multiple_choice(self, env, start_response):
+        """Returns a 300 Multiple Choices response for env"""
+        if self.version_controller is None:
+            from keystone.controllers.version import VersionController
+            self.version_controller = VersionController(options=None)
+        response = self.version_controller.get_multiple_choice(
+            req=Request(env), file='multiple_choice')
+        return response(env, start_response)
 
-def normalize_accept_header(env):
+
+def negotiate(accept_value, suffix=None):
+    """Returns the (RESPONSE_ENCODING, API_VERSION) requested by an Accept
+    header and a path suffix (e.g. '.xml'), either of which may be None.
+
+    The suffix takes precedence over the Accept header. Results are
+    memoized, as parsing Accept headers is comparatively expensive.
+    """
+    key = (accept_value, suffix)
+    result = _NEGOTIATED.get(key)
+    if result is None:
+        response_encoding, api_version = match_accept_header(accept_value)
+        if suffix:
+            response_encoding = PATH_SUFFIXES[suffix]
+        result = (response_encoding, api_version)
+        if len(_NEGOTIATED) >= MAX_NEGOTIATED:
+            _NEGOTIATED.clear()
+        _NEGOTIATED[key] = result
+    return result
+
+
+def match_accept_header(accept_value):
     """Matches the preferred Accept encoding to supported encodings.
 
-    Sets KEYSTONE_RESPONSE_ENCODING and KEYSTONE_API_VERSION, if appropriate.
+    Returns (RESPONSE_ENCODING, API_VERSION), either of which may be None.
 
     Note:: webob.acceptparse ignores ';version=' values
     """
-    accept_value = env.get('HTTP_ACCEPT')
-
-    if accept_value:
-        if accept_value in ACCEPT_HEADERS.keys():
-            #  Check for direct match first
-            best_accept = accept_value
-        else:
-            try:
-                accept = webob.acceptparse.Accept(accept_value)
-            except TypeError:
-                # Support `webob` v1.1 and older.
-                accept = webob.acceptparse.Accept('Accept', accept_value)
-
-            best_accept = accept.best_match(ACCEPT_HEADERS.keys())
-
-        if best_accept:
-            response_encoding, api_version = ACCEPT_HEADERS[best_accept]
-            logger.debug('%s header matched with %s (API=%s, TYPE=%s)',
-                         accept_value, best_accept, api_version,
-                         response_encoding)
-
-            if response_encoding:
-                env['KEYSTONE_RESPONSE_ENCODING'] = response_encoding
-
-            if api_version:
-                env['KEYSTONE_API_VERSION'] = api_version
-        else:
-            logger.debug('%s header could not be matched', accept_value)
+    if not accept_value:
+        return None, None
+
+    if accept_value in ACCEPT_HEADERS:
+        #  Check for direct match first
+        best_accept = accept_value
+    else:
+        try:
+            accept = webob.acceptparse.Accept(accept_value)
+        except TypeError:
+            # Support `webob` v1.1 and older.
+            accept = webob.acceptparse.Accept('Accept', accept_value)
+
+        best_accept = accept.best_match(ACCEPT_HEADERS.keys())
+
+    if not best_accept:
+        logger.debug('%s header could not be matched', accept_value)
+        return None, None
+
+    response_encoding, api_version = ACCEPT_HEADERS[best_accept]
+    logger.debug('%s header matched with %s (API=%s, TYPE=%s)',
+                 accept_value, best_accept, api_version, response_encoding)
+    return response_encoding, api_version
+
+
+def normalize_accept_header(env):
+    """Matches the preferred Accept encoding to supported encodings.
+
+    Sets KEYSTONE_RESPONSE_ENCODING and KEYSTONE_API_VERSION, if appropriate.
+    """
+    response_encoding, api_version = negotiate(env.get('HTTP_ACCEPT'))
+
+    if response_encoding:
+        env['KEYSTONE_RESPONSE_ENCODING'] = response_encoding
+
+    if api_version:
+        env['KEYSTONE_API_VERSION'] = api_version
 
     return env
 
@@ -155,17 +202,25 @@ def normalize_path_prefix(env):
     return env
 
 
+def split_path_suffix(path_info):
+    """Returns (path_info, suffix) for a path with a recognized suffix, and
+    (path_info, None) for any other path."""
+    for suffix in PATH_SUFFIXES:
+        if path_info.endswith(suffix):
+            return path_info[:-len(suffix)], suffix
+
+    return path_info, None
+
+
 def normalize_path_suffix(env):
     """Hnadles recognized PATH_INFO suffixes.
 
     Looks for a recognized suffix on the PATH_INFO, sets the
     KEYSTONE_RESPONSE_ENCODING accordingly, and removes the suffix to normalize
     the request."""
-    for suffix in PATH_SUFFIXES.keys():
-        if env['PATH_INFO'].endswith(suffix):
-            env['KEYSTONE_RESPONSE_ENCODING'] = PATH_SUFFIXES[suffix]
-            env['PATH_INFO'] = env['PATH_INFO'][:-len(suffix)]
-            break
+    env['PATH_INFO'], suffix = split_path_suffix(env['PATH_INFO'])
+    if suffix:
+        env['KEYSTONE_RESPONSE_ENCODING'] = PATH_SUFFIXES[suffix]
 
     return env
 
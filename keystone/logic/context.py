@@ -0,0 +1,66 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Request context for IdentityService calls
+
+A single API call can validate the same admin token and list the same
+user's global role grants several times (validate_service_admin_token ->
+has_service_admin_role -> has_admin_role, ...). IdentityService methods
+decorated with request_scoped share a RequestContext that remembers those
+results until the outermost decorated call returns.
+
+The current context is kept per green thread, so concurrent requests
+served by the same process never see each other's data.
+"""
+
+import functools
+
+from eventlet import corolocal
+
+_LOCAL = corolocal.local()
+
+
+class RequestContext(object):
+    """ Memoized lookups made while serving one request """
+
+    def __init__(self):
+        # token_id -> (token, user) for tokens that passed validation
+        self.tokens = {}
+        # user_id -> list of global role grants
+        self.global_grants = {}
+
+
+def get_current():
+    """ Returns the RequestContext of the request being served, or None """
+    return getattr(_LOCAL, 'context', None)
+
+
+def request_scoped(fnc):
+    """ Decorator that runs fnc inside a RequestContext.
+
+    Nested calls reuse the context of the outermost one, which is discarded
+    once that call returns or raises.
+    """
+    @functools.wraps(fnc)
+    def _wrapper(*args, **kwargs):
+        if get_current() is not None:
+            return fnc(*args, **kwargs)
+        _LOCAL.context = RequestContext()
+        try:
+            return fnc(*args, **kwargs)
+        finally:
+            _LOCAL.context = None
+    return _wrapper
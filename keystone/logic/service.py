@@ -18,8 +18,11 @@
 from datetime import datetime, timedelta
 import functools
 import logging
+import time
 import uuid
 
+from keystone.common import signing
+from keystone.logic import context
 from keystone.logic.types import auth, atom
 from keystone.logic.signer import Signer
 import keystone.backends as backends
@@ -35,6 +38,7 @@ from keystone import utils
 from keystone.models import Tenant, Token
 from keystone.models import Role, Roles
 from keystone.models import Service, Services
+from keystone.managers import cache
 from keystone.managers.token import Manager as TokenManager
 from keystone.managers.tenant import Manager as TenantManager
 from keystone.managers.user import Manager as UserManager
@@ -52,6 +56,7 @@ ADMIN_ROLE_NAME = None
 SERVICE_ADMIN_ROLE_ID = None
 SERVICE_ADMIN_ROLE_NAME = None
 GLOBAL_SERVICE_ID = None  # to facilitate global roles for validate tokens
+MAX_TOKENS_PER_VALIDATION = 1000  # for validate_tokens()
 
 LOG = logging.getLogger(__name__)
 
@@ -59,6 +64,7 @@ LOG = logging.getLogger(__name__)
 def admin_token_validator(fnc):
     """Decorator that applies the validate_admin_token() method."""
     @functools.wraps(fnc)
+    @context.request_scoped
     def _wrapper(self, token_id, *args, **kwargs):
         self.validate_admin_token(token_id)
         return fnc(self, token_id, *args, **kwargs)
@@ -68,6 +74,7 @@ def admin_token_validator(fnc):
 def service_admin_token_validator(fnc):
     """Decorator that applies the validate_service_admin_token() method."""
     @functools.wraps(fnc)
+    @context.request_scoped
     def _wrapper(self, token_id, *args, **kwargs):
         self.validate_service_admin_token(token_id)
         return fnc(self, token_id, *args, **kwargs)
@@ -86,7 +93,10 @@ class IdentityService(object):
 
         Loads all necessary backends to handle incoming requests.
         """
+        started = time.time()
         backends.configure_backends(options)
+        cache.configure(options)
+        configured = time.time()
         self.token_manager = TokenManager(options)
         self.tenant_manager = TenantManager(options)
         self.user_manager = UserManager(options)
@@ -96,6 +106,7 @@ class IdentityService(object):
         self.endpoint_template_manager = EndpointTemplateManager(options)
         self.endpoint_manager = EndpointManager(options)
         self.credential_manager = CredentialManager(options)
+        self.catalog_cache = cache.get_cache('catalog')
 
         global ADMIN_ROLE_NAME
         ADMIN_ROLE_NAME = options["keystone-admin-role"]
@@ -106,10 +117,20 @@ class IdentityService(object):
         global GLOBAL_SERVICE_ID
         GLOBAL_SERVICE_ID = options.get("global_service_id", "global")
 
+        # Sign tokens so that middleware can verify them offline
+        self.signing_keys = None
+        if options.get("token_signing_key_dir"):
+            self.signing_keys = signing.KeyRing(
+                options["token_signing_key_dir"])
+
         LOG.debug("init with ADMIN_ROLE_NAME=%s, SERVICE_ADMIN_ROLE_NAME=%s, "
                   "GLOBAL_SERVICE_ID=%s" % (ADMIN_ROLE_NAME,
                                             SERVICE_ADMIN_ROLE_NAME,
                                             GLOBAL_SERVICE_ID))
+        ready = time.time()
+        LOG.info("Identity service ready in %.3fs (%.3fs configuring "
+                 "backends, %.3fs loading managers and keys)" % (
+                 ready - started, configured - started, ready - configured))
 
     #
     #  Token Operations
@@ -225,11 +246,74 @@ class IdentityService(object):
             dtoken.tenant_id = tenant_id
             dtoken.expires = datetime.now() + timedelta(days=1)
             dtoken = self.token_manager.create(dtoken)
-        return self.get_auth_data(dtoken)
+        auth_data = self.get_auth_data(dtoken)
+        if self.signing_keys is not None:
+            try:
+                auth_data.token.id = self.sign_token(auth_data)
+            except signing.UnknownKey, e:
+                LOG.warn("Issuing unsigned token: %s" % e)
+        return auth_data
+
+    def sign_token(self, auth_data):
+        """ Returns a signed token id carrying the claims of auth_data (see
+        keystone.common.signing) """
+        tenant = auth_data.token.tenant
+        claims = {
+            'id': auth_data.token.id,
+            'expires': auth_data.token.expires.isoformat(),
+            'user': {'id': auth_data.user.id,
+                     'name': auth_data.user.username},
+            'tenant': {'id': tenant and tenant.id,
+                       'name': tenant and tenant.name},
+            'roles': [role.name for role in auth_data.user.rolegrants.values]}
+        return signing.sign(claims, self.signing_keys)
 
     @service_admin_token_validator
     def validate_token(self, admin_token, token_id, belongs_to=None,
                        service_ids=None):
+        result = self._validate_token_in_one_query(token_id, belongs_to,
+                                                   service_ids)
+        if result is not None:
+            return result
+        return self._validate_token_by_lookups(token_id, belongs_to,
+                                               service_ids)
+
+    @service_admin_token_validator
+    def validate_tokens(self, admin_token, token_ids, belongs_to=None,
+                        service_ids=None):
+        """Validates many tokens in one call.
+
+        Returns a TokenValidations with, for each token id, its ValidateData
+        or the fault validate_token() would have raised for it.
+        """
+        if len(token_ids) > MAX_TOKENS_PER_VALIDATION:
+            raise fault.BadRequestFault("Cannot validate more than %s tokens "
+                "at once" % MAX_TOKENS_PER_VALIDATION)
+
+        try:
+            data = self.token_manager.get_validation_data_for_all(
+                [token_id for token_id in token_ids if token_id])
+        except NotImplementedError:
+            data = None
+
+        results = []
+        for token_id in token_ids:
+            try:
+                if data is None:
+                    result = self._validate_token_by_lookups(token_id,
+                        belongs_to, service_ids)
+                else:
+                    result = self._to_validate_data(token_id,
+                        data.get(token_id), belongs_to, service_ids)
+            except fault.IdentityFault, e:
+                result = e
+            results.append((token_id, result))
+        return auth.TokenValidations(results)
+
+    def _validate_token_by_lookups(self, token_id, belongs_to=None,
+                                   service_ids=None):
+        """Same as validate_token(), looking up the token, user, tenants
+        and roles one at a time"""
         (token, user) = self._validate_token(token_id, belongs_to, True)
         if service_ids and (token.tenant_id or belongs_to):
             # scope token, validate the service IDs if present
@@ -248,7 +332,33 @@ class IdentityService(object):
         if not dtoken:
             raise fault.ItemNotFoundFault("Token not found")
 
-        self.token_manager.delete(token_id)
+        self.token_manager.revoke(token_id)
+        ctx = context.get_current()
+        if ctx is not None:
+            ctx.tokens.pop(token_id, None)
+
+    def revoke_tokens_for_user(self, user_id):
+        """Revokes all tokens of a user, e.g. when the user is disabled or
+        their password changes"""
+        self.token_manager.revoke_for_user(user_id)
+        ctx = context.get_current()
+        if ctx is not None:
+            for token_id, (_token, user) in ctx.tokens.items():
+                if user.id == user_id:
+                    del ctx.tokens[token_id]
+
+    @service_admin_token_validator
+    def get_revoked_tokens(self, admin_token, since=0):
+        """Returns the tokens revoked after the given revision of the
+        revocation list"""
+        try:
+            revision, drevoked = self.token_manager.get_revoked(since)
+        except NotImplementedError:
+            raise fault.ServiceUnavailableFault(
+                "The token backend does not keep a revocation list")
+        return auth.RevokedTokens(revision,
+            [(drevoked_token.token_id, drevoked_token.expires)
+             for drevoked_token in drevoked])
 
     @staticmethod
     def parse_service_ids(service_ids):
@@ -297,7 +407,7 @@ class IdentityService(object):
         user_id -- user ID
         """
         ts = []
-        drolegrants = self.grant_manager.list_global_roles_for_user(user_id)
+        drolegrants = self.list_global_grants_for_user(user_id)
         for drolegrant in drolegrants:
             drole = self.role_manager.get(drolegrant.role_id)
             ts.append(Role(drolegrant.role_id, drole.name,
@@ -367,8 +477,31 @@ class IdentityService(object):
         if not token_id:
             raise fault.UnauthorizedFault("Missing token")
 
-        (token, user) = self.get_token_info(token_id)
+        ctx = context.get_current()
+        if ctx is not None and token_id in ctx.tokens:
+            (token, user) = ctx.tokens[token_id]
+        else:
+            (token, user) = self.get_token_info(token_id)
+
+            self._check_token(token, user, is_check_token)
+
+            if user.tenant_id:
+                self.validate_tenant_by_id(user.tenant_id)
+
+            if token.tenant_id:
+                self.validate_tenant_by_id(token.tenant_id)
+
+            if ctx is not None:
+                ctx.tokens[token_id] = (token, user)
 
+        self._check_belongs_to(token, belongs_to)
+
+        return (token, user)
+
+    @staticmethod
+    def _check_token(token, user, is_check_token=None):
+        """ Raises the appropriate fault if a token does not exist, has
+        expired, or belongs to a disabled user """
         if not token:
             if is_check_token:
                 raise fault.ItemNotFoundFault("Token does not exist.")
@@ -386,16 +519,89 @@ class IdentityService(object):
             raise fault.UserDisabledFault("User %s has been disabled!"
                 % user.id)
 
-        if user.tenant_id:
-            self.validate_tenant_by_id(user.tenant_id)
-
-        if token.tenant_id:
-            self.validate_tenant_by_id(token.tenant_id)
-
+    @staticmethod
+    def _check_belongs_to(token, belongs_to):
         if belongs_to and unicode(token.tenant_id) != unicode(belongs_to):
             raise fault.UnauthorizedFault("Unauthorized on this tenant")
 
-        return (token, user)
+    def _validate_token_in_one_query(self, token_id, belongs_to=None,
+                                     service_ids=None):
+        """
+        Same as validate_token(), but fetches the token, user, tenants and
+        roles from the backend in one call.
+        Returns None if the backend doesn't support that, in which case the
+        caller should fall back to the regular lookups.
+        """
+        if not token_id:
+            raise fault.UnauthorizedFault("Missing token")
+
+        try:
+            data = self.token_manager.get_validation_data(token_id)
+        except NotImplementedError:
+            return None
+        return self._to_validate_data(token_id, data, belongs_to,
+                                      service_ids)
+
+    def _to_validate_data(self, token_id, data, belongs_to=None,
+                          service_ids=None):
+        """
+        Checks the token, user, tenants and roles fetched in one call by
+        TokenManager.get_validation_data() and returns the ValidateData
+        of the token.
+        """
+        if not token_id:
+            raise fault.UnauthorizedFault("Missing token")
+
+        if data is None:
+            self._check_token(None, None, True)
+        (dtoken, duser, dtenant, duser_tenant, tenant_roles,
+            global_roles) = data
+
+        self._check_token(dtoken, duser, True)
+
+        if duser.tenant_id:
+            self.validate_tenant(duser_tenant)
+
+        if dtoken.tenant_id:
+            self.validate_tenant(dtenant)
+
+        self._check_belongs_to(dtoken, belongs_to)
+
+        scoped = dtoken.tenant_id or belongs_to
+        if service_ids and scoped:
+            # scope token, validate the service IDs if present
+            service_ids = self.parse_service_ids(service_ids)
+            self.validate_service_ids(service_ids)
+
+        tenant = None
+        if dtoken.tenant_id:
+            tenant = auth.Tenant(id=dtenant.id, name=dtenant.name)
+        token = auth.Token(dtoken.expires, dtoken.id, tenant)
+
+        ts = [Role(drole.id, drole.name, None, drole.tenant_id)
+              for drole in tenant_roles]
+        if service_ids and ts:
+            # if service IDs are specified, filter roles by service IDs
+            sroles_names = self.get_roles_names_by_service_ids(service_ids)
+            ts = [role for role in ts if role.name in sroles_names]
+        if (not dtoken.tenant_id or not service_ids or
+                (GLOBAL_SERVICE_ID in service_ids)):
+            # return the global roles for unscoped tokens or
+            # its ID is in the service IDs
+            ts = ts + [Role(drole.id, drole.name, None, None)
+                       for drole in global_roles]
+
+        tenant_name = None
+        if duser.tenant_id:
+            tenant_name = duser_tenant.name
+
+        user = auth.User(duser.id, duser.name, duser.tenant_id,
+            tenant_name, Roles(ts, []))
+        if service_ids and scoped:
+            # we have service Ids and scope token, make sure we have some roles
+            if not user.rolegrants.values:
+                raise fault.UnauthorizedFault("No roles found for scope token")
+        return auth.ValidateData(token, user)
 
     def has_admin_role(self, token_id):
         """ Checks if the token belongs to a user who has Keystone admin
@@ -433,6 +639,7 @@ class IdentityService(object):
         else:
             return self.has_admin_role(token_id)
 
+    @context.request_scoped
     def validate_admin_token(self, token_id):
         """ Validates that the token belongs to a user who has Keystone admin
         rights. Raises an Unauthorized exception if not.
@@ -448,6 +655,7 @@ class IdentityService(object):
             raise fault.UnauthorizedFault(
                 "You are not authorized to make this call")
 
+    @context.request_scoped
     def validate_service_admin_token(self, token_id):
         """ Validates that the token belongs to a user who has Keystone admin
         or Keystone Service Admin rights. Raises an Unaithorized exception if
@@ -499,8 +707,7 @@ class IdentityService(object):
         user:   the user to be checked
         role:   the role to check that the user has
         """
-        for rolegrant in\
-                self.grant_manager.list_global_roles_for_user(user.id):
+        for rolegrant in self.list_global_grants_for_user(user.id):
             if ((rolegrant.role_id == role)
                     and rolegrant.tenant_id is None):
                 return True
@@ -508,6 +715,17 @@ class IdentityService(object):
                     (user.id, role))
         return False
 
+    def list_global_grants_for_user(self, user_id):
+        """ Returns the user's global role grants, listing them only once
+        per request """
+        ctx = context.get_current()
+        if ctx is None:
+            return self.grant_manager.list_global_roles_for_user(user_id)
+        if user_id not in ctx.global_grants:
+            ctx.global_grants[user_id] = \
+                self.grant_manager.list_global_roles_for_user(user_id)
+        return ctx.global_grants[user_id]
+
     # pylint: disable=W0613
     @staticmethod
     def is_owner(env, user, object):
@@ -546,20 +764,17 @@ class IdentityService(object):
         dtenant = self.tenant_manager.get_by_name(name=tenant_name)
         return self.validate_tenant(dtenant)
 
+    @context.request_scoped
     def get_auth_data(self, dtoken):
         """returns AuthData object for a token
 
         AuthData is used for rendering authentication responses
         """
         tenant = None
-        endpoints = None
 
         if dtoken.tenant_id:
             dtenant = self.tenant_manager.get(dtoken.tenant_id)
             tenant = auth.Tenant(id=dtenant.id, name=dtenant.name)
-            endpoints = self.tenant_manager.get_all_endpoints(dtoken.tenant_id)
-        else:
-            endpoints = self.tenant_manager.get_all_endpoints(None)
 
         token = auth.Token(dtoken.expires, dtoken.id, tenant)
         duser = self.user_manager.get(dtoken.user_id)
@@ -572,7 +787,7 @@ class IdentityService(object):
                 drole = self.role_manager.get(drolegrant.role_id)
                 ts.append(Role(drolegrant.role_id, drole.name,
                     description=drole.desc, tenant_id=drolegrant.tenant_id))
-        drolegrants = self.grant_manager.list_global_roles_for_user(duser.id)
+        drolegrants = self.list_global_grants_for_user(duser.id)
         for drolegrant in drolegrants:
             drole = self.role_manager.get(drolegrant.role_id)
             ts.append(Role(drolegrant.role_id, drole.name,
@@ -583,7 +798,22 @@ class IdentityService(object):
             url_types = ['admin', 'internal', 'public']
         else:
             url_types = ['internal', 'public']
-        return auth.AuthData(token, user, endpoints, url_types=url_types)
+        catalog = self.get_catalog(tenant and tenant.id, url_types)
+        return auth.AuthData(token, user, url_types=url_types,
+                             catalog=catalog)
+
+    def get_catalog(self, tenant_id, url_types):
+        """returns the compiled service catalog for a tenant
+
+        Catalogs are cached per (tenant, url types) until an endpoint
+        template, endpoint or service changes.
+        """
+        def compile_catalog():
+            endpoints = self.tenant_manager.get_all_endpoints(tenant_id)
+            return auth.AuthData.compile_catalog(endpoints, url_types,
+                tenant_id, self.service_manager.get)
+        key = (cache.get_version('catalog'), tenant_id, tuple(url_types))
+        return self.catalog_cache.get(key, compile_catalog)
 
     def get_validate_data(self, dtoken, duser, service_ids=None):
         """return ValidateData object for a token/user pair"""
@@ -643,6 +873,7 @@ class IdentityService(object):
         dtenant.enabled = tenant.enabled
         return self.tenant_manager.create(dtenant)
 
+    @context.request_scoped
     def get_tenants(self, admin_token, marker, limit, url,
                     is_service_operation=False):
         """Fetch tenants for either an admin or service operation."""
@@ -875,6 +1106,7 @@ class IdentityService(object):
         values = {'id': user_id, 'password': user.password}
 
         self.user_manager.update(values)
+        self.revoke_tokens_for_user(user_id)
 
         return User_Update(password=user.password)
 
@@ -889,6 +1121,8 @@ class IdentityService(object):
         values = {'id': user_id, 'enabled': user.enabled}
 
         self.user_manager.update(values)
+        if not user.enabled:
+            self.revoke_tokens_for_user(user_id)
 
         duser = self.user_manager.get(user_id)
 
@@ -916,6 +1150,7 @@ class IdentityService(object):
         self.user_manager.delete(user_id)
         return None
 
+    @context.request_scoped
     def create_role(self, admin_token, role):
         user = self.validate_service_admin_token(admin_token)[1]
 
@@ -961,6 +1196,7 @@ class IdentityService(object):
         drole.desc = role.description
         drole.service_id = role.service_id
         drole = self.role_manager.create(drole)
+        self.role_manager.invalidate_cache()
         role.id = drole.id
         return role
 
@@ -1001,6 +1237,7 @@ class IdentityService(object):
         return Role(drole.id, drole.name,
             drole.desc, drole.service_id)
 
+    @context.request_scoped
     def delete_role(self, admin_token, role_id):
         user = self.validate_service_admin_token(admin_token)[1]
 
@@ -1023,6 +1260,7 @@ class IdentityService(object):
             for rolegrant in rolegrants:
                 self.grant_manager.rolegrant_delete(rolegrant.id)
         self.role_manager.delete(role_id)
+        self.role_manager.invalidate_cache()
 
     @service_admin_token_validator
     def add_role_to_user(self, admin_token, user_id, role_id, tenant_id=None):
@@ -1086,6 +1324,7 @@ class IdentityService(object):
         links = self.get_links(url, prev, next, limit)
         return Roles(ts, links)
 
+    @context.request_scoped
     def add_endpoint_template(self, admin_token, endpoint_template):
         user = self.validate_service_admin_token(admin_token)[1]
 
@@ -1124,9 +1363,11 @@ class IdentityService(object):
         dendpoint_template.version_info = endpoint_template.version_info
         dendpoint_template = self.endpoint_template_manager.create(
                 dendpoint_template)
+        self.endpoint_template_manager.invalidate_cache()
         endpoint_template.id = dendpoint_template.id
         return endpoint_template
 
+    @context.request_scoped
     def modify_endpoint_template(self, admin_token, endpoint_template_id,
                                  endpoint_template):
         user = self.validate_service_admin_token(admin_token)[1]
@@ -1157,18 +1398,21 @@ class IdentityService(object):
                     "You do not have ownership of the '%s' service" \
                     % dservice.name)
 
-        dendpoint_template.region = endpoint_template.region
-        dendpoint_template.service_id = dservice.id
-        dendpoint_template.public_url = endpoint_template.public_url
-        dendpoint_template.admin_url = endpoint_template.admin_url
-        dendpoint_template.internal_url = endpoint_template.internal_url
-        dendpoint_template.enabled = endpoint_template.enabled
-        dendpoint_template.is_global = endpoint_template.is_global
-        dendpoint_template.version_id = endpoint_template.version_id
-        dendpoint_template.version_list = endpoint_template.version_list
-        dendpoint_template.version_info = endpoint_template.version_info
-        dendpoint_template = self.endpoint_template_manager.update(
-                dendpoint_template)
+        # dendpoint_template may be shared through the cache, so it is left
+        # alone and the new values are passed to the update instead
+        dendpoint_template = self.endpoint_template_manager.update({
+            'id': dendpoint_template.id,
+            'region': endpoint_template.region,
+            'service_id': dservice.id,
+            'public_url': endpoint_template.public_url,
+            'admin_url': endpoint_template.admin_url,
+            'internal_url': endpoint_template.internal_url,
+            'enabled': endpoint_template.enabled,
+            'is_global': endpoint_template.is_global,
+            'version_id': endpoint_template.version_id,
+            'version_list': endpoint_template.version_list,
+            'version_info': endpoint_template.version_info})
+        self.endpoint_template_manager.invalidate_cache()
         return EndpointTemplate(
             dendpoint_template.id,
             dendpoint_template.region,
@@ -1184,6 +1428,7 @@ class IdentityService(object):
             dendpoint_template.version_info
             )
 
+    @context.request_scoped
     def delete_endpoint_template(self, admin_token, endpoint_template_id):
         user = self.validate_service_admin_token(admin_token)[1]
         dendpoint_template = self.endpoint_template_manager.get(
@@ -1214,6 +1459,7 @@ class IdentityService(object):
             for endpoint in endpoints:
                 self.endpoint_manager.delete(endpoint.id)
         self.endpoint_template_manager.delete(endpoint_template_id)
+        self.endpoint_template_manager.invalidate_cache()
 
     @service_admin_token_validator
     def get_endpoint_templates(self, admin_token, marker, limit, url):
@@ -1382,6 +1628,7 @@ class IdentityService(object):
         dservice.desc = service.description
         dservice.owner_id = user.id
         dservice = self.service_manager.create(dservice)
+        self.service_manager.invalidate_cache()
         service.id = dservice.id
 
         return service
@@ -1441,6 +1688,9 @@ class IdentityService(object):
                         self.grant_manager.rolegrant_delete(rolegrant.id)
                 self.role_manager.delete(role.id)
         self.service_manager.delete(service_id)
+        self.endpoint_template_manager.invalidate_cache()
+        self.role_manager.invalidate_cache()
+        self.service_manager.invalidate_cache()
 
     @admin_token_validator
     def get_credentials(self, admin_token, user_id, marker, limit, url):
@@ -1488,6 +1738,7 @@ class IdentityService(object):
         values = {'id': user_id, 'password': password_credentials.password,
             'name': password_credentials.user_name}
         self.user_manager.update(values)
+        self.revoke_tokens_for_user(user_id)
         duser = self.user_manager.get(user_id)
         return PasswordCredentials(duser.name, duser.password)
 
@@ -1514,6 +1765,7 @@ class IdentityService(object):
         values = {'id': user_id, 'password': password_credentials.password,
             'name': password_credentials.user_name}
         self.user_manager.update(values)
+        self.revoke_tokens_for_user(user_id)
         duser = self.user_manager.get(user_id)
         return PasswordCredentials(duser.name, duser.password)
 
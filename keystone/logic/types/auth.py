@@ -305,9 +305,14 @@ class AuthData(object):
         without elevated privileges, the "adminURL" is not returned. The
         url_types paramater in the initializer lists the types to return.
         The actual authorization is done in logic/service.py
+
+        The catalog is either passed in already compiled (see
+        compile_catalog) or compiled from base_urls, looking services up
+        with get_service, which defaults to the backend's SERVICE.get.
     """
 
-    def __init__(self, token, user, base_urls=None, url_types=None):
+    def __init__(self, token, user, base_urls=None, url_types=None,
+                 get_service=None, catalog=None):
         self.token = token
         self.user = user
         self.base_urls = base_urls
@@ -315,9 +320,62 @@ class AuthData(object):
             self.url_types = ["internal", "public", "admin"]
         else:
             self.url_types = url_types
-        self.d = {}
-        if self.base_urls is not None:
-            self.__convert_baseurls_to_dict()
+        if catalog is None and self.base_urls:
+            tenant_id = self.token.tenant.id if self.token.tenant else None
+            catalog = self.compile_catalog(self.base_urls, self.url_types,
+                tenant_id, get_service or db_api.SERVICE.get)
+        self.catalog = catalog
+
+    @staticmethod
+    def compile_catalog(base_urls, url_types, tenant_id, get_service):
+        """Builds the service catalog for a tenant.
+
+        Returns a tuple of (service name, service type, endpoints) tuples,
+        where each endpoint is a tuple of (attribute, value) pairs ready to
+        be rendered, or None if there are no base_urls at all. The result
+        depends only on its arguments, so it can be cached and shared
+        between responses.
+        """
+        if not base_urls:
+            return None
+
+        by_service = {}
+        for base_url in base_urls:
+            if base_url.service_id not in by_service:
+                by_service[base_url.service_id] = list()
+            by_service[base_url.service_id].append(base_url)
+
+        catalog = []
+        for service_id, service_base_urls in by_service.items():
+            endpoints = []
+            for base_url in service_base_urls:
+                urls = []
+                for url_kind in url_types:
+                    base_url_item = getattr(base_url, url_kind + "_url")
+                    if base_url_item:
+                        if '%tenant_id%' in base_url_item:
+                            if tenant_id:
+                                # Don't return tenant endpoints if token
+                                # not scoped to a tenant
+                                urls.append((url_kind + "URL",
+                                    base_url_item.replace('%tenant_id%',
+                                                          str(tenant_id))))
+                        else:
+                            urls.append((url_kind + "URL", base_url_item))
+                if urls:
+                    endpoint = [("region", base_url.region)] \
+                        if base_url.region else []
+                    endpoint.extend(urls)
+                    endpoint.append(("id", str(base_url.id)))
+                    endpoints.append(tuple(endpoint))
+            if endpoints:
+                dservice = get_service(service_id)
+                if not dservice:
+                    raise fault.ItemNotFoundFault(
+                        "The service could not be found for" + str(service_id))
+                catalog.append((dservice.name, dservice.type,
+                                tuple(endpoints)))
+        return tuple(catalog)
 
     def to_xml(self):
         dom = etree.Element("access",
@@ -340,48 +398,17 @@ class AuthData(object):
         if self.user.rolegrants is not None:
             user.append(self.user.rolegrants.to_dom())
 
-        if self.base_urls is not None or len(self.base_urls) > 0:
-            service_catalog = etree.Element("serviceCatalog")
-            for key, key_base_urls in self.d.items():
-                dservice = db_api.SERVICE.get(key)
-                if not dservice:
-                    raise fault.ItemNotFoundFault(
-                        "The service could not be found")
-                service = etree.Element("service",
-                                 name=dservice.name, type=dservice.type)
-                for base_url in key_base_urls:
-                    include_this_endpoint = False
-                    endpoint = etree.Element("endpoint")
-                    if base_url.region:
-                        endpoint.set("region", base_url.region)
-                    for url_kind in self.url_types:
-                        base_url_item = getattr(base_url, url_kind + "_url")
-                        if base_url_item:
-                            if '%tenant_id%' in base_url_item:
-                                if self.token.tenant:
-                                    # Don't return tenant endpoints if token
-                                    # not scoped to a tenant
-                                    endpoint.set(url_kind + "URL",
-                                        base_url_item.replace('%tenant_id%',
-                                        str(self.token.tenant.id)))
-                                    include_this_endpoint = True
-                            else:
-                                endpoint.set(url_kind + "URL", base_url_item)
-                                include_this_endpoint = True
-                    if include_this_endpoint:
-                        endpoint.set("id", str(base_url.id))
-                        service.append(endpoint)
-                if service.find("endpoint") is not None:
-                    service_catalog.append(service)
-            dom.append(service_catalog)
+        service_catalog = etree.SubElement(dom, "serviceCatalog")
+        if self.catalog is not None:
+            for name, type, endpoints in self.catalog:
+                service = etree.SubElement(service_catalog, "service",
+                                           name=name, type=type)
+                for attributes in endpoints:
+                    endpoint = etree.SubElement(service, "endpoint")
+                    for key, value in attributes:
+                        endpoint.set(key, value)
         return etree.tostring(dom)
 
-    def __convert_baseurls_to_dict(self):
-        for base_url in self.base_urls:
-            if base_url.service_id not in self.d:
-                self.d[base_url.service_id] = list()
-            self.d[base_url.service_id].append(base_url)
-
     def to_json(self):
         token = {}
         token["id"] = self.token.id
@@ -399,43 +426,11 @@ class AuthData(object):
         if self.user.rolegrants is not None:
             auth['user']["roles"] = self.user.rolegrants.to_json_values()
 
-        if self.base_urls is not None and len(self.base_urls) > 0:
-            service_catalog = []
-            for key, key_base_urls in self.d.items():
-                service = {}
-                endpoints = []
-                for base_url in key_base_urls:
-                    include_this_endpoint = False
-                    endpoint = {}
-                    if base_url.region:
-                        endpoint["region"] = base_url.region
-                    for url_kind in self.url_types:
-                        base_url_item = getattr(base_url, url_kind + "_url")
-                        if base_url_item:
-                            if '%tenant_id%' in base_url_item:
-                                if self.token.tenant:
-                                    # Don't return tenant endpoints if token
-                                    # not scoped to a tenant
-                                    endpoint[url_kind + "URL"] = \
-                                    base_url_item.replace('%tenant_id%',
-                                            str(self.token.tenant.id))
-                                    include_this_endpoint = True
-                            else:
-                                endpoint[url_kind + "URL"] = base_url_item
-                                include_this_endpoint = True
-                    if include_this_endpoint:
-                        endpoint['id'] = str(base_url.id)
-                        endpoints.append(endpoint)
-                        dservice = db_api.SERVICE.get(key)
-                        if not dservice:
-                            raise fault.ItemNotFoundFault(
-                            "The service could not be found for" + str(key))
-                if len(endpoints):
-                    service["name"] = dservice.name
-                    service["type"] = dservice.type
-                    service["endpoints"] = endpoints
-                    service_catalog.append(service)
-            auth["serviceCatalog"] = service_catalog
+        if self.catalog is not None:
+            auth["serviceCatalog"] = [
+                {"name": name, "type": type,
+                 "endpoints": [dict(attributes) for attributes in endpoints]}
+                for name, type, endpoints in self.catalog]
         ret = {}
         ret["access"] = auth
         return json.dumps(ret)
@@ -451,7 +446,7 @@ class ValidateData(object):
         self.token = token
         self.user = user
 
-    def to_xml(self):
+    def to_dom(self):
         dom = etree.Element("access",
             xmlns="http://docs.openstack.org/identity/api/v2.0")
 
@@ -479,9 +474,12 @@ class ValidateData(object):
 
         dom.append(token)
         dom.append(user)
-        return etree.tostring(dom)
+        return dom
 
-    def to_json(self):
+    def to_xml(self):
+        return etree.tostring(self.to_dom())
+
+    def to_dict(self):
         token = {
             "id": unicode(self.token.id),
             "expires": self.token.expires.isoformat()}
@@ -505,7 +503,111 @@ class ValidateData(object):
         if self.user.rolegrants is not None:
             user["roles"] = self.user.rolegrants.to_json_values()
 
-        return json.dumps({
+        return {
             "access": {
                 "token": token,
-                "user": user}})
+                "user": user}}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+class RevokedTokens(object):
+    """Tokens revoked after a given revision of the revocation list.
+
+        tokens is a list of (token_id, expires) tuples. Clients remember
+        the revision and pass it back to only fetch later revocations.
+    """
+
+    def __init__(self, revision, tokens):
+        self.revision = revision
+        self.tokens = tokens
+
+    def to_xml(self):
+        dom = etree.Element("revokedTokens",
+            xmlns="http://docs.openstack.org/identity/api/v2.0",
+            revision=unicode(self.revision))
+        for token_id, expires in self.tokens:
+            dom.append(etree.Element("token", id=unicode(token_id),
+                expires=expires.isoformat()))
+        return etree.tostring(dom)
+
+    def to_json(self):
+        return json.dumps({
+            "revokedTokens": {
+                "revision": self.revision,
+                "tokens": [{"id": unicode(token_id),
+                            "expires": expires.isoformat()}
+                           for token_id, expires in self.tokens]}})
+
+
+class TokenIds(object):
+    """The ids of the tokens to validate in one call."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    @staticmethod
+    def from_xml(xml_str):
+        try:
+            dom = etree.Element("root")
+            dom.append(etree.fromstring(xml_str))
+            root = dom.find("{http://docs.openstack.org/identity/api/v2.0}"
+                            "tokens")
+            if root is None:
+                raise fault.BadRequestFault("Expecting tokens")
+            ids = []
+            for token in root.findall(
+                    "{http://docs.openstack.org/identity/api/v2.0}token"):
+                token_id = token.get("id")
+                utils.check_empty_string(token_id, "Expecting a token id.")
+                ids.append(token_id)
+            return TokenIds(ids)
+        except etree.LxmlError as e:
+            raise fault.BadRequestFault("Cannot parse tokens", str(e))
+
+    @staticmethod
+    def from_json(json_str):
+        try:
+            obj = json.loads(json_str)
+            if not "tokens" in obj:
+                raise fault.BadRequestFault("Expecting tokens")
+            ids = []
+            for token in obj["tokens"]:
+                if not "id" in token:
+                    raise fault.BadRequestFault("Expecting a token id.")
+                utils.check_empty_string(token["id"],
+                                         "Expecting a token id.")
+                ids.append(token["id"])
+            return TokenIds(ids)
+        except (ValueError, TypeError) as e:
+            raise fault.BadRequestFault("Cannot parse tokens", str(e))
+
+
+class TokenValidations(object):
+    """The outcome of validating several tokens in one call.
+
+        results is a list of (token_id, result) tuples where result is
+        either the ValidateData of a valid token or the fault validating
+        that token on its own would have raised.
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    def to_xml(self):
+        dom = etree.Element("validations",
+            xmlns="http://docs.openstack.org/identity/api/v2.0")
+        for token_id, result in self.results:
+            validation = etree.Element("validation", id=unicode(token_id))
+            validation.append(result.to_dom())
+            dom.append(validation)
+        return etree.tostring(dom)
+
+    def to_json(self):
+        validations = []
+        for token_id, result in self.results:
+            validation = result.to_dict()
+            validation["id"] = unicode(token_id)
+            validations.append(validation)
+        return json.dumps({"validations": validations})
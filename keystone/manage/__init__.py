@@ -27,11 +27,9 @@ import logging
 import optparse  # deprecated in 2.7, in favor of argparse
 
 from keystone import version
-import keystone.backends as db
-from keystone.backends.sqlalchemy import migration
 from keystone.common import config
-from keystone.logic.types import fault
-from keystone.manage import api
+# The backends (and sqlalchemy, lxml, eventlet... with them) are imported by
+# the functions that use them, so that usage errors are reported quickly
 
 
 logger = logging.getLogger(__name__)
@@ -42,7 +40,7 @@ OBJECTS = ['user', 'tenant', 'role', 'service',
     'endpointTemplates', 'token', 'endpoint', 'credentials', 'database']
 ACTIONS = ['add', 'list', 'disable', 'delete', 'grant', 'revoke',
     'sync', 'downgrade', 'upgrade', 'version_control', 'version',
-    'goto']
+    'goto', 'flush']
 
 
 # Messages
@@ -71,6 +69,7 @@ def parse_args(args=None):
         tokens   : user, tenant, expiration
 
       role list [tenant] will list roles granted on that tenant
+      token flush [batch size] will delete all expired tokens
       database [sync | downgrade | upgrade | version_control | version]
 
     options
@@ -93,6 +92,7 @@ def parse_args(args=None):
     config.setup_logging(options, conf)
 
     if not args or args[0] != 'database':
+        import keystone.backends as db
         db.configure_backends(conf.global_conf)
 
     return args
@@ -114,6 +114,8 @@ def get_options(args=None):
 
 
 def process(*args):
+    from keystone.manage import api
+
     # Check arguments
     if len(args) == 0:
         raise optparse.OptParseError(OBJECT_NOT_SPECIFIED)
@@ -129,7 +131,8 @@ def process(*args):
         if action not in ACTIONS:
             raise optparse.OptParseError(SUPPORTED_ACTIONS)
 
-    if action not in ['list', 'sync', 'version_control', 'version']:
+    if action not in ['list', 'sync', 'version_control', 'version',
+                      'flush']:
         if len(args) == 2:
             raise optparse.OptParseError(ID_NOT_SPECIFIED)
         else:
@@ -258,6 +261,16 @@ def process(*args):
         if api.delete_token(token=object_id):
             print 'SUCCESS: Token %s deleted.' % (object_id,)
 
+    elif (object_type, action) == ('token', 'flush'):
+        batch_size = optional_arg(args, 2)
+        if batch_size is not None:
+            try:
+                batch_size = int(batch_size)
+            except ValueError:
+                raise optparse.OptParseError('Batch size must be a number')
+        print 'SUCCESS: %s expired tokens deleted.' % (
+            api.flush_tokens(batch_size=batch_size),)
+
     elif object_type == 'token':
         raise optparse.OptParseError(ACTION_NOT_SUPPORTED % ('tokens'))
 
@@ -364,11 +377,13 @@ def process(*args):
 #
 def do_db_version(options):
     """Print database's current migration level"""
+    from keystone.backends.sqlalchemy import migration
     print migration.db_version(options)
 
 
 def do_db_goto_version(options, version):
     """Override the database's current migration level"""
+    from keystone.backends.sqlalchemy import migration
     if migration.db_goto_version(options, version):
         msg = ('Jumped to version=%s (without performing intermediate '
             'migrations)') % version
@@ -377,6 +392,7 @@ def do_db_goto_version(options, version):
 
 def do_db_upgrade(options, args):
     """Upgrade the database's migration level"""
+    from keystone.backends.sqlalchemy import migration
     try:
         db_version = args[2]
     except IndexError:
@@ -388,6 +404,7 @@ def do_db_upgrade(options, args):
 
 def do_db_downgrade(options, args):
     """Downgrade the database's migration level"""
+    from keystone.backends.sqlalchemy import migration
     try:
         db_version = args[2]
     except IndexError:
@@ -398,12 +415,14 @@ def do_db_downgrade(options, args):
 
 def do_db_version_control(options):
     """Place a database under migration control"""
+    from keystone.backends.sqlalchemy import migration
     migration.version_control(options)
     print "Database now under version control"
 
 
 def do_db_sync(options, args):
     """Place a database under migration control and upgrade"""
+    from keystone.backends.sqlalchemy import migration
     try:
         db_version = args[2]
     except IndexError:
@@ -468,6 +487,8 @@ class Table:
 
 
 def main(args=None):
+    from keystone.logic.types import fault
+
     try:
         process(*parse_args(args))
     except (optparse.OptParseError, fault.DatabaseMigrationError) as exc:
@@ -2,6 +2,7 @@ import datetime
 
 import keystone.backends.api as db_api
 import keystone.backends.models as db_models
+from keystone.managers import token as token_manager
 import keystone.models as models
 
 
@@ -179,6 +180,12 @@ def delete_token(token):
     return db_api.TOKEN.delete(token)
 
 
+def flush_tokens(batch_size=None):
+    manager = token_manager.Manager({})
+    return manager.delete_expired(batch_size or
+                                  token_manager.FLUSH_BATCH_SIZE)
+
+
 def add_service(name, type, desc, owner_id):
     obj = models.Service()
     obj.name = name
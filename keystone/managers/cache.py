@@ -0,0 +1,187 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright (C) 2011 OpenStack LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" In-process cache for rarely changing identity data
+
+Roles, services and endpoint templates are read on almost every request but
+hardly ever written. Their managers keep lookups in a named Cache from this
+module so that all IdentityService instances in the process share them.
+
+The caches are off unless enabled in keystone.conf::
+
+    identity_cache_enabled = True
+    identity_cache_size = 1000      # max entries per cache
+    identity_cache_ttl = 300        # seconds
+
+The service catalog compiled for each (tenant, url types) pair is cached the
+same way, keyed by the 'catalog' version counter which the endpoint template,
+endpoint and service managers bump on every write.
+
+Writes going through IdentityService invalidate the affected cache. Writes
+made by other processes (keystone-manage, other servers) are picked up when
+the entries expire.
+
+The 'password' cache, used by the user manager to remember recently verified
+passwords, has its own settings::
+
+    password_cache_enabled = True
+    password_cache_ttl = 60         # seconds
+"""
+
+import logging
+import time
+
+from keystone.common import config
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SIZE = 1000
+DEFAULT_TTL = 300
+DEFAULT_PASSWORD_TTL = 60
+
+ENABLED = False
+SIZE = DEFAULT_SIZE
+TTL = DEFAULT_TTL
+
+_CACHES = {}
+_VERSIONS = {}
+
+
+class Cache(object):
+    """ A bounded, expiring key/value cache that counts hits and misses """
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        # When not None, these override the identity_cache_* settings
+        self.enabled = None
+        self.ttl = None
+
+    def is_enabled(self):
+        return ENABLED if self.enabled is None else self.enabled
+
+    def get(self, key, loader):
+        """ Returns the cached value for key, calling loader() to fetch (and
+        cache) it on a miss. None is never cached. """
+        if not self.is_enabled():
+            return loader()
+
+        value = self.peek(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def peek(self, key):
+        """ Returns the cached value for key, or None """
+        if not self.is_enabled():
+            return None
+
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.time():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        if not self.is_enabled():
+            return
+        now = time.time()
+        if key not in self._data and len(self._data) >= SIZE:
+            self._evict(now)
+        self._data[key] = (now + (TTL if self.ttl is None else self.ttl),
+                           value)
+
+    def discard(self, key):
+        """ Drops the entry for key, if any """
+        self._data.pop(key, None)
+
+    def _evict(self, now):
+        """ Drops expired entries, or the oldest one if none have expired """
+        expired = [key for key, entry in self._data.iteritems()
+                   if entry[0] <= now]
+        for key in expired:
+            del self._data[key]
+        if not expired and self._data:
+            oldest = min(self._data, key=lambda k: self._data[k][0])
+            del self._data[oldest]
+
+    def invalidate(self):
+        """ Drops all entries """
+        LOG.debug("Invalidating '%s' cache" % self.name)
+        self._data.clear()
+
+    def stats(self):
+        return {'name': self.name, 'size': len(self._data),
+                'hits': self.hits, 'misses': self.misses}
+
+
+def get_cache(name):
+    """ Returns the process-wide cache with the given name """
+    if name not in _CACHES:
+        _CACHES[name] = Cache(name)
+    return _CACHES[name]
+
+
+def get_stats():
+    """ Returns a list of {name, size, hits, misses} for every cache """
+    return [_CACHES[name].stats() for name in sorted(_CACHES)]
+
+
+def get_version(name):
+    """ Returns the current value of the named version counter.
+
+    Caches of data derived from several sources (e.g. the service catalog)
+    include the version in their keys, and the managers of those sources
+    call bump_version() once each write is done, so stale entries are never
+    hit.
+    """
+    return _VERSIONS.get(name, 0)
+
+
+def bump_version(name):
+    _VERSIONS[name] = _VERSIONS.get(name, 0) + 1
+
+
+def invalidate_all():
+    for cache in _CACHES.values():
+        cache.invalidate()
+
+
+def configure(options):
+    """ Reads the identity_cache_* and password_cache_* settings and empties
+    all caches """
+    global ENABLED, SIZE, TTL
+    ENABLED = config.get_option(options, 'identity_cache_enabled',
+                                type='bool', default=False)
+    SIZE = config.get_option(options, 'identity_cache_size', type='int',
+                             default=DEFAULT_SIZE)
+    TTL = config.get_option(options, 'identity_cache_ttl', type='int',
+                            default=DEFAULT_TTL)
+    password_cache = get_cache('password')
+    password_cache.enabled = config.get_option(options,
+        'password_cache_enabled', type='bool', default=False)
+    password_cache.ttl = config.get_option(options, 'password_cache_ttl',
+                                           type='int',
+                                           default=DEFAULT_PASSWORD_TTL)
+    invalidate_all()
+    LOG.debug("Identity cache enabled=%s, size=%s, ttl=%s" % (ENABLED, SIZE,
+                                                              TTL))
@@ -19,6 +19,7 @@
 import logging
 
 import keystone.backends.api as api
+from keystone.managers import cache
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +36,10 @@ class Manager(object):
 
     def delete(self, endpoint_id):
         """ Delete Endpoint """
-        self.driver.endpoint_delete(endpoint_id)
+        try:
+            self.driver.endpoint_delete(endpoint_id)
+        finally:
+            cache.bump_version('catalog')
 
     def endpoint_get_by_tenant_get_page(self, tenant_id, marker, limit):
         """ Get endpoints by tenant """
@@ -49,7 +53,10 @@ class Manager(object):
 
     def create(self, endpoint):
         """ Create a new Endpoint """
-        return self.driver.endpoint_add(endpoint)
+        try:
+            return self.driver.endpoint_add(endpoint)
+        finally:
+            cache.bump_version('catalog')
 
     def get(self, endpoint_id):
         """ Returns Endpoint by ID """
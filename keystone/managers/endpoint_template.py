@@ -19,6 +19,7 @@
 import logging
 
 import keystone.backends.api as api
+from keystone.managers import cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +28,19 @@ class Manager(object):
     def __init__(self, options):
         self.options = options
         self.driver = api.ENDPOINT_TEMPLATE
+        self.cache = cache.get_cache('endpoint_template')
 
     def create(self, endpoint_template):
         """ Create a new Endpoint Template """
-        return self.driver.create(endpoint_template)
+        try:
+            return self.driver.create(endpoint_template)
+        finally:
+            cache.bump_version('catalog')
 
     def get(self, endpoint_template_id):
         """ Returns Endpoint Template by ID """
-        return self.driver.get(endpoint_template_id)
+        return self.cache.get(('get', endpoint_template_id),
+            lambda: self.driver.get(endpoint_template_id))
 
     def get_page(self, marker, limit):
         """ Get one page of endpoint template list """
@@ -46,7 +52,8 @@ class Manager(object):
 
     def get_by_service(self, service_id):
         """ Returns Endpoint Templates by service """
-        return self.driver.get_by_service(service_id)
+        return self.cache.get(('get_by_service', service_id),
+            lambda: self.driver.get_by_service(service_id))
 
     def get_by_service_get_page(self, service_id, marker, limit):
         """ Get one page of endpoint templates by service"""
@@ -59,8 +66,19 @@ class Manager(object):
 
     def update(self, endpoint_template):
         """ Update Endpoint Template """
-        return self.driver.update(endpoint_template['id'], endpoint_template)
+        try:
+            return self.driver.update(endpoint_template['id'],
+                                      endpoint_template)
+        finally:
+            cache.bump_version('catalog')
 
     def delete(self, endpoint_template_id):
         """ Delete Endpoint Template """
-        self.driver.delete(endpoint_template_id)
+        try:
+            self.driver.delete(endpoint_template_id)
+        finally:
+            cache.bump_version('catalog')
+
+    def invalidate_cache(self):
+        """ Drop cached endpoint templates after a write """
+        self.cache.invalidate()
@@ -19,6 +19,7 @@
 import logging
 
 import keystone.backends.api as api
+from keystone.managers import cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,7 @@ class Manager(object):
     def __init__(self, options):
         self.options = options
         self.driver = api.ROLE
+        self.cache = cache.get_cache('role')
 
     def create(self, role):
         """ Create a new role """
@@ -34,11 +36,13 @@ class Manager(object):
 
     def get(self, role_id):
         """ Returns role by ID """
-        return self.driver.get(role_id)
+        return self.cache.get(('get', role_id),
+                              lambda: self.driver.get(role_id))
 
     def get_by_name(self, name):
         """ Returns role by name """
-        return self.driver.get_by_name(name=name)
+        return self.cache.get(('get_by_name', name),
+                              lambda: self.driver.get_by_name(name=name))
 
     def get_page(self, marker, limit):
         """ Get one page of roles list """
@@ -50,7 +54,8 @@ class Manager(object):
 
     def get_by_service(self, service_id):
         """ Returns role by service """
-        return self.driver.get_by_service(service_id)
+        return self.cache.get(('get_by_service', service_id),
+                              lambda: self.driver.get_by_service(service_id))
 
     def get_by_service_get_page(self, service_id, marker, limit):
         """ Get one page of roles by service"""
@@ -68,3 +73,7 @@ class Manager(object):
     def delete(self, role_id):
         """ Delete role """
         self.driver.delete(role_id)
+
+    def invalidate_cache(self):
+        """ Drop cached roles after a write """
+        self.cache.invalidate()
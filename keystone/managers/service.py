@@ -19,6 +19,7 @@
 import logging
 
 import keystone.backends.api as api
+from keystone.managers import cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,18 +28,24 @@ class Manager(object):
     def __init__(self, options):
         self.options = options
         self.driver = api.SERVICE
+        self.cache = cache.get_cache('service')
 
     def create(self, service):
         """ Create a new service """
-        return self.driver.create(service)
+        try:
+            return self.driver.create(service)
+        finally:
+            cache.bump_version('catalog')
 
     def get(self, service_id):
         """ Returns service by ID """
-        return self.driver.get(service_id)
+        return self.cache.get(('get', service_id),
+                              lambda: self.driver.get(service_id))
 
     def get_by_name(self, name):
         """ Returns service by name """
-        return self.driver.get_by_name(name=name)
+        return self.cache.get(('get_by_name', name),
+                              lambda: self.driver.get_by_name(name=name))
 
     def get_page(self, marker, limit):
         """ Get one page of services list """
@@ -50,12 +57,23 @@ class Manager(object):
 
     def get_by_name_and_type(self, name, service_type):
         """ Returns service by name and type """
-        return self.driver.get_by_name_and_type(name, service_type)
+        return self.cache.get(('get_by_name_and_type', name, service_type),
+            lambda: self.driver.get_by_name_and_type(name, service_type))
 
     def update(self, service):
         """ Update service """
-        return self.driver.update(service['id'], service)
+        try:
+            return self.driver.update(service['id'], service)
+        finally:
+            cache.bump_version('catalog')
 
     def delete(self, service_id):
         """ Delete service """
-        self.driver.delete(service_id)
+        try:
+            self.driver.delete(service_id)
+        finally:
+            cache.bump_version('catalog')
+
+    def invalidate_cache(self):
+        """ Drop cached services after a write """
+        self.cache.invalidate()
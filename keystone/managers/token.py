@@ -18,12 +18,21 @@
 
 import logging
 
+import eventlet
+
 import keystone.backends.api as api
+from keystone.common import signing
 
 LOG = logging.getLogger(__name__)
 
+# Number of expired tokens deleted per transaction by delete_expired()
+FLUSH_BATCH_SIZE = 1000
+
 
 class Manager(object):
+    """ Token ids passed in may be signed tokens (see keystone.common.signing),
+    which are looked up by the id they carry """
+
     def __init__(self, options):
         self.options = options
         self.driver = api.TOKEN
@@ -33,7 +42,7 @@ class Manager(object):
 
     def get(self, token_id):
         """ Returns token by ID """
-        return self.driver.get(token_id)
+        return self.driver.get(signing.token_id(token_id))
 
     def find(self, user_id, tenant_id=None):
         """ Finds token by user ID and, optionally, tenant ID
@@ -50,5 +59,79 @@ class Manager(object):
         else:
             return self.driver.get_for_user(user_id)
 
+    def get_validation_data(self, token_id):
+        """ Returns a token and everything needed to validate it
+
+        :param token_id: token id as a string
+        :returns: tuple of (token, user, tenant, user_tenant, tenant_roles,
+            global_roles), or None if the token does not exist
+        :raises: NotImplementedError if the backend can't look these up in
+            a single call
+        """
+        return self.driver.get_validation_data(signing.token_id(token_id))
+
+    def get_validation_data_for_all(self, token_ids):
+        """ Returns tokens and everything needed to validate them
+
+        :param token_ids: list of token ids as strings
+        :returns: dict of token id (as passed in) to the tuple returned by
+            get_validation_data(), for the tokens that exist
+        :raises: NotImplementedError if the backend can't look these up in
+            a single call
+        """
+        stored_ids = dict((token_id, signing.token_id(token_id))
+                          for token_id in token_ids)
+        data = self.driver.get_validation_data_for_all(stored_ids.values())
+        return dict((token_id, data[stored_id])
+                    for token_id, stored_id in stored_ids.iteritems()
+                    if stored_id in data)
+
     def delete(self, token_id):
-        self.driver.delete(token_id)
+        self.driver.delete(signing.token_id(token_id))
+
+    def delete_expired(self, batch_size=FLUSH_BATCH_SIZE):
+        """ Deletes all expired tokens, batch_size at a time
+
+        Each batch is deleted in its own transaction, and other green
+        threads get to run between batches, so this is safe to run while
+        serving requests.
+
+        :returns: the number of tokens deleted
+        """
+        deleted = 0
+        while True:
+            try:
+                count = self.driver.delete_expired(batch_size)
+            except NotImplementedError:
+                LOG.debug("Token backend expires tokens by itself")
+                return deleted
+            deleted += count
+            if count < batch_size:
+                return deleted
+            eventlet.sleep(0)
+
+    def revoke(self, token_id):
+        """ Deletes a token and adds it to the revocation list, if the
+        backend keeps one """
+        token_id = signing.token_id(token_id)
+        try:
+            self.driver.revoke(token_id)
+        except NotImplementedError:
+            self.driver.delete(token_id)
+
+    def revoke_for_user(self, user_id):
+        """ Deletes all tokens of a user and adds them to the revocation
+        list, if the backend keeps one """
+        try:
+            self.driver.revoke_for_user(user_id)
+        except NotImplementedError:
+            LOG.debug("Token backend cannot revoke the tokens of a user")
+
+    def get_revoked(self, since):
+        """ Returns the tokens revoked after a revision of the revocation list
+
+        :param since: revision as an int
+        :returns: tuple of (current revision, list of revoked tokens)
+        :raises: NotImplementedError if the backend keeps no revocation list
+        """
+        return self.driver.get_revoked(since)
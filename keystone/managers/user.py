@@ -16,17 +16,33 @@
 
 """ User manager module """
 
+import hashlib
+import hmac
 import logging
+import os
 
 import keystone.backends.api as api
+from keystone.managers import cache
 
 LOG = logging.getLogger(__name__)
 
+# Key for the HMACs of verified passwords kept in the password cache. It
+# never leaves the process, so cached entries are useless to anyone reading
+# its memory without it.
+_PASSWORD_KEY = os.urandom(32)
+
+
+def _password_digest(password):
+    if isinstance(password, unicode):
+        password = password.encode('utf-8')
+    return hmac.new(_PASSWORD_KEY, password, hashlib.sha256).digest()
+
 
 class Manager(object):
     def __init__(self, options):
         self.options = options
         self.driver = api.USER
+        self.password_cache = cache.get_cache('password')
 
     def create(self, user):
         """ Create user from dict or model, assign id if not there """
@@ -69,13 +85,31 @@ class Manager(object):
 
     def update(self, user):
         """ Update user """
+        self.password_cache.discard(user['id'])
         return self.driver.update(user['id'], user)
 
     def delete(self, user_id):
+        self.password_cache.discard(user_id)
         self.driver.delete(user_id)
 
     def check_password(self, user_id, password):
-        return self.driver.check_password(user_id, password)
+        """ Checks a user's password
+
+        Passwords are hashed with a deliberately slow function. When the
+        password cache is enabled, the HMAC of the last password verified
+        for each user is remembered for password_cache_ttl seconds, and the
+        same password is accepted again without hashing it.
+        """
+        if not password:
+            return self.driver.check_password(user_id, password)
+
+        digest = _password_digest(password)
+        if self.password_cache.peek(user_id) == digest:
+            return True
+        valid = self.driver.check_password(user_id, password)
+        if valid:
+            self.password_cache.set(user_id, digest)
+        return valid
 
     def user_role_add(self, values):
         self.driver.user_role_add(values)
@@ -34,8 +34,6 @@ This is an Auth component as per: http://wiki.openstack.org/openstack-authn
 import os
 import urlparse
 import eventlet
-from eventlet import wsgi
-from paste.deploy import loadapp
 from keystone.common.bufferedhttp import http_connect_raw as http_connect
 from webob.exc import Request, Response
 from webob.exc import HTTPUnauthorized
@@ -177,6 +175,9 @@ def app_factory(global_conf, ** local_conf):
     return AuthProtocol(None, conf)
 
 if __name__ == "__main__":
+    from eventlet import wsgi
+    from paste.deploy import loadapp
+
     app = loadapp("config:" + \
         os.path.join(os.path.abspath(os.path.dirname(__file__)),
                      os.pardir,
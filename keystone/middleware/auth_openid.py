@@ -19,10 +19,8 @@
 import os
 import urlparse
 import eventlet
-from eventlet import wsgi
 from keystone.common.bufferedhttp import http_connect_raw as http_connect
 from webob.exc import Request, Response
-from paste.deploy import loadapp
 
 """
 OPENID AUTH MIDDLEWARE - STUB
@@ -113,6 +111,9 @@ def app_factory(global_conf, **local_conf):
     return AuthProtocol(None, conf)
 
 if __name__ == "__main__":
+    from eventlet import wsgi
+    from paste.deploy import loadapp
+
     app = loadapp("config:" + \
         os.path.join(os.path.abspath(os.path.dirname(__file__)),
                      os.pardir,
@@ -23,6 +23,18 @@ This WSGI component:
 
 * Verifies that incoming client requests have valid tokens by validating
   tokens with the auth service.
+* Verifies signed tokens locally, without calling the auth service, when
+  given the keys they were signed with (signing_key_dir)
+* Keeps recently validated claims in process (claims_cache_size), in front
+  of memcache, so that most requests need neither a network round trip nor
+  date parsing
+* Revalidates cached claims in the background before they expire
+  (claims_refresh_ratio), and optionally keeps using them for a while if
+  the auth service is down (stale_claims_window)
+* Validates a token only once when several requests bring it at the same
+  time
+* Polls the auth service for revoked tokens (revocation_poll_interval) and
+  rejects them, even when their claims are cached or signed
 * Rejects unauthenticated requests UNLESS it is in 'delay_auth_decision'
   mode, which means the final decision is delegated to the downstream WSGI
   component (usually the OpenStack service)
@@ -98,20 +110,23 @@ HTTP_X_ROLES
 
 from datetime import datetime
 import eventlet
-from eventlet import wsgi
 import json
-# memcache is imported in __init__ if memcache caching is configured
+# memcache is imported by memcachepool if memcache caching is configured
 import logging
 import os
-from paste.deploy import loadapp
+import socket
 import time
 import urllib
 from urlparse import urlparse
 from webob.exc import HTTPUnauthorized
 from webob.exc import Request, Response
 
-import keystone.tools.tracer  # @UnusedImport # module runs on import
+from keystone.common import bufferedhttp
 from keystone.common.bufferedhttp import http_connect_raw as http_connect
+from keystone.common import lru
+from keystone.common import memcachepool
+from keystone.common import signing
+from keystone.common import singleflight
 
 LOG = logging.getLogger(__name__)
 
@@ -119,6 +134,8 @@ PROTOCOL_NAME = "Token Authentication"
 # The time format of the 'expires' property of a token
 EXPIRE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 MAX_CACHE_TIME = 86400
+# Size of the chunks in which remote service responses are passed on
+PROXY_CHUNK_SIZE = 65536
 
 
 def get_datetime(time_string):
@@ -135,6 +152,45 @@ def get_datetime(time_string):
     return d1.replace(microsecond=ms)
 
 
+def get_timestamp(expires):
+    """ Converts a token expiry to a unix timestamp
+
+    :param: expires: a string in the format get_datetime() parses, a
+                     datetime, or a unix timestamp
+    """
+    if isinstance(expires, basestring):
+        expires = get_datetime(expires)
+    if isinstance(expires, datetime):
+        return time.mktime(expires.timetuple()) + expires.microsecond / 1e6
+    return expires
+
+
+def claims_cache_until(ttl, expires, valid, now=None):
+    """ Returns the unix time until which claims can be kept in process: ttl
+    seconds, and for valid claims no longer than the token lasts
+
+    :param: expires: the token's expiry, as a unix timestamp
+    """
+    if now is None:
+        now = time.time()
+    until = now + ttl
+    if valid:
+        until = min(until, expires)
+    return until
+
+
+def memcache_expiry(claims, valid):
+    """ Returns the expiry (a datetime) stored with claims in memcache, and
+    the number of seconds memcache should keep them for """
+    expires = get_datetime(claims['expires'])
+    delta = expires - datetime.now()
+    timeout = delta.seconds
+    if timeout > MAX_CACHE_TIME or not valid:
+        # Limit cache to one day (and cache bad tokens for a day)
+        timeout = MAX_CACHE_TIME
+    return expires, timeout
+
+
 class ValidationFailed(Exception):
     pass
 
@@ -143,6 +199,11 @@ class TokenExpired(Exception):
     pass
 
 
+class ServiceError(ValidationFailed):
+    """The auth service failed to validate the token (5xx)"""
+    pass
+
+
 class AuthProtocol(object):
     """Auth Middleware that handles authenticating client calls"""
 
@@ -206,12 +267,42 @@ class AuthProtocol(object):
         # server
         self.cert_file = conf.get('certfile', None)
         self.key_file = conf.get('keyfile', None)
+        # Keep-alive connections to the auth service, shared by all requests
+        self.auth_pool = bufferedhttp.get_pool(self.auth_host, self.auth_port,
+            ssl=(self.auth_protocol == 'https'), key_file=self.key_file,
+            cert_file=self.cert_file, timeout=float(self.auth_timeout),
+            max_size=int(conf.get('auth_pool_size',
+                                  bufferedhttp.DEFAULT_POOL_SIZE)),
+            idle_timeout=int(conf.get('auth_pool_idle_timeout',
+                                      bufferedhttp.DEFAULT_IDLE_TIMEOUT)))
         # Caching
         self.cache = conf.get('cache', None)
         self.memcache_hosts = conf.get('memcache_hosts', None)
         if self.memcache_hosts:
             if self.cache is None:
                 self.cache = "keystone.cache"
+            # Shared by all requests, unless the environ brings its own cache
+            self.memcache_pool = memcachepool.ClientPool(
+                memcachepool.parse_servers(self.memcache_hosts),
+                pool_size=int(conf.get('memcache_pool_size',
+                                       memcachepool.DEFAULT_POOL_SIZE)))
+        # In-process cache of claims, consulted before the cache above
+        self.claims_cache = lru.LRUCache(int(conf.get('claims_cache_size', 0)))
+        self.claims_cache_ttl = int(conf.get('claims_cache_ttl', 60))
+        # Fraction of claims_cache_ttl after which cached claims are
+        # revalidated in the background (0 disables refresh-ahead)
+        self.claims_refresh_ratio = float(conf.get('claims_refresh_ratio', 0))
+        # Seconds for which expired cached claims are still accepted while
+        # the auth service is unreachable or failing (0 disables)
+        self.stale_claims_window = int(conf.get('stale_claims_window', 0))
+        # Signed tokens are verified locally with the keys in this directory
+        # (see keystone.common.signing), unless roles must be filtered by
+        # service_ids, which only Keystone can do
+        if conf.get('signing_key_dir'):
+            self.signing_keys = signing.KeyRing(conf['signing_key_dir'])
+        # Seconds between polls for revoked tokens (0 disables polling)
+        self.revocation_poll_interval = int(
+            conf.get('revocation_poll_interval', 0))
 
     def __init__(self, app, conf):
         """ Common initialization code """
@@ -231,6 +322,7 @@ class AuthProtocol(object):
         self.auth_port = None
         self.auth_protocol = None
         self.auth_timeout = None
+        self.auth_pool = None
         self.cert_file = None
         self.key_file = None
         self.delay_auth_decision = None
@@ -242,27 +334,29 @@ class AuthProtocol(object):
         self.service_url = None
         self.cache = None
         self.memcache_hosts = None
+        self.memcache_pool = None
+        self.claims_cache = None
+        self.claims_cache_ttl = None
+        self.claims_refresh_ratio = None
+        self.stale_claims_window = None
+        # Number of requests accepted on stale claims
+        self.stale_claims_served = 0
+        self._refreshing = set()
+        self.signing_keys = None
+        self.revocation_poll_interval = None
+        # revoked token id -> expiry, for tokens that are not expired yet
+        self._revoked_tokens = {}
+        self._revocation_revision = 0
+        self._next_revocation_poll = 0
+        self._validations = singleflight.Group()
         self._init_protocol_common(app, conf)  # Applies to all protocols
         self._init_protocol(conf)  # Specific to this protocol
 
     def __call__(self, env, start_response):
         """ Handle incoming request. Authenticate. And send downstream. """
-        LOG.debug("entering AuthProtocol.__call__")
         # Initialize caching client
-        if self.memcache_hosts:
-            # This will only be used if the configuration calls for memcache
-            import memcache
-
-            if env.get(self.cache, None) is None:
-                memcache_client = memcache.Client([self.memcache_hosts])
-                env[self.cache] = memcache_client
-
-        #Prep headers to forward request to local or remote downstream service
-        proxy_headers = env.copy()
-        for header in proxy_headers.iterkeys():
-            if header[0:5] == 'HTTP_':
-                proxy_headers[header[5:]] = proxy_headers[header]
-                del proxy_headers[header]
+        if self.memcache_pool is not None and env.get(self.cache) is None:
+            env[self.cache] = self.memcache_pool
 
         #Look for authentication claims
         token = self._get_claims(env)
@@ -272,9 +366,8 @@ class AuthProtocol(object):
                 #Configured to allow downstream service to make final decision.
                 #So mark status as Invalid and forward the request downstream
                 LOG.debug("delay_auth_decision is %s, so sending request "
-                        "down the pipeline" % self.delay_auth_decision)
-                self._decorate_request("X_IDENTITY_STATUS",
-                    "Invalid", env, proxy_headers)
+                        "down the pipeline", self.delay_auth_decision)
+                self._decorate_request("X_IDENTITY_STATUS", "Invalid", env)
             else:
                 #Respond to client as appropriate for this auth protocol
                 return self._reject_request(env, start_response)
@@ -286,48 +379,20 @@ class AuthProtocol(object):
                 # Keystone rejected claim
                 if self.delay_auth_decision:
                     # Downstream service will receive call still and decide
-                    self._decorate_request("X_IDENTITY_STATUS",
-                        "Invalid", env, proxy_headers)
+                    self._decorate_request("X_IDENTITY_STATUS", "Invalid",
+                                           env)
                 else:
                     #Respond to client as appropriate for this auth protocol
                     return self._reject_claims(env, start_response)
             else:
-                self._decorate_request("X_IDENTITY_STATUS",
-                    "Confirmed", env, proxy_headers)
+                self._decorate_request("X_IDENTITY_STATUS", "Confirmed", env)
 
                 # Store authentication data
                 if claims:
-                    self._decorate_request('X_AUTHORIZATION', "Proxy %s" %
-                        claims['user']['name'], env, proxy_headers)
-
-                    self._decorate_request('X_TENANT_ID',
-                        claims['tenant']['id'], env, proxy_headers)
-                    self._decorate_request('X_TENANT_NAME',
-                        claims['tenant']['name'], env, proxy_headers)
-
-                    self._decorate_request('X_USER_ID',
-                        claims['user']['id'], env, proxy_headers)
-                    self._decorate_request('X_USER_NAME',
-                        claims['user']['name'], env, proxy_headers)
-
-                    roles = ','.join(claims['roles'])
-                    self._decorate_request('X_ROLES',
-                        roles, env, proxy_headers)
-
-                    # Deprecated in favor of X_TENANT_ID and _NAME
-                    self._decorate_request('X_TENANT',
-                        claims['tenant']['id'], env, proxy_headers)
-
-                    # Deprecated in favor of X_USER_ID and _NAME
-                    self._decorate_request('X_USER',
-                        claims['user']['id'], env, proxy_headers)
-
-                    # Deprecated in favor of X_ROLES
-                    self._decorate_request('X_ROLE',
-                        roles, env, proxy_headers)
+                    self._decorate_claims(claims, env)
 
         #Send request downstream
-        return self._forward_request(env, start_response, proxy_headers)
+        return self._forward_request(env, start_response)
 
     @staticmethod
     def _convert_date(date):
@@ -347,7 +412,11 @@ class AuthProtocol(object):
         return pclaims
 
     def _cache_put(self, env, token, claims, valid):
-        """ Put a claim into the cache """
+        """ Put a claim into the caches """
+        if claims and self.claims_cache.max_size > 0:
+            expires = get_timestamp(claims['expires'])
+            self._claims_cache_put(token, claims, expires, valid)
+
         cache = self._cache(env)
         if cache and claims:
             key = 'tokens/%s' % (token)
@@ -359,34 +428,90 @@ class AuthProtocol(object):
                              timeout=expires - time.time())
             else:
                 # normal memcache client
-                expires = get_datetime(claims['expires'])
-                delta = expires - datetime.now()
-                timeout = delta.seconds
-                if timeout > MAX_CACHE_TIME or not valid:
-                    # Limit cache to one day (and cache bad tokens for a day)
-                    timeout = MAX_CACHE_TIME
+                expires, timeout = memcache_expiry(claims, valid)
                 claims = self._protect_claims(token, claims)
                 cache.set(key, (claims, expires, valid), time=timeout)
 
+    def _claims_cache_put(self, token, claims, expires, valid):
+        """ Keep claims in process for up to claims_cache_ttl seconds, and
+        valid claims no longer than the token lasts
+
+        Valid claims are kept for another stale_claims_window seconds, to
+        be used only if the auth service cannot be reached.
+        """
+        now = time.time()
+        fresh_until = claims_cache_until(self.claims_cache_ttl, expires,
+                                         valid, now)
+        keep_until = fresh_until
+        if valid:
+            keep_until = min(fresh_until + self.stale_claims_window, expires)
+        refresh_at = fresh_until
+        if self.claims_refresh_ratio:
+            refresh_at = now + self.claims_refresh_ratio * (fresh_until - now)
+        self.claims_cache.set(token,
+            (claims, expires, valid, fresh_until, refresh_at), keep_until)
+
     def _cache_get(self, env, token):
-        """ Return claim and relevant information (expiration and validity)
-        from cache """
+        """ Return claim and relevant information (expiration as a unix
+        timestamp, and validity) from cache """
+        entry = self.claims_cache.get(token)
+        now = time.time()
+        if entry and entry[3] > now:
+            claims, expires, valid, _fresh_until, refresh_at = entry
+            if valid and refresh_at <= now:
+                self._refresh_ahead(env, token)
+            return (claims, expires, valid)
+
         cache = self._cache(env)
         if cache:
             key = 'tokens/%s' % (token)
             cached_claims = cache.get(key)
             if cached_claims:
                 claims, expires, valid = cached_claims
-                if valid:
-                    if "timeout" in cache.set.func_code.co_varnames:
-                        if expires > time.time():
-                            claims = self._unprotect_claims(token, claims)
-                    else:
-                        if expires > datetime.now():
-                            claims = self._unprotect_claims(token, claims)
+                expires = get_timestamp(expires)
+                if valid and expires > time.time():
+                    claims = self._unprotect_claims(token, claims)
+                self._claims_cache_put(token, claims, expires, valid)
                 return (claims, expires, valid)
         return None
 
+    def _refresh_ahead(self, env, token):
+        """ Revalidate cached claims in a background green thread """
+        if token in self._refreshing:
+            return
+        self._refreshing.add(token)
+        cache_env = {}
+        if self.cache is not None:
+            cache_env[self.cache] = self._cache(env)
+        eventlet.spawn_n(self._refresh_claims, cache_env, token)
+
+    def _refresh_claims(self, env, token):
+        try:
+            try:
+                self._validations.do(token, self._fetch_claims, env, token)
+            except ServiceError:
+                pass
+            except (ValidationFailed, TokenExpired):
+                # Cached as invalid by _fetch_claims
+                pass
+            except Exception, e:
+                LOG.warn("Cannot revalidate cached claims: %s" % e)
+        finally:
+            self._refreshing.discard(token)
+
+    def _stale_claims(self, token):
+        """ Return valid cached claims within stale_claims_window of their
+        expiry from the cache, or None """
+        if not self.stale_claims_window:
+            return None
+        entry = self.claims_cache.get(token)
+        if not entry or not entry[2] or entry[1] <= time.time():
+            return None
+        self.stale_claims_served += 1
+        LOG.warn("Auth service unavailable, accepting stale claims "
+                 "(%s times so far)" % self.stale_claims_served)
+        return entry[0]
+
     def _cache(self, env):
         """ Return a cache to use for token caching, or none """
         if self.cache is not None:
@@ -415,9 +540,78 @@ class AuthProtocol(object):
         return HTTPUnauthorized()(env,
             start_response)
 
+    def _fetch_revoked_tokens(self, since):
+        """Ask the auth service for the tokens revoked after revision since.
+
+        Returns the revokedTokens document, or None if it could not be
+        fetched."""
+        headers = {"Accept": "application/json",
+                   "X-Auth-Token": self.admin_token}
+        try:
+            resp = self.auth_pool.request('GET',
+                '/v2.0/tokens/revoked?since=%s' % since, headers=headers)
+            data = resp.body
+        except Exception, e:
+            LOG.warn("Cannot fetch revoked tokens: %s" % e)
+            return None
+        if resp.status != 200:
+            LOG.warn("Cannot fetch revoked tokens: %s" % resp.status)
+            return None
+        return json.loads(data)['revokedTokens']
+
+    def _poll_revocations(self, env):
+        """Fetch the tokens revoked since the last poll, if it is time to,
+        and forget any cached claims for them"""
+        now = time.time()
+        if not self.revocation_poll_interval or \
+                now < self._next_revocation_poll:
+            return
+        self._next_revocation_poll = now + self.revocation_poll_interval
+
+        revoked = self._fetch_revoked_tokens(self._revocation_revision)
+        if revoked is None:
+            return
+        if revoked['revision'] < self._revocation_revision:
+            # The revocation list was reset, fetch it all on the next poll
+            LOG.debug("Revocation list was reset")
+            self._revocation_revision = 0
+            self._next_revocation_poll = now
+            return
+
+        cache = self._cache(env)
+        for token in revoked['tokens']:
+            self._revoked_tokens[token['id']] = get_datetime(token['expires'])
+            self.claims_cache.pop(token['id'])
+            if cache:
+                cache.delete('tokens/%s' % token['id'])
+        self._revocation_revision = revoked['revision']
+
+        # Expired tokens are rejected anyway
+        now = datetime.now()
+        for token_id, expires in self._revoked_tokens.items():
+            if expires <= now:
+                del self._revoked_tokens[token_id]
+
+    def _is_revoked(self, token):
+        """Tells whether a token is on the last fetched revocation list"""
+        return token in self._revoked_tokens or \
+            signing.token_id(token) in self._revoked_tokens
+
     def _verify_claims(self, env, claims):
         """Verify claims and extract identity information, if applicable."""
 
+        self._poll_revocations(env)
+        if self._is_revoked(claims):
+            LOG.debug("Token has been revoked")
+            raise ValidationFailed()
+
+        if self.signing_keys is not None and not self.serviceId_qs and \
+                signing.is_signed(claims):
+            try:
+                return self._verify_signed_claims(claims)
+            except signing.UnknownKey, e:
+                LOG.debug("%s, validating token with Keystone" % e)
+
         cached_claims = self._cache_get(env, claims)
         if cached_claims:
             LOG.debug("Found cached claims")
@@ -425,11 +619,24 @@ class AuthProtocol(object):
             if not valid:
                 LOG.debug("Claims not valid (according to cache)")
                 raise ValidationFailed()
-            if expires <= datetime.now():
+            if expires <= time.time():
                 LOG.debug("Claims (token) expired (according to cache)")
                 raise TokenExpired()
             return claims
 
+        # Concurrent requests with the same token wait for one validation
+        try:
+            return self._validations.do(claims, self._fetch_claims, env,
+                                        claims)
+        except (ServiceError, socket.error, bufferedhttp.HTTPException):
+            stale_claims = self._stale_claims(claims)
+            if stale_claims is None:
+                raise
+            return stale_claims
+
+    def _fetch_claims(self, env, claims):
+        """Validate claims with the auth service and cache the result."""
+
         # Step 1: We need to auth with the keystone service, so get an
         # admin token
         #TODO(ziad): Need to properly implement this, where to store creds
@@ -450,25 +657,25 @@ class AuthProtocol(object):
                     # we're using a test token from the ini file for now
         LOG.debug("Connecting to %s://%s:%s to check claims" % (
                 self.auth_protocol, self.auth_host, self.auth_port))
-        conn = http_connect(self.auth_host, self.auth_port, 'GET',
-                            '/v2.0/tokens/%s%s' % (claims, self.serviceId_qs),
-                            headers=headers,
-                            ssl=(self.auth_protocol == 'https'),
-                            key_file=self.key_file, cert_file=self.cert_file,
-                            timeout=self.auth_timeout)
-        resp = conn.getresponse()
-        data = resp.read()
+        resp = self.auth_pool.request('GET',
+            '/v2.0/tokens/%s%s' % (claims, self.serviceId_qs),
+            headers=headers)
+        data = resp.body
 
         LOG.debug("Response received: %s" % resp.status)
+        if resp.status >= 500:
+            # Not the token's fault, so do not cache it as invalid
+            LOG.warn("Auth service failed to validate token: %s" %
+                     resp.status)
+            raise ServiceError()
         if not str(resp.status).startswith('20'):
-            # Cache it if there is a cache available
-            if self.cache:
-                LOG.debug("Caching that results were invalid")
-                self._cache_put(env, claims,
-                                claims={'expires':
-                                datetime.strftime(datetime.now(),
-                                                  EXPIRE_TIME_FORMAT)},
-                                valid=False)
+            # Cache it
+            LOG.debug("Caching that results were invalid")
+            self._cache_put(env, claims,
+                            claims={'expires':
+                            datetime.strftime(datetime.now(),
+                                              EXPIRE_TIME_FORMAT)},
+                            valid=False)
             # Keystone rejected claim
             LOG.debug("Failing the validation")
             raise ValidationFailed()
@@ -509,67 +716,136 @@ class AuthProtocol(object):
         expires = get_datetime(verified_claims['expires'])
         if expires <= datetime.now():
             LOG.debug("Claims (token) expired: %s" % str(expires))
-            # Cache it if there is a cache available (we also cached bad
-            # claims)
-            if self.cache:
-                LOG.debug("Caching expired claim (token)")
-                self._cache_put(env, claims, verified_claims, valid=False)
+            # Cache it (we also cache bad claims)
+            LOG.debug("Caching expired claim (token)")
+            self._cache_put(env, claims, verified_claims, valid=False)
             raise TokenExpired()
 
-        # Cache it if there is a cache available
-        if self.cache:
-            LOG.debug("Caching validated claim")
-            self._cache_put(env, claims, verified_claims, valid=True)
+        # Cache it
+        LOG.debug("Caching validated claim")
+        self._cache_put(env, claims, verified_claims, valid=True)
         LOG.debug("Returning successful validation")
         return verified_claims
 
+    def _verify_signed_claims(self, token):
+        """Verify a signed token locally and extract identity information."""
+        try:
+            claims = signing.verify(token, self.signing_keys)
+            verified_claims = {
+                'user': {
+                    'id': claims['user']['id'],
+                    'name': claims['user']['name'],
+                },
+                'tenant': {
+                    'id': claims['tenant']['id'],
+                    'name': claims['tenant']['name'],
+                },
+                'roles': claims['roles'],
+                'expires': claims['expires']}
+            expires = get_datetime(verified_claims['expires'])
+        except signing.UnknownKey:
+            raise
+        except (signing.InvalidToken, KeyError, TypeError, ValueError), e:
+            LOG.debug("Signed token rejected: %s" % e)
+            raise ValidationFailed()
+
+        if expires <= datetime.now():
+            LOG.debug("Claims (token) expired: %s" % str(expires))
+            raise TokenExpired()
+        LOG.debug("User identified from signed token: id=%s, name=%s" % (
+                verified_claims['user']['id'],
+                verified_claims['user']['name']))
+        return verified_claims
+
     @staticmethod
-    def _decorate_request(index, value, env, proxy_headers):
+    def _decorate_request(index, value, env):
         """Add headers to request"""
-        LOG.debug("Decorating request with HTTP_%s=%s" % (index, value))
-        proxy_headers[index] = value
         env["HTTP_%s" % index] = value
 
-    def _forward_request(self, env, start_response, proxy_headers):
+    def _decorate_claims(self, claims, env):
+        """Add the identity in claims to the request headers"""
+        LOG.debug("Decorating request for user %s, tenant %s, roles %s",
+                  claims['user']['id'], claims['tenant']['id'],
+                  claims['roles'])
+        roles = ','.join(claims['roles'])
+        env['HTTP_X_AUTHORIZATION'] = "Proxy %s" % claims['user']['name']
+        env['HTTP_X_TENANT_ID'] = claims['tenant']['id']
+        env['HTTP_X_TENANT_NAME'] = claims['tenant']['name']
+        env['HTTP_X_USER_ID'] = claims['user']['id']
+        env['HTTP_X_USER_NAME'] = claims['user']['name']
+        env['HTTP_X_ROLES'] = roles
+        # Deprecated in favor of X_TENANT_ID and _NAME
+        env['HTTP_X_TENANT'] = claims['tenant']['id']
+        # Deprecated in favor of X_USER_ID and _NAME
+        env['HTTP_X_USER'] = claims['user']['id']
+        # Deprecated in favor of X_ROLES
+        env['HTTP_X_ROLE'] = roles
+
+    @staticmethod
+    def _proxy_headers(env):
+        """Headers to send to a remote service: the HTTP_ entries of env
+        without their prefix, plus CONTENT_TYPE and CONTENT_LENGTH"""
+        headers = {}
+        for key, value in env.iteritems():
+            if key.startswith('HTTP_'):
+                headers[key[5:]] = value
+            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+                headers[key] = value
+        return headers
+
+    @staticmethod
+    def _iter_response(conn, resp):
+        """Stream the body of a remote response, then close the
+        connection"""
+        try:
+            while True:
+                chunk = resp.read(PROXY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            conn.close()
+
+    def _forward_request(self, env, start_response):
         """Token/Auth processed & claims added to headers"""
         self._decorate_request('AUTHORIZATION',
-            "Basic %s" % self.service_pass, env, proxy_headers)
+            "Basic %s" % self.service_pass, env)
         #now decide how to pass on the call
         if self.app:
             # Pass to downstream WSGI component
-            LOG.debug("Sending request to next app in WSGI pipeline")
             return self.app(env, start_response)
             #.custom_start_response)
         else:
             # We are forwarding to a remote service (no downstream WSGI app)
-            LOG.debug("Sending request to %s" % self.service_url)
-            req = Request(proxy_headers)
+            LOG.debug("Sending request to %s", self.service_url)
+            req = Request(env)
             parsed = urlparse(req.url)
 
             conn = http_connect(self.service_host,
                                 self.service_port,
                                 req.method,
                                 parsed.path,
-                                proxy_headers,
+                                self._proxy_headers(env),
                                 ssl=(self.service_protocol == 'https'),
                                 timeout=self.service_timeout)
             resp = conn.getresponse()
-            data = resp.read()
-            LOG.debug("Response was %s" % resp.status)
+            LOG.debug("Response was %s", resp.status)
 
             #TODO(ziad): use a more sophisticated proxy
             # we are rewriting the headers now
+            headers = []
+            for name in ('Content-Type', 'Content-Length'):
+                value = resp.getheader(name)
+                if value is not None:
+                    headers.append((name, value))
 
             if resp.status in (401, 305):
                 # Add our own headers to the list
-                headers = [("WWW_AUTHENTICATE",
-                   "Keystone uri='%s'" % self.auth_location)]
-                return Response(status=resp.status, body=data,
-                            headerlist=headers)(env,
-                                                start_response)
-            else:
-                return Response(status=resp.status, body=data)(env,
-                                                start_response)
+                headers.append(("WWW_AUTHENTICATE",
+                   "Keystone uri='%s'" % self.auth_location))
+            return Response(status=resp.status, headerlist=headers,
+                            app_iter=self._iter_response(conn, resp))(env,
+                                                            start_response)
 
 
 def filter_factory(global_conf, **local_conf):
@@ -588,6 +864,10 @@ def app_factory(global_conf, **local_conf):
     return AuthProtocol(None, conf)
 
 if __name__ == "__main__":
+    import keystone.tools.tracer  # @UnusedImport # module runs on import
+    from eventlet import wsgi
+    from paste.deploy import loadapp
+
     wsgiapp = loadapp("config:" + \
         os.path.join(os.path.abspath(os.path.dirname(__file__)),
                      os.pardir,
@@ -29,6 +29,8 @@ This WSGI component performs multiple jobs:
   component (usually the OpenStack service)
 - it will collect and forward identity information from a valid token
   such as user name, groups, etc...
+- like auth_token, it can keep the claims of validated tokens in process
+  (claims_cache_size, claims_cache_ttl) and in memcache (memcache_hosts)
 
 Refer to: http://wiki.openstack.org/openstack-authn
 
@@ -68,14 +70,18 @@ HTTP_X_AUTHORIZATION
 
 """
 
-import httplib
 import json
 import logging
+import time
 import urllib
 from urlparse import urlparse
 from webob.exc import HTTPUnauthorized, Request, Response
 
+from keystone.common import bufferedhttp
 from keystone.common.bufferedhttp import http_connect_raw as http_connect
+from keystone.common import lru
+from keystone.common import memcachepool
+from keystone.middleware import auth_token
 
 PROTOCOL_NAME = "Token Authentication"
 LOG = logging.getLogger('quantum.common.authentication')
@@ -119,6 +125,14 @@ class AuthProtocol(object):
         self.cert_file = conf.get('certfile', None)
         self.key_file = conf.get('keyfile', None)
         self.auth_timeout = conf.get('auth_timeout', 30)
+        # Keep-alive connections to the auth service, shared by all requests
+        self.auth_pool = bufferedhttp.get_pool(self.auth_host, self.auth_port,
+            ssl=(self.auth_protocol == 'https'), key_file=self.key_file,
+            cert_file=self.cert_file, timeout=float(self.auth_timeout),
+            max_size=int(conf.get('auth_pool_size',
+                                  bufferedhttp.DEFAULT_POOL_SIZE)),
+            idle_timeout=int(conf.get('auth_pool_idle_timeout',
+                                      bufferedhttp.DEFAULT_IDLE_TIMEOUT)))
         self.auth_api_version = conf.get('auth_version', '2.0')
         self.auth_location = "%s://%s:%s" % (self.auth_protocol,
                                              self.auth_host,
@@ -130,6 +144,14 @@ class AuthProtocol(object):
         self.admin_user = conf.get('auth_admin_user')
         self.admin_password = conf.get('auth_admin_password')
         self.admin_token = conf.get('auth_admin_token')
+        # Caching, with the same settings and memcache entries as auth_token
+        self.claims_cache = lru.LRUCache(int(conf.get('claims_cache_size', 0)))
+        self.claims_cache_ttl = int(conf.get('claims_cache_ttl', 60))
+        if conf.get('memcache_hosts'):
+            self.memcache_pool = memcachepool.ClientPool(
+                memcachepool.parse_servers(conf['memcache_hosts']),
+                pool_size=int(conf.get('memcache_pool_size',
+                                       memcachepool.DEFAULT_POOL_SIZE)))
         # bind to one or more service instances
         service_ids = conf.get('service_ids')
         self.serviceId_qs = ''
@@ -158,6 +180,10 @@ class AuthProtocol(object):
         self.auth_port = None
         self.auth_protocol = None
         self.auth_timeout = None
+        self.auth_pool = None
+        self.claims_cache = None
+        self.claims_cache_ttl = None
+        self.memcache_pool = None
         self.cert_file = None
         self.key_file = None
         self.service_host = None
@@ -207,7 +233,8 @@ class AuthProtocol(object):
         else:
             # this request is presenting claims. Let's validate them
             LOG.debug("Claims found. Validating.")
-            valid = self._validate_claims(self.claims)
+            claims = self._validate_claims(self.claims)
+            valid = claims is not None
             if not valid:
                 # Keystone rejected claim
                 if self.delay_auth_decision:
@@ -222,7 +249,6 @@ class AuthProtocol(object):
             #Collect information about valid claims
             if valid:
                 LOG.debug("Validation successful")
-                claims = self._expound_claims()
 
                 # Store authentication data
                 if claims:
@@ -281,16 +307,9 @@ class AuthProtocol(object):
                     }
                    }
                   }
-        if self.auth_protocol == "http":
-            conn = httplib.HTTPConnection(self.auth_host, self.auth_port)
-        else:
-            conn = httplib.HTTPSConnection(self.auth_host, self.auth_port,
-                cert_file=self.cert_file)
-        conn.request("POST", self._build_token_uri(), json.dumps(params), \
-            headers=headers)
-        response = conn.getresponse()
-        data = response.read()
-        return data
+        response = self.auth_pool.request("POST", self._build_token_uri(),
+                                          json.dumps(params), headers=headers)
+        return response.body
 
     @staticmethod
     def _get_claims(env):
@@ -309,8 +328,47 @@ class AuthProtocol(object):
         """Client sent bad claims"""
         return HTTPUnauthorized()(self.env, self.start_response)
 
+    def _cache_get(self, token):
+        """ Return (claims, valid) for token from the caches, or None """
+        entry = self.claims_cache.get(token)
+        if entry is not None:
+            return entry
+        if self.memcache_pool is not None:
+            cached = self.memcache_pool.get('tokens/%s' % token)
+            if cached:
+                claims, expires, valid = cached
+                expires = auth_token.get_timestamp(expires)
+                if valid and expires <= time.time():
+                    valid = False
+                self._claims_cache_put(token, claims, expires, valid)
+                return (claims, valid)
+        return None
+
+    def _claims_cache_put(self, token, claims, expires, valid):
+        until = auth_token.claims_cache_until(self.claims_cache_ttl, expires,
+                                              valid)
+        self.claims_cache.set(token, (claims, valid), until)
+
+    def _cache_put(self, token, claims, valid):
+        """ Cache claims in process, and valid claims in memcache too (the
+        same entries auth_token writes) """
+        expires = auth_token.get_timestamp(claims['expires'])
+        self._claims_cache_put(token, claims, expires, valid)
+        if valid and self.memcache_pool is not None:
+            expires, timeout = auth_token.memcache_expiry(claims, valid)
+            self.memcache_pool.set('tokens/%s' % token,
+                                   (claims, expires, valid), time=timeout)
+
     def _validate_claims(self, claims, retry=False):
-        """Validate claims, and provide identity information if applicable """
+        """Validate claims, and provide identity information if applicable
+
+        Returns the verified claims, or None if the token is not valid."""
+
+        cached = self._cache_get(claims)
+        if cached is not None:
+            LOG.debug("Found cached claims")
+            verified_claims, valid = cached
+            return verified_claims if valid else None
 
         # Step 1: We need to auth with the keystone service, so get an
         # admin token
@@ -329,14 +387,8 @@ class AuthProtocol(object):
         headers = {"Content-type": "application/json",
                     "Accept": "application/json",
                     "X-Auth-Token": self.admin_token}
-        conn = http_connect(self.auth_host, self.auth_port, 'GET',
-                            self._build_token_uri(claims), headers=headers,
-                            ssl=(self.auth_protocol == 'https'),
-                            key_file=self.key_file, cert_file=self.cert_file,
-                            timeout=self.auth_timeout)
-        resp = conn.getresponse()
-        # pylint: disable=E1103
-        conn.close()
+        resp = self.auth_pool.request('GET', self._build_token_uri(claims),
+                                      headers=headers)
 
         if not str(resp.status).startswith('20'):
             # Keystone rejected claim
@@ -351,46 +403,24 @@ class AuthProtocol(object):
                          "Admin token possibly expired.")
                 self.admin_token = None
                 return self._validate_claims(claims, True)
-            return False
-        else:
-            #TODO(Ziad): there is an optimization we can do here. We have just
-            #received data from Keystone that we can use instead of making
-            #another call in _expound_claims
-            LOG.info("Claims successfully validated")
-            return True
-
-    def _expound_claims(self):
-        # Valid token. Get user data and put it in to the call
-        # so the downstream service can use it
-        headers = {"Content-type": "application/json",
-                    "Accept": "application/json",
-                    "X-Auth-Token": self.admin_token}
-        conn = http_connect(self.auth_host, self.auth_port, 'GET',
-                            self._build_token_uri(self.claims),
-                            headers=headers,
-                            ssl=(self.auth_protocol == 'https'),
-                            key_file=self.key_file, cert_file=self.cert_file,
-                            timeout=self.auth_timeout)
-        resp = conn.getresponse()
-        data = resp.read()
-        # pylint: disable=E1103
-        conn.close()
-
-        if not str(resp.status).startswith('20'):
-            raise LookupError('Unable to locate claims: %s' % resp.status)
+            if resp.status < 500:
+                self._claims_cache_put(claims, None, None, False)
+            return None
+
+        # The validation response carries the claims: no need to ask again
+        LOG.info("Claims successfully validated")
+        verified_claims = self._extract_claims(json.loads(resp.body))
+        self._cache_put(claims, verified_claims, True)
+        return verified_claims
 
-        token_info = json.loads(data)
+    @staticmethod
+    def _extract_claims(token_info):
+        """Get user data from a token validation response, so that it can be
+        put in to the call for the downstream service to use"""
         #TODO(Ziad): make this more robust
         #first_group = token_info['auth']['user']['groups']['group'][0]
-        roles = []
-        rolegrants = token_info["access"]["user"]["roles"]
-        if rolegrants is not None:
-            roles = [rolegrant["id"] for rolegrant in rolegrants]
-
-        token_info = json.loads(data)
-
         roles = [role['name'] for role in token_info[
-            "access"]["user"]["roles"]]
+            "access"]["user"]["roles"] or []]
 
         # in diablo, there were two ways to get tenant data
         tenant = token_info['access']['token'].get('tenant')
@@ -412,7 +442,8 @@ class AuthProtocol(object):
                 'id': tenant_id,
                 'name': tenant_name
             },
-            'roles': roles}
+            'roles': roles,
+            'expires': token_info['access']['token']['expires']}
 
         return verified_claims
 
@@ -27,6 +27,7 @@ from keystone.controllers.user import UserController
 from keystone.controllers.version import VersionController
 from keystone.controllers.extensions import ExtensionsController
 import keystone.contrib.extensions.admin as extension
+from keystone.logic import service
 
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
@@ -38,12 +39,21 @@ class AdminApi(wsgi.Router):
         self.options = options
         logger.debug("Init with options=%s" % options)
         mapper = routes.Mapper()
+        # Shared by all the controllers of this API, extensions included
+        identity_service = service.IdentityService(options)
 
         # Token Operations
-        auth_controller = TokenController(options)
+        auth_controller = TokenController(options, identity_service)
         mapper.connect("/tokens", controller=auth_controller,
                        action="authenticate",
                        conditions=dict(method=["POST"]))
+        mapper.connect("/tokens/validate", controller=auth_controller,
+                       action="validate_tokens",
+                       conditions=dict(method=["POST"]))
+        # Must come before /tokens/{token_id}
+        mapper.connect("/tokens/revoked", controller=auth_controller,
+                        action="get_revoked_tokens",
+                        conditions=dict(method=["GET"]))
         mapper.connect("/tokens/{token_id}", controller=auth_controller,
                         action="validate_token",
                         conditions=dict(method=["GET"]))
@@ -60,18 +70,19 @@ class AdminApi(wsgi.Router):
                         conditions=dict(method=["GET"]))
 
         # Tenant Operations
-        tenant_controller = TenantController(options)
+        tenant_controller = TenantController(
+            options, identity_service=identity_service)
         mapper.connect("/tenants", controller=tenant_controller,
                     action="get_tenants", conditions=dict(method=["GET"]))
         mapper.connect("/tenants/{tenant_id}",
                     controller=tenant_controller,
                     action="get_tenant", conditions=dict(method=["GET"]))
-        roles_controller = RolesController(options)
+        roles_controller = RolesController(options, identity_service)
         mapper.connect("/tenants/{tenant_id}/users/{user_id}/roles",
             controller=roles_controller, action="get_user_roles",
             conditions=dict(method=["GET"]))
         # User Operations
-        user_controller = UserController(options)
+        user_controller = UserController(options, identity_service)
         mapper.connect("/users/{user_id}",
                     controller=user_controller,
                     action="get_user",
@@ -141,5 +152,6 @@ class AdminApi(wsgi.Router):
                     action="get_static_file",
                     root="content/common/", path="samples/",
                     conditions=dict(method=["GET"]))
-        extension.get_extension_configurer().configure(mapper, options)
+        extension.get_extension_configurer().configure(mapper, options,
+                                                       identity_service)
         super(AdminApi, self).__init__(mapper)
@@ -24,6 +24,7 @@ from keystone.controllers.tenant import TenantController
 from keystone.controllers.version import VersionController
 from keystone.controllers.staticfiles import StaticFilesController
 from keystone.controllers.extensions import ExtensionsController
+from keystone.logic import service
 
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
@@ -35,16 +36,19 @@ class ServiceApi(wsgi.Router):
         logger.debug("Init with options=%s" % options)
         self.options = options
         mapper = routes.Mapper()
+        # Shared by all the controllers of this API
+        identity_service = service.IdentityService(options)
 
         # Token Operations
-        auth_controller = TokenController(options)
+        auth_controller = TokenController(options, identity_service)
         mapper.connect("/tokens", controller=auth_controller,
                        action="authenticate",
                        conditions=dict(method=["POST"]))
         mapper.connect("/ec2tokens", controller=auth_controller,
                        action="authenticate_ec2",
                        conditions=dict(method=["POST"]))
-        tenant_controller = TenantController(options, True)
+        tenant_controller = TenantController(
+            options, True, identity_service=identity_service)
         mapper.connect("/tenants",
                         controller=tenant_controller,
                         action="get_tenants",
@@ -53,8 +53,12 @@ HTTP_X_AUTHORIZATION
 import logging
 import sys
 import optparse
+import time
+
+import eventlet
 
 from keystone.common import config, wsgi
+from keystone.managers import token as token_manager
 from keystone.routers.service import ServiceApi
 from keystone.routers.admin import AdminApi
 from keystone import version
@@ -76,6 +80,29 @@ def admin_app_factory(global_conf, **local_conf):
     return AdminApi(conf)
 
 
+def dispose_db_connections():
+    """Closes pooled database connections, so that worker processes forked
+    next do not share them (they reconnect when needed)"""
+    backend = sys.modules.get('keystone.backends.sqlalchemy')
+    if backend is not None:
+        backend.dispose_engine()
+
+
+wsgi.BEFORE_FORK.append(dispose_db_connections)
+
+
+def reap_expired_tokens(interval, batch_size):
+    """Deletes expired tokens every interval seconds, until killed"""
+    manager = token_manager.Manager({})
+    while True:
+        eventlet.sleep(interval)
+        try:
+            deleted = manager.delete_expired(batch_size)
+            logger.debug("Deleted %s expired tokens" % deleted)
+        except Exception:  # pylint: disable=W0703
+            logger.exception("Failed to delete expired tokens")
+
+
 class Server():
     """Used to start and stop Keystone servers
 
@@ -128,6 +155,7 @@ class Server():
         self.port = None
         self.host = None
         self.protocol = None
+        self.reaper = None
 
     def start(self, host=None, port=None, wait=True):
         """Starts the Keystone server
@@ -138,8 +166,10 @@ class Server():
             return to the caller without waiting
         """
         logger.debug("Starting API server")
+        started = time.time()
         conf, app = config.load_paste_app(
             self.config, self.options, self.args)
+        loaded = time.time()
 
         debug = self.options.get('debug') or conf.get('debug', False)
         debug = debug in [True, "True", "1"]
@@ -169,6 +199,17 @@ class Server():
         service_ssl = conf.get('service_ssl', False)
         service_ssl = service_ssl in [True, "True", "1"]
 
+        # Serve from this many forked processes (0 serves in this one)
+        workers = int(self.options.get('workers') or conf.get('workers', 0))
+
+        # Green threads, and requests in progress and queued, allowed on
+        # this API (0 for no limit on requests)
+        api = 'admin' if self.config == 'admin' else 'service'
+        limits = dict(
+            threads=int(conf.get('%s_threads' % api, 1000)),
+            max_in_flight=int(conf.get('%s_max_in_flight' % api, 0)),
+            max_queue=int(conf.get('%s_max_queue' % api, 0)))
+
         # Load the server
         if service_ssl:
             cert_required = conf.get('cert_required', False)
@@ -177,7 +218,7 @@ class Server():
             keyfile = conf.get('keyfile')
             ca_certs = conf.get('ca_certs')
 
-            self.server = wsgi.SslServer()
+            self.server = wsgi.SslServer(workers=workers, **limits)
             self.server.start(app, port, host,
                          certfile=certfile, keyfile=keyfile,
                          ca_certs=ca_certs,
@@ -185,7 +226,7 @@ class Server():
                          key=self.key)
             self.protocol = 'https'
         else:
-            self.server = wsgi.Server()
+            self.server = wsgi.Server(workers=workers, **limits)
             self.server.start(app, port, host,
                               key="%s-%s:%s" % (self.config, host, port))
             self.protocol = 'http'
@@ -193,8 +234,16 @@ class Server():
         self.port = port
         self.host = host
 
+        if self.config == 'admin':
+            self.start_token_reaper(conf)
+
         logger.info("%s listening on %s://%s:%s" % (
             self.name, ['http', 'https'][service_ssl], host, port))
+        listening = time.time()
+        logger.info("%s started in %.3fs (%.3fs loading the application, "
+                    "%.3fs starting the server)" % (self.name,
+                    listening - started, loaded - started,
+                    listening - loaded))
         if not (debug or verbose):
             print "%s listening on %s://%s:%s" % (
                 self.name, ['http', 'https'][service_ssl], host, port)
@@ -203,6 +252,18 @@ class Server():
         if wait:
             self.server.wait()
 
+    def start_token_reaper(self, conf):
+        """Starts deleting expired tokens in the background, if configured
+        to with token_flush_interval (in seconds)"""
+        interval = int(conf.get('token_flush_interval', 0))
+        if interval > 0:
+            batch_size = int(conf.get('token_flush_batch_size',
+                                      token_manager.FLUSH_BATCH_SIZE))
+            logger.info("Deleting expired tokens every %s seconds" %
+                        interval)
+            self.reaper = eventlet.spawn(reap_expired_tokens, interval,
+                                         batch_size)
+
     def stop(self):
         """Stops the Keystone server
 
@@ -213,3 +274,6 @@ class Server():
                 logger.debug("Killing %s" % self.key)
                 self.server.threads[self.key].kill()
             self.server = None
+        if self.reaper is not None:
+            self.reaper.kill()
+            self.reaper = None
@@ -227,7 +227,7 @@ class ApiTestCase(RestfulTestCase):
             'backend_entities':
                 "['UserRoleAssociation', 'Endpoints', 'Role', 'Tenant', "
                 "'Tenant', 'User', 'Credentials', 'EndpointTemplates', "
-                "'Token', 'Service']",
+                "'Token', 'RevokedToken', 'Service']",
         },
         'extensions': 'osksadm,oskscatalog,hpidm',
         'keystone-admin-role': 'Admin',
@@ -109,7 +109,7 @@ class ServiceAPITest(unittest.TestCase):
                 'backend_entities':
                     "['UserRoleAssociation', 'Endpoints', 'Role', 'Tenant', "
                     "'Tenant', 'User', 'Credentials', 'EndpointTemplates', "
-                    "'Token', 'Service']",
+                    "'Token', 'RevokedToken', 'Service']",
             },
             'keystone-admin-role': 'Admin',
             'keystone-service-admin-role': 'KeystoneServiceAdmin',
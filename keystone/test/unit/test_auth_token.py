@@ -0,0 +1,97 @@
+import eventlet
+from eventlet import wsgi
+import time
+import unittest2 as unittest
+
+import webob
+
+from keystone.middleware import auth_token
+from keystone.test.unit.test_bufferedhttp import NullLogger
+
+
+CLAIMS = {'user': {'id': 'u1', 'name': 'user1'},
+          'tenant': {'id': 't1', 'name': 'tenant1'},
+          'roles': ['Member', 'Admin'],
+          'expires': '2100-01-01T00:00:00'}
+
+
+class TestAuthTokenHeaders(unittest.TestCase):
+    '''Checks the identity headers auth_token adds in a pipeline.'''
+
+    def setUp(self):
+        self.env = None
+        self.middleware = auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'service_pass': 'dTpw',
+            'claims_cache_size': '10'})
+        self.middleware._claims_cache_put('good', CLAIMS, time.time() + 60,
+                                          True)
+
+    def app(self, env, start_response):
+        self.env = env
+        start_response('200 OK', [])
+        return ['OK']
+
+    def test_decorates_environ(self):
+        env = webob.Request.blank('/',
+                                  headers={'X-Auth-Token': 'good'}).environ
+        webob.Request(env).get_response(self.middleware)
+        self.assertIs(self.env, env)
+        self.assertEqual(env['HTTP_X_IDENTITY_STATUS'], 'Confirmed')
+        self.assertEqual(env['HTTP_X_AUTHORIZATION'], 'Proxy user1')
+        self.assertEqual(env['HTTP_X_USER_ID'], 'u1')
+        self.assertEqual(env['HTTP_X_USER_NAME'], 'user1')
+        self.assertEqual(env['HTTP_X_TENANT_ID'], 't1')
+        self.assertEqual(env['HTTP_X_TENANT_NAME'], 'tenant1')
+        self.assertEqual(env['HTTP_X_ROLES'], 'Member,Admin')
+        self.assertEqual(env['HTTP_X_ROLE'], 'Member,Admin')
+        self.assertEqual(env['HTTP_AUTHORIZATION'], 'Basic dTpw')
+        self.assertNotIn('X_USER_ID', env)
+
+    def test_delay_auth_decision(self):
+        self.middleware.delay_auth_decision = 1
+        req = webob.Request.blank('/')
+        self.assertEqual(req.get_response(self.middleware).status_int, 200)
+        self.assertEqual(self.env['HTTP_X_IDENTITY_STATUS'], 'Invalid')
+
+
+class TestAuthTokenProxy(unittest.TestCase):
+    '''Checks that auth_token forwards requests to a remote service.'''
+
+    def setUp(self):
+        self.headers = None
+        sock = eventlet.listen(('127.0.0.1', 0))
+        self.server = eventlet.spawn(wsgi.server, sock, self.service,
+                                     log=NullLogger())
+        self.middleware = auth_token.AuthProtocol(None, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'service_protocol': 'http',
+            'service_host': '127.0.0.1',
+            'service_port': str(sock.getsockname()[1]),
+            'service_pass': 'dTpw', 'claims_cache_size': '10'})
+        self.middleware._claims_cache_put('good', CLAIMS, time.time() + 60,
+                                          True)
+
+    def tearDown(self):
+        self.server.kill()
+
+    def service(self, env, start_response):
+        self.headers = dict((key, value) for key, value in env.iteritems()
+                            if key.startswith('HTTP_'))
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return ['x' * 100000]
+
+    def test_forward(self):
+        req = webob.Request.blank('/v1/servers',
+                                  headers={'X-Auth-Token': 'good'})
+        response = req.get_response(self.middleware)
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(response.body, 'x' * 100000)
+        self.assertEqual(self.headers['HTTP_X_USER_ID'], 'u1')
+        self.assertEqual(self.headers['HTTP_X_IDENTITY_STATUS'],
+                         'Confirmed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,303 @@
+import datetime
+import eventlet
+import json
+import socket
+import unittest2 as unittest
+
+import webob
+
+from keystone.common import lru
+from keystone.common import memcachepool
+from keystone.middleware import auth_token
+from keystone.middleware import quantum_auth_token
+
+
+class TestLRUCache(unittest.TestCase):
+    '''Unit tests for the in-process LRU cache.'''
+
+    def test_get_and_set(self):
+        cache = lru.LRUCache(10)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1, expires=200)
+        self.assertEqual(cache.get('a', now=100), 1)
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_expiry(self):
+        cache = lru.LRUCache(10)
+        cache.set('a', 1, expires=200)
+        self.assertIsNone(cache.get('a', now=200))
+        self.assertEqual(len(cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = lru.LRUCache(2)
+        cache.set('a', 1, expires=200)
+        cache.set('b', 2, expires=200)
+        cache.get('a', now=100)
+        cache.set('c', 3, expires=200)
+        self.assertIsNone(cache.get('b', now=100))
+        self.assertEqual(cache.get('a', now=100), 1)
+        self.assertEqual(cache.get('c', now=100), 3)
+
+    def test_pop(self):
+        cache = lru.LRUCache(2)
+        cache.set('a', 1, expires=200)
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertIsNone(cache.pop('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = lru.LRUCache(0)
+        cache.set('a', 1, expires=200)
+        self.assertIsNone(cache.get('a', now=100))
+
+
+class FakeResponse(object):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+
+class FakeAuthService(object):
+    '''Answers the token validations of the middleware under test.'''
+
+    def app(self, env, start_response):
+        start_response('200 OK', [])
+        return [env['HTTP_X_USER_ID']]
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append(path)
+        eventlet.sleep(0)
+        if isinstance(self.error, Exception):
+            raise self.error
+        if self.error:
+            return FakeResponse(self.error, '')
+        if not path.startswith('/v2.0/tokens/good'):
+            return FakeResponse(404, '')
+        expires = datetime.datetime.now() + datetime.timedelta(hours=1)
+        return FakeResponse(200, json.dumps({'access': {
+            'token': {'id': 'good', 'expires': expires.isoformat(),
+                      'tenant': {'id': 't1', 'name': 'tenant1'}},
+            'user': {'id': 'u1', 'name': 'user1',
+                     'roles': [{'name': 'Member'}]}}}))
+
+    def call(self, token):
+        req = webob.Request.blank('/', headers={'X-Auth-Token': token})
+        return req.get_response(self.middleware)
+
+
+class TestAuthTokenClaimsCache(FakeAuthService, unittest.TestCase):
+    '''Checks that auth_token keeps validated claims in process.'''
+
+    def setUp(self):
+        self.requests = []
+        self.error = None
+        self.middleware = auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'claims_cache_size': '10'})
+        self.middleware.auth_pool = self
+
+    def test_valid_token(self):
+        for _i in range(3):
+            response = self.call('good')
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.body, 'u1')
+        self.assertEqual(self.requests, ['/v2.0/tokens/good'])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.call('bad').status_int, 401)
+        self.assertEqual(self.call('bad').status_int, 401)
+        self.assertEqual(self.requests, ['/v2.0/tokens/bad'])
+
+    def test_concurrent_validations(self):
+        self.middleware.claims_cache_ttl = 0
+        pool = eventlet.GreenPool()
+        responses = list(pool.imap(self.call, ['good'] * 5 + ['bad'] * 5))
+        self.assertEqual([response.status_int for response in responses],
+                         [200] * 5 + [401] * 5)
+        self.assertEqual(sorted(self.requests),
+                         ['/v2.0/tokens/bad', '/v2.0/tokens/good'])
+
+    def test_ttl(self):
+        self.middleware.claims_cache_ttl = 0
+        self.call('good')
+        self.call('good')
+        self.assertEqual(len(self.requests), 2)
+
+    def test_refresh_ahead(self):
+        self.middleware.claims_refresh_ratio = 0.0001
+        self.call('good')
+        eventlet.sleep(0.01)
+        self.assertEqual(self.call('good').status_int, 200)
+        self.assertEqual(len(self.requests), 1)
+        eventlet.sleep(0.01)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.middleware._refreshing, set())
+
+    def test_refresh_ahead_rejected(self):
+        self.middleware.claims_refresh_ratio = 0.0001
+        self.call('good')
+        eventlet.sleep(0.01)
+        self.error = 404
+        self.assertEqual(self.call('good').status_int, 200)
+        eventlet.sleep(0.01)
+        self.assertEqual(self.call('good').status_int, 401)
+
+    def test_stale_claims(self):
+        self.middleware.claims_cache_ttl = 0
+        self.middleware.stale_claims_window = 60
+        self.call('good')
+        self.error = 503
+        self.assertEqual(self.call('good').status_int, 200)
+        self.error = socket.error('refused')
+        self.assertEqual(self.call('good').status_int, 200)
+        self.assertEqual(self.middleware.stale_claims_served, 2)
+        self.assertEqual(len(self.requests), 3)
+
+    def test_no_stale_claims(self):
+        self.middleware.claims_cache_ttl = 0
+        self.call('good')
+        self.error = 503
+        self.assertEqual(self.call('good').status_int, 401)
+        # 5xx responses are not cached as invalid
+        self.error = None
+        self.assertEqual(self.call('good').status_int, 200)
+        self.assertEqual(self.middleware.stale_claims_served, 0)
+
+    def test_revoked_token(self):
+        self.call('good')
+        self.middleware.revocation_poll_interval = 60
+        self.middleware._fetch_revoked_tokens = lambda since: {
+            'revision': 1,
+            'tokens': [{'id': 'good', 'expires': '2100-01-01T00:00:00'}]}
+        self.assertEqual(self.call('good').status_int, 401)
+        self.assertIsNone(self.middleware.claims_cache.get('good'))
+
+
+class TestQuantumAuthTokenClaims(FakeAuthService, unittest.TestCase):
+    '''Checks that quantum_auth_token validates and extracts claims with one
+    call, and caches them.'''
+
+    def setUp(self):
+        self.requests = []
+        self.error = None
+        self.middleware = quantum_auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'auth_admin_token': 'unused', 'claims_cache_size': '10'})
+        self.middleware.auth_pool = self
+
+    def test_valid_token(self):
+        for _i in range(3):
+            response = self.call('good')
+            self.assertEqual(response.status_int, 200)
+            self.assertEqual(response.body, 'u1')
+        self.assertEqual(self.requests, ['/v2.0/tokens/good'])
+        self.assertEqual(self.middleware.claims_cache.get('good')[0]['roles'],
+                         ['Member'])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.call('bad').status_int, 401)
+        self.assertEqual(self.call('bad').status_int, 401)
+        self.assertEqual(self.requests, ['/v2.0/tokens/bad'])
+
+    def test_no_cache(self):
+        self.middleware.claims_cache_ttl = 0
+        self.assertEqual(self.call('good').status_int, 200)
+        self.assertEqual(self.call('good').status_int, 200)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_memcache(self):
+        memcache = FakeMemcacheClient()
+        self.middleware.memcache_pool = memcache
+        self.call('good')
+        self.middleware.claims_cache.clear()
+        self.assertEqual(self.call('good').body, 'u1')
+        self.assertEqual(len(self.requests), 1)
+        claims, expires, valid = memcache.get('tokens/good')
+        self.assertEqual(claims['user']['id'], 'u1')
+        self.assertTrue(valid)
+
+    def test_memcache_shared_with_auth_token(self):
+        memcache = FakeMemcacheClient()
+        self.middleware.memcache_pool = memcache
+        self.call('good')
+        quantum_entry = memcache.get('tokens/good')
+        # auth_token accepts the entry quantum_auth_token wrote...
+        self.middleware = auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'cache': 'keystone.cache'})
+        self.middleware.auth_pool = self
+        self.middleware.memcache_pool = memcache
+        self.assertEqual(self.call('good').body, 'u1')
+        self.assertEqual(len(self.requests), 1)
+        # ...and would write the same one
+        self.assertEqual(auth_token.memcache_expiry(quantum_entry[0], True)[0],
+                         quantum_entry[1])
+
+
+class FakeMemcacheClient(object):
+    created = []
+
+    def __init__(self):
+        self.data = {}
+        self.created.append(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+
+class TestMemcachePool(unittest.TestCase):
+    '''Checks that memcache clients are pooled and keys consistently
+    hashed.'''
+
+    servers = ['10.0.0.1:11211', '10.0.0.2:11211', '10.0.0.3:11211']
+
+    def setUp(self):
+        FakeMemcacheClient.created = []
+        self.pool = memcachepool.ClientPool(self.servers)
+        for pool in self.pool._pools.values():
+            pool.create = FakeMemcacheClient
+
+    def test_parse_servers(self):
+        self.assertEqual(memcachepool.parse_servers(
+            '10.0.0.1:11211, 10.0.0.2:11211 10.0.0.3:11211'), self.servers)
+
+    def test_clients_are_reused(self):
+        for i in range(10):
+            self.pool.set('tokens/%s' % i, i)
+        for i in range(10):
+            self.assertEqual(self.pool.get('tokens/%s' % i), i)
+        self.assertTrue(self.pool.delete('tokens/0'))
+        self.assertIsNone(self.pool.get('tokens/0'))
+        self.assertEqual(len(FakeMemcacheClient.created), 3)
+
+    def test_consistent_hashing(self):
+        keys = ['tokens/%s' % i for i in range(1000)]
+        before = dict((key, self.pool.server_for(key)) for key in keys)
+        self.assertEqual(set(before.values()), set(self.servers))
+
+        smaller = memcachepool.ClientPool(self.servers[:2])
+        for key in keys:
+            if before[key] != self.servers[2]:
+                self.assertEqual(smaller.server_for(key), before[key])
+
+    def test_middleware_pool(self):
+        middleware = auth_token.AuthProtocol(None, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'memcache_hosts': ','.join(self.servers)})
+        self.assertEqual(middleware.memcache_pool.servers, self.servers)
+        env = {}
+        middleware.memcache_pool = self.pool
+        middleware._reject_request = lambda env, start_response: []
+        middleware(env, None)
+        self.assertIs(env['keystone.cache'], self.pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,7 +34,7 @@ class BackendTestCase(unittest.TestCase):
                 "backend_entities": "['UserRoleAssociation', 'Endpoints',\
                                      'Role', 'Tenant', 'User',\
                                      'Credentials', 'EndpointTemplates',\
-                                     'Token', 'Service']",
+                                     'Token', 'RevokedToken', 'Service']",
                 "sql_idle_timeout": "30"
                 }
 
@@ -154,7 +154,7 @@ class LDAPBackendTestCase(BackendTestCase):
                 "sql_connection": "sqlite:///",
                 "backend_entities": "['Endpoints', 'Role',\
                                      'Credentials', 'EndpointTemplates',\
-                                     'Token', 'Service']",
+                                     'Token', 'RevokedToken', 'Service']",
                 "sql_idle_timeout": "30"
                 },
             'keystone.backends.ldap': {
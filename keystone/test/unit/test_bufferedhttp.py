@@ -0,0 +1,114 @@
+import socket
+
+import eventlet
+from eventlet import wsgi
+import unittest2 as unittest
+
+from keystone.common import bufferedhttp
+
+
+class NullLogger(object):
+    def write(self, *args):
+        pass
+
+
+class CountingSocket(object):
+    """Listening socket that counts the connections it accepts"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.accepted = 0
+
+    def accept(self):
+        client = self.sock.accept()
+        self.accepted += 1
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class TestConnectionPool(unittest.TestCase):
+    '''Checks that pooled connections are kept alive and reused.'''
+
+    def setUp(self):
+        super(TestConnectionPool, self).setUp()
+        self.requests = 0
+        self.sock = CountingSocket(eventlet.listen(('127.0.0.1', 0)))
+        self.port = self.sock.getsockname()[1]
+        self.server = eventlet.spawn(wsgi.server, self.sock, self.app,
+                                     log=NullLogger())
+
+    def tearDown(self):
+        super(TestConnectionPool, self).tearDown()
+        self.server.kill()
+
+    def app(self, env, start_response):
+        self.requests += 1
+        start_response('200 OK', [('Content-Length', '2')])
+        return ['ok']
+
+    def test_keep_alive(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port)
+        for _i in range(3):
+            response = pool.request('GET', '/')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.body, 'ok')
+        self.assertEqual(self.requests, 3)
+        self.assertEqual(self.sock.accepted, 1)
+        pool.close()
+
+    def test_idle_timeout(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port,
+                                           idle_timeout=0)
+        pool.request('GET', '/')
+        pool.request('GET', '/')
+        self.assertEqual(self.sock.accepted, 2)
+
+    def test_closed_connection(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port)
+        pool.request('GET', '/')
+        pool._idle[0][0].close()
+        self.assertEqual(pool.request('GET', '/').body, 'ok')
+        self.assertEqual(self.sock.accepted, 2)
+
+    def _break_idle_connection(self, pool):
+        # Looks usable, but fails as soon as a request is written to it
+        pool._idle[0][0].sock.shutdown(socket.SHUT_RDWR)
+        pool._is_usable = lambda conn: True
+
+    def test_retry_idempotent(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port)
+        pool.request('GET', '/')
+        self._break_idle_connection(pool)
+        self.assertEqual(pool.request('GET', '/').body, 'ok')
+        self.assertEqual(self.requests, 2)
+        self.assertEqual(self.sock.accepted, 2)
+
+    def test_no_retry_post(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port)
+        pool.request('GET', '/')
+        self._break_idle_connection(pool)
+        self.assertRaises(socket.error, pool.request, 'POST', '/', 'body')
+        self.assertEqual(self.requests, 1)
+
+    def test_max_size(self):
+        pool = bufferedhttp.ConnectionPool('127.0.0.1', self.port,
+                                           max_size=2)
+        green_pool = eventlet.GreenPool()
+        for _i in range(6):
+            green_pool.spawn(pool.request, 'GET', '/')
+        green_pool.waitall()
+        self.assertEqual(self.requests, 6)
+        self.assertTrue(self.sock.accepted <= 2)
+
+    def test_shared_pool(self):
+        pool = bufferedhttp.get_pool('127.0.0.1', self.port)
+        self.assertIs(bufferedhttp.get_pool('127.0.0.1', str(self.port)),
+                      pool)
+        self.assertIsNot(bufferedhttp.get_pool('127.0.0.1', self.port,
+                                               ssl=True), pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
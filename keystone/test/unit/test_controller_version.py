@@ -20,6 +20,7 @@ from lxml import etree
 import unittest2 as unittest
 from webob import Request
 
+from keystone.controllers import version
 from keystone.controllers.version import VersionController
 
 LOGGER = logging.getLogger(__name__)
@@ -135,5 +136,50 @@ class TestVersionController(unittest.TestCase):
     def test_atom_version_service(self):
         self._atom_version(file='service/version')
 
+
+class TestVersionDocuments(unittest.TestCase):
+    def setUp(self):
+        version._DOCUMENTS.clear()
+        self.controller = VersionController({})
+
+    def _get(self, **headers):
+        req = Request.blank('/', environ={'SERVER_NAME': 'localhost',
+                                          'SERVER_PORT': '5000'})
+        req.headers.update(headers)
+        return self.controller.get_version_info(req, file='admin/version')
+
+    def test_rendered_once(self):
+        first = self._get()
+        self.assertEqual(len(version._DOCUMENTS), 1)
+        second = self._get()
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first.etag, second.etag)
+        self.assertEqual(len(version._DOCUMENTS), 1)
+        self._get(Accept='application/xml')
+        self.assertEqual(len(version._DOCUMENTS), 2)
+
+    def test_if_none_match(self):
+        etag = self._get().headers['ETag']
+        response = self._get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, '')
+        response = self._get(**{'If-None-Match': '"other"'})
+        self.assertEqual(response.status_int, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self._get().headers['Last-Modified']
+        response = self._get(**{'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_int, 304)
+        response = self._get(**{'If-Modified-Since':
+                                'Thu, 01 Jan 1970 00:00:00 GMT'})
+        self.assertEqual(response.status_int, 200)
+
+    def test_multiple_choice(self):
+        req = Request.blank('/', environ={'SERVER_NAME': 'localhost',
+                                          'SERVER_PORT': '5000'})
+        response = self.controller.get_multiple_choice(req)
+        self.assertEqual(response.status_int, 300)
+        self.assertIn('http://localhost:5000/v2.0', response.body)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import unittest2 as unittest
+
+TOPDIR = os.path.normpath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir, os.pardir, os.pardir))
+
+# Modules that neither keystone-manage --help nor auth_token need
+WSGI_STACK = ['eventlet.wsgi', 'lxml', 'paste.deploy', 'routes',
+              'keystone.common.wsgi']
+BACKENDS = ['sqlalchemy', 'keystone.backends', 'passlib']
+
+
+class TestImportTime(unittest.TestCase):
+    def run_python(self, args):
+        """Runs python with args in a new process, with this tree first on
+        the path, and returns its output. Fails unless it exits with 0."""
+        pythonpath = [TOPDIR]
+        if os.environ.get('PYTHONPATH'):
+            pythonpath.append(os.environ['PYTHONPATH'])
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(pythonpath))
+        process = subprocess.Popen([sys.executable] + args, cwd=TOPDIR,
+                                   env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        self.assertEqual(process.returncode, 0, output)
+        return output
+
+    def loaded_modules(self, code):
+        """Returns the modules loaded by running code in a new process"""
+        return self.run_python(['-c', code +
+            '\nimport sys\nprint " ".join(sys.modules)']).split()
+
+    def assertNotLoaded(self, names, modules):
+        for name in names:
+            self.assertNotIn(name, modules)
+
+    def test_manage_help(self):
+        # Goes to keystone.manage2
+        output = self.run_python([os.path.join('bin', 'keystone-manage'),
+                                  '--help'])
+        self.assertIn('usage', output)
+
+    def test_legacy_manage_help(self):
+        # Goes to keystone.manage, as the first argument is an object type
+        output = self.run_python([os.path.join('bin', 'keystone-manage'),
+                                  'user', '--help'])
+        self.assertIn('Usage: keystone-manage', output)
+
+    def test_manage_imports(self):
+        modules = self.loaded_modules(
+            'import keystone.manage, keystone.manage2')
+        self.assertNotLoaded(WSGI_STACK + BACKENDS + ['eventlet'], modules)
+
+    def test_auth_token(self):
+        self.run_python(['-c', 'from keystone.middleware import auth_token; '
+                         'auth_token.filter_factory({})'])
+
+    def test_auth_token_imports(self):
+        modules = self.loaded_modules(
+            'from keystone.middleware import auth_token')
+        self.assertNotLoaded(WSGI_STACK + BACKENDS + ['keystone.tools.tracer'],
+                             modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
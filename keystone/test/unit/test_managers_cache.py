@@ -0,0 +1,282 @@
+import datetime
+import json
+import time
+import unittest2 as unittest
+from lxml import etree
+
+from keystone.logic.types import auth
+from keystone.logic.types.auth import AuthWithPasswordCredentials
+from keystone.logic.types.endpoint import EndpointTemplate
+from keystone.logic.types.fault import UnauthorizedFault
+from keystone.logic.types.user import User
+from keystone.managers import cache
+import keystone.logic.service as service
+from keystone.models import Service
+from keystone.test.unit.base import AdminAPITest
+
+
+class TestCache(unittest.TestCase):
+    '''Unit tests for keystone/managers/cache.py:Cache class.'''
+
+    def setUp(self):
+        cache.configure({'identity_cache_enabled': 'True',
+                         'identity_cache_size': '2',
+                         'identity_cache_ttl': '60'})
+        self.cache = cache.Cache('test')
+        self.loads = 0
+
+    def tearDown(self):
+        cache.configure({})
+
+    def load(self):
+        self.loads += 1
+        return 'value'
+
+    def test_hit_and_miss(self):
+        self.assertEquals(self.cache.get('key', self.load), 'value')
+        self.assertEquals(self.cache.get('key', self.load), 'value')
+        self.assertEquals(self.loads, 1)
+        self.assertEquals(self.cache.stats(), {'name': 'test', 'size': 1,
+                                               'hits': 1, 'misses': 1})
+
+    def test_none_is_not_cached(self):
+        self.cache.get('key', lambda: None)
+        self.assertEquals(self.cache.stats()['size'], 0)
+
+    def test_size_is_bounded(self):
+        for key in ['a', 'b', 'c']:
+            self.cache.get(key, self.load)
+        self.assertEquals(self.cache.stats()['size'], 2)
+        self.cache.get('c', self.load)
+        self.assertEquals(self.loads, 3)
+
+    def test_entries_expire(self):
+        self.cache.get('key', self.load)
+        self.cache._data['key'] = (time.time() - 1, 'value')
+        self.cache.get('key', self.load)
+        self.assertEquals(self.loads, 2)
+
+    def test_invalidate(self):
+        self.cache.get('key', self.load)
+        self.cache.invalidate()
+        self.cache.get('key', self.load)
+        self.assertEquals(self.loads, 2)
+
+    def test_disabled(self):
+        cache.configure({})
+        self.cache.get('key', self.load)
+        self.cache.get('key', self.load)
+        self.assertEquals(self.loads, 2)
+        self.assertEquals(self.cache.stats()['misses'], 0)
+
+
+class TestIdentityServiceCache(AdminAPITest):
+    '''Checks that IdentityService invalidates cached identity data.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestIdentityServiceCache, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+        self.options['identity_cache_enabled'] = 'True'
+
+    def tearDown(self):
+        super(TestIdentityServiceCache, self).tearDown()
+        cache.configure({})
+
+    def test_lookups_are_cached(self):
+        service_id = self.service_attrs['id']
+        before = cache.get_cache('service').stats()
+        self.api.service_manager.get(service_id)
+        self.api.service_manager.get(service_id)
+        after = cache.get_cache('service').stats()
+        self.assertEquals(after['hits'] - before['hits'], 1)
+        self.assertEquals(after['misses'] - before['misses'], 1)
+
+    def test_create_service_invalidates(self):
+        self.assertIsNone(self.api.service_manager.get_by_name('new'))
+        self.api.service_manager.get(self.service_attrs['id'])
+        self.api.create_service(self.admin_token_id,
+                                Service(name='new', type='new'))
+        self.assertEquals(cache.get_cache('service').stats()['size'], 0)
+        self.assertIsNotNone(self.api.service_manager.get_by_name('new'))
+
+    def test_delete_service_invalidates(self):
+        service_id = self.service_attrs['id']
+        self.api.role_manager.get_by_service(service_id)
+        self.api.delete_service(self.admin_token_id, service_id)
+        self.assertIsNone(self.api.service_manager.get(service_id))
+        self.assertEquals(self.api.role_manager.get_by_service(service_id),
+                          [])
+
+    def test_catalog_is_cached_until_endpoints_change(self):
+        url_types = ['internal', 'public']
+        template = self.api.endpoint_template_manager.create({
+            'region': 'north', 'service_id': self.service_attrs['id'],
+            'public_url': 'http://public', 'internal_url': 'http://internal',
+            'admin_url': 'http://admin', 'enabled': True, 'is_global': True})
+        catalog = self.api.get_catalog(None, url_types)
+        self.assertEquals(catalog, (('test_service', 'test', (
+            (('region', 'north'), ('internalURL', 'http://internal'),
+             ('publicURL', 'http://public'), ('id', str(template.id))),)),))
+        self.assertIs(self.api.get_catalog(None, url_types), catalog)
+
+        template.public_url = 'http://new-public'
+        self.api.endpoint_template_manager.update(
+            {'id': template.id, 'public_url': 'http://new-public'})
+        self.assertEquals(self.api.get_catalog(None, url_types)[0][2][0][2],
+                          ('publicURL', 'http://new-public'))
+
+    def test_catalog_compiled_during_write_is_not_reused(self):
+        url_types = ['internal', 'public']
+        manager = self.api.endpoint_template_manager
+        driver = manager.driver
+        compiled = []
+        test = self
+
+        class InterleavedDriver(object):
+            def create(self, values):
+                # Another request compiles the catalog before the write
+                compiled.append(test.api.get_catalog(None, url_types))
+                return driver.create(values)
+
+        manager.driver = InterleavedDriver()
+        try:
+            manager.create({
+                'region': 'north', 'service_id': self.service_attrs['id'],
+                'public_url': 'http://public',
+                'internal_url': 'http://internal',
+                'admin_url': 'http://admin', 'enabled': True,
+                'is_global': True})
+        finally:
+            manager.driver = driver
+        self.assertNotEqual(self.api.get_catalog(None, url_types),
+                            compiled[0])
+
+    def test_failed_update_leaves_cached_template_alone(self):
+        manager = self.api.endpoint_template_manager
+        template = manager.create({
+            'region': 'north', 'service_id': self.service_attrs['id'],
+            'public_url': 'http://public', 'internal_url': 'http://internal',
+            'admin_url': 'http://admin', 'enabled': True, 'is_global': True})
+        self.assertIsNotNone(manager.get(template.id))
+        driver = manager.driver
+
+        class FailingDriver(object):
+            def __getattr__(self, name):
+                return getattr(driver, name)
+
+            def update(self, id, values):
+                raise RuntimeError("update failed")
+
+        manager.driver = FailingDriver()
+        try:
+            self.assertRaises(RuntimeError, self.api.modify_endpoint_template,
+                self.admin_token_id, template.id, EndpointTemplate(
+                    template.id, 'south', 'test_service', 'test',
+                    'http://new-public', 'http://admin', 'http://internal',
+                    True, True))
+        finally:
+            manager.driver = driver
+        cached = manager.get(template.id)
+        self.assertEquals(cached.region, 'north')
+        self.assertEquals(cached.public_url, 'http://public')
+
+
+class TestPasswordCache(AdminAPITest):
+    '''Checks that verified passwords are cached and forgotten when users
+    change.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestPasswordCache, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+        self.options['password_cache_enabled'] = 'True'
+
+    def setUp(self):
+        super(TestPasswordCache, self).setUp()
+        self.checks = []
+        driver = self.api.user_manager.driver
+        check_password = driver.check_password
+
+        def counted(user_id, password):
+            self.checks.append(password)
+            return check_password(user_id, password)
+        driver.check_password = counted
+
+    def tearDown(self):
+        super(TestPasswordCache, self).tearDown()
+        cache.configure({})
+
+    def authenticate(self, password):
+        return self.api.authenticate(
+            AuthWithPasswordCredentials('auth_user', password))
+
+    def test_repeat_authentication(self):
+        self.authenticate('auth_pass')
+        self.authenticate('auth_pass')
+        self.assertEquals(self.checks, ['auth_pass'])
+        self.assertNotIn('auth_pass', str(cache.get_cache('password')._data))
+
+    def test_wrong_password(self):
+        self.authenticate('auth_pass')
+        self.assertRaises(UnauthorizedFault, self.authenticate, 'wrong')
+        self.assertRaises(UnauthorizedFault, self.authenticate, 'wrong')
+        self.assertEquals(self.checks, ['auth_pass', 'wrong', 'wrong'])
+
+    def test_password_change_invalidates(self):
+        self.authenticate('auth_pass')
+        self.api.set_user_password(self.admin_token_id, self.auth_user['id'],
+                                   User(password='new_pass'))
+        self.assertRaises(UnauthorizedFault, self.authenticate, 'auth_pass')
+        self.authenticate('new_pass')
+        self.assertEquals(self.checks, ['auth_pass', 'auth_pass', 'new_pass'])
+
+
+class TestCompileCatalog(unittest.TestCase):
+    '''Unit tests for AuthData.compile_catalog.'''
+
+    class Endpoint(object):
+        def __init__(self, id, service_id, region=None, public_url=None,
+                     internal_url=None, admin_url=None):
+            self.id = id
+            self.service_id = service_id
+            self.region = region
+            self.public_url = public_url
+            self.internal_url = internal_url
+            self.admin_url = admin_url
+
+    def get_service(self, service_id):
+        return Service(id=service_id, name='nova', type='compute')
+
+    def test_tenant_urls(self):
+        endpoints = [self.Endpoint(1, 7, public_url='http://x/%tenant_id%',
+                                   admin_url='http://admin')]
+        self.assertEquals(auth.AuthData.compile_catalog(endpoints,
+            ['public', 'admin'], 'abc', self.get_service),
+            (('nova', 'compute', ((('publicURL', 'http://x/abc'),
+                                   ('adminURL', 'http://admin'),
+                                   ('id', '1')),)),))
+
+    def test_tenant_urls_need_a_tenant(self):
+        endpoints = [self.Endpoint(1, 7, public_url='http://x/%tenant_id%')]
+        self.assertEquals(auth.AuthData.compile_catalog(endpoints,
+            ['public'], None, self.get_service), ())
+
+    def test_rendering(self):
+        endpoints = [self.Endpoint(1, 7, region='r', public_url='http://x')]
+        data = auth.AuthData(auth.Token(datetime.datetime.now(), 'id'),
+                             auth.User('u', 'user', None, None),
+                             endpoints, url_types=['public'],
+                             get_service=self.get_service)
+        self.assertEquals(json.loads(data.to_json())['access'][
+            'serviceCatalog'], [{'name': 'nova', 'type': 'compute',
+            'endpoints': [{'region': 'r', 'publicURL': 'http://x',
+                           'id': '1'}]}])
+        endpoint = etree.fromstring(data.to_xml()).find(
+            '{http://docs.openstack.org/identity/api/v2.0}serviceCatalog/'
+            '{http://docs.openstack.org/identity/api/v2.0}service/'
+            '{http://docs.openstack.org/identity/api/v2.0}endpoint')
+        self.assertEquals(endpoint.items(), [('region', 'r'),
+            ('publicURL', 'http://x'), ('id', '1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,7 @@
 
 
 import unittest2 as unittest
+from keystone.frontends import normalizer
 from keystone.frontends.normalizer import NormalizingFilter
 
 
@@ -89,6 +90,47 @@ class NormalizingFilterTest(unittest.TestCase):
         self.assertEqual('/someresource', env['PATH_INFO'])
         self.assertEqual('application/json', env['HTTP_ACCEPT'])
 
+    def test_unversioned_path(self):
+        responses = []
+        env = {'PATH_INFO': '/someresource', 'REQUEST_METHOD': 'GET',
+               'SERVER_NAME': 'localhost', 'SERVER_PORT': '5000'}
+        self.filter(env, lambda status, headers: responses.append(status))
+        controller = self.filter.version_controller
+        self.filter(dict(env), lambda status, headers:
+                    responses.append(status))
+        self.assertEqual(['300 Multiple Choices'] * 2, responses)
+        self.assertIs(controller, self.filter.version_controller)
+
+
+class NegotiateTest(unittest.TestCase):
+
+    def setUp(self):
+        normalizer._NEGOTIATED.clear()
+
+    def test_negotiate(self):
+        accept = 'text/html, application/xml;q=0.9'
+        self.assertEqual(('xml', None), normalizer.negotiate(accept))
+        self.assertEqual(('json', None),
+                         normalizer.negotiate(accept, '.json'))
+        self.assertEqual(('json', '2.0'), normalizer.negotiate(
+            'application/vnd.openstack.identity-v2.0+json'))
+        self.assertEqual((None, None), normalizer.negotiate('text/html'))
+        self.assertEqual((None, None), normalizer.negotiate(None))
+
+    def test_memoized(self):
+        accept = 'text/html, application/xml;q=0.9'
+        normalizer.negotiate(accept, '.json')
+        self.assertIn((accept, '.json'), normalizer._NEGOTIATED)
+        normalizer._NEGOTIATED[(accept, '.json')] = ('atom+xml', '1.1')
+        self.assertEqual(('atom+xml', '1.1'),
+                         normalizer.negotiate(accept, '.json'))
+
+    def test_bounded(self):
+        for i in range(normalizer.MAX_NEGOTIATED * 2):
+            normalizer.negotiate('application/x-%s' % i)
+        self.assertTrue(
+            len(normalizer._NEGOTIATED) <= normalizer.MAX_NEGOTIATED)
+
 
 if __name__ == '__main__':
     unittest.main()
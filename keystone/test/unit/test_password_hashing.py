@@ -0,0 +1,54 @@
+import eventlet
+import unittest2 as unittest
+
+import keystone.backends as backends
+from keystone.backends import backendutils
+
+
+class TestHashPool(unittest.TestCase):
+    '''Unit tests for hashing passwords in worker threads.'''
+
+    def setUp(self):
+        super(TestHashPool, self).setUp()
+        self.should_hash = backends.SHOULD_HASH_PASSWORD
+        backends.SHOULD_HASH_PASSWORD = 'True'
+
+    def tearDown(self):
+        super(TestHashPool, self).tearDown()
+        backends.SHOULD_HASH_PASSWORD = self.should_hash
+        backendutils.configure({})
+
+    def test_disabled_by_default(self):
+        backendutils.configure({})
+        self.assertIsNone(backendutils.POOL)
+
+    def test_hash_and_verify(self):
+        backendutils.configure({'password_hash_workers': '2'})
+        values = {'password': 'secret'}
+        backendutils.set_hashed_password(values)
+        self.assertNotEqual(values['password'], 'secret')
+        self.assertTrue(backendutils.check_password('secret',
+                                                    values['password']))
+        self.assertFalse(backendutils.check_password('wrong',
+                                                     values['password']))
+        self.assertEqual(backendutils.POOL.stats()['calls'], 3)
+
+    def test_queue_depth(self):
+        backendutils.configure({'password_hash_workers': '1'})
+        values = {'password': 'secret'}
+        backendutils.set_hashed_password(values)
+
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(backendutils.check_password,
+                                 ['secret'] * 3, [values['password']] * 3))
+        self.assertEqual(results, [True] * 3)
+
+        stats = backendutils.POOL.stats()
+        self.assertEqual(stats['calls'], 4)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['max_queued'], 2)
+        self.assertTrue(stats['max_wait'] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import datetime
+import unittest2 as unittest
+
+from sqlalchemy import event
+
+from keystone.backends.sqlalchemy import get_session
+import keystone.logic.service as service
+from keystone.test.unit.base import AdminAPITest
+
+
+class TestQueryPlans(AdminAPITest):
+    '''Checks that the queries made when authenticating users and validating
+    tokens look rows up by index rather than scanning whole tables.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestQueryPlans, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+        self.statements = None
+
+    def setUp(self):
+        super(TestQueryPlans, self).setUp()
+        self.engine = get_session().bind
+        if self.engine.name != 'sqlite':
+            self.skipTest('Query plans are only checked on sqlite')
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context,
+                executemany):
+        if self.statements is not None and \
+                statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+    def assertUsesIndexes(self, fnc, *args):
+        self.statements = []
+        try:
+            fnc(*args)
+            statements = self.statements
+        finally:
+            self.statements = None
+        self.assertTrue(statements)
+
+        cursor = self.engine.raw_connection().cursor()
+        for statement, parameters in statements:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            scans = [row[-1] for row in cursor.fetchall()
+                     if row[-1].startswith('SCAN')]
+            self.assertEqual(scans, [], 'Full scan in %s' % statement)
+
+    def test_find_token(self):
+        self.assertUsesIndexes(self.api.token_manager.find,
+                               self.auth_user['id'], 'tenant1')
+        self.assertUsesIndexes(self.api.token_manager.find,
+                               self.auth_user['id'])
+
+    def test_validation_data(self):
+        self.assertUsesIndexes(self.api.token_manager.get_validation_data,
+                               self.auth_token_id)
+
+    def test_role_grants(self):
+        self.assertUsesIndexes(
+            self.api.grant_manager.list_global_roles_for_user,
+            self.auth_user['id'])
+        self.assertUsesIndexes(
+            self.api.grant_manager.list_tenant_roles_for_user,
+            self.auth_user['id'], 'tenant1')
+
+    def test_ec2_credentials(self):
+        self.assertUsesIndexes(self.api.credential_manager.get_by_access,
+                               'access')
+
+    def test_tenant_endpoints(self):
+        self.assertUsesIndexes(
+            self.api.endpoint_manager.endpoint_get_by_tenant_get_page,
+            'tenant1', None, 10)
+
+    def test_expired_tokens(self):
+        self.fixture_create_token(id='expired', user_id=self.auth_user['id'],
+            expires=datetime.datetime.now() - datetime.timedelta(hours=1))
+        self.assertUsesIndexes(self.api.token_manager.delete_expired)
+
+
+if __name__ == '__main__':
+    unittest.main()
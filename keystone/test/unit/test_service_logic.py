@@ -1,10 +1,13 @@
 import datetime as dt
+import json
 import unittest2 as unittest
 
+from keystone import server
+from keystone.logic import context
 import keystone.logic.service as service
 from keystone.test.unit.base import ServiceAPITest, AdminAPITest
 from keystone.logic.types.fault import ItemNotFoundFault, UnauthorizedFault
-from keystone.logic.types.auth import ValidateData
+from keystone.logic.types.auth import TokenIds, ValidateData
 
 
 class TestServiceLogic(AdminAPITest):
@@ -49,6 +52,90 @@ class TestServiceLogic(AdminAPITest):
         data = self.api.validate_token(self.admin_token_id, self.auth_token_id)
         self.assertTrue(isinstance(data, ValidateData))
 
+    def test_validate_token_in_one_query(self):
+        data = self.api._validate_token_in_one_query(self.auth_token_id)
+        self.assertTrue(isinstance(data, ValidateData))
+        self.assertEqual(data.user.username, self.auth_user["name"])
+        self.assertEqual([role.name for role in data.user.rolegrants.values],
+                         [self.role_fixtures[0]["name"]])
+
+    def test_validate_token_without_one_query_support(self):
+        expected = self.api.validate_token(self.admin_token_id,
+                                           self.auth_token_id)
+
+        def not_supported(token_id):
+            raise NotImplementedError
+        self.api.token_manager.get_validation_data = not_supported
+        data = self.api.validate_token(self.admin_token_id,
+                                       self.auth_token_id)
+        self.assertEqual(json.loads(expected.to_json()),
+                         json.loads(data.to_json()))
+
+    def test_validate_service_admin_token_once_per_request(self):
+        calls = []
+
+        def counted(name, fnc):
+            def _wrapper(*args, **kwargs):
+                calls.append(name)
+                return fnc(*args, **kwargs)
+            return _wrapper
+        self.api.token_manager.get = counted('token',
+                                             self.api.token_manager.get)
+        self.api.grant_manager.list_global_roles_for_user = counted('grants',
+            self.api.grant_manager.list_global_roles_for_user)
+
+        self.api.validate_service_admin_token(self.admin_token_id)
+        self.assertEqual(sorted(calls), ['grants', 'token'])
+        self.assertIsNone(context.get_current())
+
+        # Each request validates again
+        self.api.validate_service_admin_token(self.admin_token_id)
+        self.assertEqual(len(calls), 4)
+
+    def test_validate_tokens(self):
+        validations = self.api.validate_tokens(self.admin_token_id,
+            [self.auth_token_id, "bad_id", self.admin_token_id])
+        results = dict(validations.results)
+        self.assertTrue(isinstance(results[self.auth_token_id], ValidateData))
+        self.assertTrue(isinstance(results["bad_id"], ItemNotFoundFault))
+        self.assertEqual(results[self.admin_token_id].user.username,
+                         self.admin_user["name"])
+
+        validations = json.loads(validations.to_json())["validations"]
+        self.assertEqual([v["id"] for v in validations],
+            [self.auth_token_id, "bad_id", self.admin_token_id])
+        self.assertIn("access", validations[0])
+        self.assertIn("itemNotFound", validations[1])
+
+    def test_validate_tokens_without_one_query_support(self):
+        def not_supported(token_ids):
+            raise NotImplementedError
+        self.api.token_manager.get_validation_data_for_all = not_supported
+        validations = self.api.validate_tokens(self.admin_token_id,
+            [self.auth_token_id, "bad_id"])
+        results = dict(validations.results)
+        self.assertTrue(isinstance(results[self.auth_token_id], ValidateData))
+        self.assertTrue(isinstance(results["bad_id"], ItemNotFoundFault))
+
+    def test_validate_tokens_requires_service_admin(self):
+        self.assertRaises(UnauthorizedFault, self.api.validate_tokens,
+                          self.auth_token_id, [self.auth_token_id])
+
+    def test_token_ids_from_json(self):
+        token_ids = TokenIds.from_json(
+            '{"tokens": [{"id": "a"}, {"id": "b"}]}')
+        self.assertEqual(token_ids.ids, ["a", "b"])
+
+    def test_token_ids_from_xml(self):
+        token_ids = TokenIds.from_xml(
+            '<tokens xmlns="http://docs.openstack.org/identity/api/v2.0">'
+            '<token id="a"/><token id="b"/></tokens>')
+        self.assertEqual(token_ids.ids, ["a", "b"])
+
+    def test_validate_missing_token_in_one_query(self):
+        self.assertRaises(ItemNotFoundFault,
+                          self.api._validate_token_in_one_query, "bad_id")
+
     def test_remove_role_from_user(self):
         auth_userid = self.auth_user["id"]
         regular_role_id = self.role_fixtures[0]["id"]
@@ -60,6 +147,31 @@ class TestServiceLogic(AdminAPITest):
         self.api.remove_role_from_user(self.admin_token_id,
                 auth_userid, regular_role_id)
 
+    def test_identity_service_per_app_load(self):
+        def identity_services(app):
+            return set(route.defaults['controller'].identity_service
+                       for route in app.map.matchlist
+                       if hasattr(route.defaults.get('controller'),
+                                  'identity_service'))
+
+        # All the controllers of one load, extensions included, share an
+        # identity service, but loading the app again builds a new one
+        first = identity_services(server.AdminApi(self.options))
+        second = identity_services(server.AdminApi(self.options))
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first, second)
+
+
+class TestAdminApi(AdminAPITest):
+    """Checks the admin API only lets admins list all tenants."""
+
+    def test_get_tenants_requires_admin(self):
+        self.get_request('GET', '/tenants',
+                         headers={'X-Auth-Token': self.auth_token_id})
+        self.get_response()
+        self.status_unauthorized()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,157 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest2 as unittest
+
+import webob
+
+from keystone.common import signing
+import keystone.logic.service as service
+from keystone.logic.types.auth import AuthWithPasswordCredentials, \
+    ValidateData
+from keystone.middleware import auth_token
+from keystone.test.unit.base import AdminAPITest
+
+
+def make_key_dir():
+    key_dir = tempfile.mkdtemp()
+    add_key(key_dir, '1', 'first secret')
+    return key_dir
+
+
+def add_key(key_dir, key_id, secret):
+    with open(os.path.join(key_dir, key_id), 'w') as key_file:
+        key_file.write(secret)
+
+
+def make_claims(expires=None):
+    expires = expires or datetime.datetime(2100, 1, 1)
+    return {'id': 'token1', 'expires': expires.isoformat(),
+            'user': {'id': 'u1', 'name': 'user1'},
+            'tenant': {'id': 't1', 'name': 'tenant1'},
+            'roles': ['Member']}
+
+
+class TestSigning(unittest.TestCase):
+    '''Unit tests for keystone/common/signing.py.'''
+
+    def setUp(self):
+        self.key_dir = make_key_dir()
+        self.keys = signing.KeyRing(self.key_dir, check_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.key_dir)
+
+    def test_sign_and_verify(self):
+        token = signing.sign(make_claims(), self.keys)
+        self.assertTrue(signing.is_signed(token))
+        self.assertTrue(token.startswith('1.'))
+        self.assertEqual(signing.verify(token, self.keys), make_claims())
+
+    def test_token_id(self):
+        token = signing.sign(make_claims(), self.keys)
+        self.assertEqual(signing.token_id(token), 'token1')
+        self.assertEqual(signing.token_id('plain-token'), 'plain-token')
+
+    def test_tampered_claims(self):
+        key_id, _payload, signature = \
+            signing.sign(make_claims(), self.keys).split('.')
+        claims = make_claims()
+        claims['roles'] = ['Admin']
+        payload = signing._encode(json.dumps(claims))
+        self.assertRaises(signing.InvalidToken, signing.verify,
+                          '%s.%s.%s' % (key_id, payload, signature),
+                          self.keys)
+
+    def test_malformed_token(self):
+        self.assertRaises(signing.InvalidToken, signing.verify, 'plain',
+                          self.keys)
+
+    def test_rotation(self):
+        old_token = signing.sign(make_claims(), self.keys)
+        add_key(self.key_dir, '2', 'second secret')
+        # directory mtime resolution may hide the new file
+        self.keys._mtime = None
+        new_token = signing.sign(make_claims(), self.keys)
+        self.assertTrue(new_token.startswith('2.'))
+        self.assertEqual(signing.verify(old_token, self.keys), make_claims())
+
+        os.remove(os.path.join(self.key_dir, '1'))
+        self.keys._mtime = None
+        self.assertRaises(signing.UnknownKey, signing.verify, old_token,
+                          self.keys)
+        self.assertEqual(signing.verify(new_token, self.keys), make_claims())
+
+
+class TestSignedTokenIssuance(AdminAPITest):
+    '''Checks that IdentityService signs tokens when configured to.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestSignedTokenIssuance, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+        self.key_dir = make_key_dir()
+        self.options['token_signing_key_dir'] = self.key_dir
+
+    def tearDown(self):
+        super(TestSignedTokenIssuance, self).tearDown()
+        shutil.rmtree(self.key_dir)
+
+    def test_authenticate(self):
+        auth_data = self.api.authenticate(
+            AuthWithPasswordCredentials('auth_user', 'auth_pass'))
+        claims = signing.verify(auth_data.token.id, self.api.signing_keys)
+        self.assertEqual(claims['id'], self.auth_token_id)
+        self.assertEqual(claims['user']['name'], 'auth_user')
+        self.assertEqual(claims['tenant'], {'id': None, 'name': None})
+        self.assertEqual(claims['roles'], ['regular_role'])
+
+        data = self.api.validate_token(self.admin_token_id,
+                                       auth_data.token.id)
+        self.assertTrue(isinstance(data, ValidateData))
+
+
+class TestAuthTokenSignedClaims(unittest.TestCase):
+    '''Checks that auth_token verifies signed tokens locally.'''
+
+    def setUp(self):
+        self.key_dir = make_key_dir()
+        self.keys = signing.KeyRing(self.key_dir)
+        self.env = None
+        self.middleware = auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'signing_key_dir': self.key_dir})
+
+    def tearDown(self):
+        shutil.rmtree(self.key_dir)
+
+    def app(self, env, start_response):
+        self.env = env
+        start_response('200 OK', [])
+        return ['OK']
+
+    def call(self, token):
+        req = webob.Request.blank('/', headers={'X-Auth-Token': token})
+        return req.get_response(self.middleware)
+
+    def test_valid_token(self):
+        response = self.call(signing.sign(make_claims(), self.keys))
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(self.env['HTTP_X_USER_NAME'], 'user1')
+        self.assertEqual(self.env['HTTP_X_TENANT_ID'], 't1')
+        self.assertEqual(self.env['HTTP_X_ROLES'], 'Member')
+
+    def test_expired_token(self):
+        expired = datetime.datetime.now() - datetime.timedelta(hours=1)
+        response = self.call(signing.sign(make_claims(expired), self.keys))
+        self.assertEqual(response.status_int, 401)
+
+    def test_bad_signature(self):
+        token = signing.sign(make_claims(), self.keys)
+        response = self.call(token[:-2] + 'xx')
+        self.assertEqual(response.status_int, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
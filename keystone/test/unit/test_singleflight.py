@@ -0,0 +1,52 @@
+import eventlet
+import unittest2 as unittest
+
+from keystone.common import singleflight
+
+
+class TestGroup(unittest.TestCase):
+    '''Unit tests for coalescing concurrent calls.'''
+
+    def setUp(self):
+        self.group = singleflight.Group()
+        self.calls = []
+
+    def slow(self, value):
+        self.calls.append(value)
+        eventlet.sleep(0.01)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_concurrently(self, keys_and_values):
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(self.group.do, key, self.slow, value)
+                   for key, value in keys_and_values]
+        return threads
+
+    def test_coalesces_same_key(self):
+        threads = self.run_concurrently([('a', 1)] * 5)
+        self.assertEqual([thread.wait() for thread in threads], [1] * 5)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(self.group.coalesced, 4)
+
+    def test_different_keys(self):
+        threads = self.run_concurrently([('a', 1), ('b', 2)])
+        self.assertEqual([thread.wait() for thread in threads], [1, 2])
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_shares_exception(self):
+        error = ValueError('bad')
+        threads = self.run_concurrently([('a', error)] * 3)
+        for thread in threads:
+            self.assertRaises(ValueError, thread.wait)
+        self.assertEqual(self.calls, [error])
+
+    def test_sequential_calls(self):
+        self.assertEqual(self.group.do('a', self.slow, 1), 1)
+        self.assertEqual(self.group.do('a', self.slow, 2), 2)
+        self.assertEqual(self.calls, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
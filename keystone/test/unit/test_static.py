@@ -0,0 +1,92 @@
+import gzip
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+import unittest2 as unittest
+
+from webob import Request
+
+from keystone.common import static
+from keystone.logic.types import fault
+
+
+class TestContentCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.body = 'compressible ' * 1000
+        with open(os.path.join(self.root, 'doc.xml'), 'wb') as fileobj:
+            fileobj.write(self.body)
+        self.cache = static.ContentCache(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _get(self, filename='doc.xml', **headers):
+        req = Request.blank('/')
+        req.headers.update(headers)
+        return self.cache.response(req, filename)
+
+    def test_serve(self):
+        response = self._get()
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, self.body)
+        self.assertEqual(response.content_type, 'application/xml')
+        self.assertIsNotNone(response.headers.get('ETag'))
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+    def test_loaded_once(self):
+        self._get()
+        os.remove(os.path.join(self.root, 'doc.xml'))
+        self.assertEqual(self._get().body, self.body)
+        self.assertIs(self.cache.get('doc.xml'), self.cache.get('./doc.xml'))
+
+    def test_gzip(self):
+        response = self._get(**{'Accept-Encoding': 'deflate, gzip'})
+        self.assertEqual(response.content_encoding, 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        body = gzip.GzipFile(fileobj=StringIO(response.body)).read()
+        self.assertEqual(body, self.body)
+
+        response = self._get(**{'Accept-Encoding': 'gzip;q=0'})
+        self.assertEqual(response.content_encoding, None)
+        self.assertEqual(response.body, self.body)
+
+    def test_gzip_etag(self):
+        etag = self._get().headers['ETag']
+        gzip_etag = self._get(**{'Accept-Encoding': 'gzip'}).headers['ETag']
+        self.assertNotEqual(etag, gzip_etag)
+
+        response = self._get(**{'Accept-Encoding': 'gzip',
+                                'If-None-Match': etag})
+        self.assertEqual(response.status_int, 200)
+        response = self._get(**{'Accept-Encoding': 'gzip',
+                                'If-None-Match': gzip_etag})
+        self.assertEqual(response.status_int, 304)
+
+    def test_if_none_match(self):
+        etag = self._get().headers['ETag']
+        response = self._get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, '')
+
+    def test_stream_large_file(self):
+        old_size = static.MAX_CACHED_SIZE
+        static.MAX_CACHED_SIZE = 10
+        try:
+            response = self._get()
+        finally:
+            static.MAX_CACHED_SIZE = old_size
+        self.assertIsInstance(response.app_iter, static.FileIter)
+        self.assertEqual(response.content_length, len(self.body))
+        self.assertEqual(response.body, self.body)
+
+    def test_missing_file(self):
+        self.assertRaises(fault.ItemNotFoundFault, self._get, 'missing')
+
+    def test_outside_root(self):
+        self.assertRaises(fault.ForbiddenFault, self._get, '../passwd')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import datetime
+import unittest2 as unittest
+
+import keystone.backends.api as db_api
+from keystone.backends.sqlalchemy import get_session, models
+import keystone.logic.service as service
+from keystone.manage import api as manage_api
+from keystone.test.unit.base import AdminAPITest
+
+
+class TestTokenFlush(AdminAPITest):
+    '''Unit tests for deleting expired tokens.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestTokenFlush, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+
+    def setUp(self):
+        super(TestTokenFlush, self).setUp()
+        expired = datetime.datetime.now() - datetime.timedelta(hours=1)
+        for i in range(5):
+            self.fixture_create_token(id='expired%s' % i,
+                                      user_id=self.auth_user['id'],
+                                      expires=expired)
+
+    def token_ids(self):
+        return sorted(token.id for token in db_api.TOKEN.get_all())
+
+    def test_delete_expired(self):
+        self.assertEqual(self.api.token_manager.delete_expired(2), 5)
+        self.assertEqual(self.token_ids(),
+                         sorted([self.admin_token_id, self.auth_token_id]))
+        self.assertEqual(self.api.token_manager.delete_expired(2), 0)
+
+    def test_delete_expired_revocations(self):
+        self.api.revoke_token(self.admin_token_id, 'expired0')
+        self.api.revoke_token(self.admin_token_id, 'expired1')
+        self.api.token_manager.delete_expired()
+        # The newest revocation is kept, so the revision does not go back
+        revision, _revoked = db_api.TOKEN.get_revoked(0)
+        self.assertEqual(revision, 2)
+        self.assertEqual(get_session().query(models.RevokedToken).count(), 1)
+
+    def test_manage_flush_tokens(self):
+        self.assertEqual(manage_api.flush_tokens(), 5)
+        self.assertEqual(len(self.token_ids()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
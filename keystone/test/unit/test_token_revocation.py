@@ -0,0 +1,107 @@
+import datetime
+import shutil
+import unittest2 as unittest
+
+import webob
+
+from keystone.common import signing
+import keystone.logic.service as service
+from keystone.logic.types.fault import ItemNotFoundFault
+from keystone.logic.types.user import User
+from keystone.middleware import auth_token
+from keystone.test.unit.base import AdminAPITest
+from keystone.test.unit.test_signing import make_claims, make_key_dir
+
+
+class TestTokenRevocation(AdminAPITest):
+    '''Unit tests for the token revocation list.'''
+
+    def __init__(self, *args, **kwargs):
+        super(TestTokenRevocation, self).__init__(*args, **kwargs)
+        self.api_class = service.IdentityService
+
+    def revoked_ids(self, since=0):
+        revoked = self.api.get_revoked_tokens(self.admin_token_id, since)
+        return revoked.revision, [token_id for token_id, _expires
+                                  in revoked.tokens]
+
+    def test_revoke_token(self):
+        self.assertEqual(self.revoked_ids(), (0, []))
+        self.api.revoke_token(self.admin_token_id, self.auth_token_id)
+        revision, token_ids = self.revoked_ids()
+        self.assertEqual(token_ids, [self.auth_token_id])
+        self.assertRaises(ItemNotFoundFault, self.api.validate_token,
+                          self.admin_token_id, self.auth_token_id)
+
+        # Nothing new since the last revision
+        self.assertEqual(self.revoked_ids(revision), (revision, []))
+
+    def test_disable_user(self):
+        user = User(id=self.auth_user['id'], enabled=False)
+        self.api.enable_disable_user(self.admin_token_id,
+                                     self.auth_user['id'], user)
+        self.assertEqual(self.revoked_ids()[1], [self.auth_token_id])
+
+    def test_set_user_password(self):
+        user = User(id=self.auth_user['id'], password='new_pass')
+        self.api.set_user_password(self.admin_token_id,
+                                   self.auth_user['id'], user)
+        self.assertEqual(self.revoked_ids()[1], [self.auth_token_id])
+
+    def test_to_json(self):
+        self.api.revoke_token(self.admin_token_id, self.auth_token_id)
+        revoked = self.api.get_revoked_tokens(self.admin_token_id, 0)
+        self.assertIn('"revokedTokens"', revoked.to_json())
+        self.assertIn(self.auth_token_id, revoked.to_xml())
+
+
+class TestAuthTokenRevocation(unittest.TestCase):
+    '''Checks that auth_token rejects tokens on the revocation list.'''
+
+    def setUp(self):
+        self.key_dir = make_key_dir()
+        self.keys = signing.KeyRing(self.key_dir)
+        self.polls = []
+        self.revoked = []
+        self.middleware = auth_token.AuthProtocol(self.app, {
+            'auth_host': '127.0.0.1', 'auth_port': '35357',
+            'admin_token': 'unused', 'signing_key_dir': self.key_dir,
+            'revocation_poll_interval': '60'})
+        self.middleware._fetch_revoked_tokens = self.fetch_revoked_tokens
+
+    def tearDown(self):
+        shutil.rmtree(self.key_dir)
+
+    def app(self, env, start_response):
+        start_response('200 OK', [])
+        return ['OK']
+
+    def fetch_revoked_tokens(self, since):
+        self.polls.append(since)
+        expires = datetime.datetime(2100, 1, 1).isoformat()
+        return {'revision': len(self.revoked),
+                'tokens': [{'id': token_id, 'expires': expires}
+                           for token_id in self.revoked[since:]]}
+
+    def call(self, token):
+        req = webob.Request.blank('/', headers={'X-Auth-Token': token})
+        return req.get_response(self.middleware)
+
+    def test_revoked_signed_token(self):
+        token = signing.sign(make_claims(), self.keys)
+        self.assertEqual(self.call(token).status_int, 200)
+
+        self.revoked.append('token1')
+        # Not polled again before the interval is over
+        self.assertEqual(self.call(token).status_int, 200)
+        self.middleware._next_revocation_poll = 0
+        self.assertEqual(self.call(token).status_int, 401)
+        self.assertEqual(self.polls, [0, 0])
+
+        self.middleware._next_revocation_poll = 0
+        self.assertEqual(self.call(token).status_int, 401)
+        self.assertEqual(self.polls, [0, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,7 +21,13 @@
 Test WSGI basics and provide some helper functions for other WSGI tests.
 """
 
+import os
+import signal
 import unittest2 as unittest
+
+import eventlet
+from eventlet import event
+from eventlet.green import urllib2
 import routes
 import webob
 
@@ -67,5 +73,132 @@ class TestWsgi(unittest.TestCase):
         self.assertNotEqual(result.body, "Router result")
 
 
+class TestAdmissionControl(unittest.TestCase):
+    """Checks that requests beyond the limits are queued, then rejected."""
+
+    def setUp(self):
+        self.done = event.Event()
+        self.control = wsgi.AdmissionControl(self.app, max_in_flight=1,
+                                             max_queue=1)
+
+    def app(self, environ, start_response):
+        self.done.wait()
+        start_response("200 OK", [])
+        return ['done']
+
+    def get(self):
+        return webob.Request.blank('/').get_response(self.control)
+
+    def test_limits(self):
+        first = eventlet.spawn(self.get)
+        second = eventlet.spawn(self.get)
+        eventlet.sleep(0)
+        self.assertEqual(self.control.stats()['in_flight'], 1)
+        self.assertEqual(self.control.stats()['queued'], 1)
+
+        result = self.get()
+        self.assertEqual(result.status_int, 503)
+        self.assertIn('serviceUnavailable', result.body)
+
+        self.done.send()
+        self.assertEqual(first.wait().body, 'done')
+        self.assertEqual(second.wait().body, 'done')
+        self.assertEqual(self.control.stats(), {'in_flight': 0, 'queued': 0,
+            'rejected': 1, 'max_in_flight': 1, 'max_queue': 1})
+
+    def test_release_after_streamed_body(self):
+        self.done.send()
+        self.control.application = lambda environ, start_response: \
+            iter(self.app(environ, start_response))
+        self.assertEqual(self.get().body, 'done')
+        self.assertEqual(self.control.stats()['in_flight'], 0)
+
+    def test_server_stats(self):
+        server = wsgi.Server(threads=10, max_in_flight=5, max_queue=2)
+        server.start(self.app, 0, host='127.0.0.1', key='limited')
+        try:
+            stats = server.stats()
+            self.assertEqual(stats['name'], 'limited')
+            self.assertEqual(stats['pool_size'], 10)
+            self.assertEqual(stats['max_in_flight'], 5)
+            self.assertEqual(stats['in_flight'], 0)
+            self.assertIn(stats, wsgi.get_stats())
+        finally:
+            server.threads['limited'].kill()
+
+
+class TestWorkers(unittest.TestCase):
+    """Checks that pre-forked workers serve and are supervised."""
+
+    def setUp(self):
+        self.handlers = [(signum, signal.getsignal(signum))
+                         for signum in (signal.SIGTERM, signal.SIGHUP)]
+        self.server = wsgi.Server(workers=2)
+        self.server.start(self.app, 0, host='127.0.0.1', key='test')
+        self.port = self.server.socket_info['test'].getsockname()[1]
+        self.supervisor = eventlet.spawn(self.server.wait)
+
+    def tearDown(self):
+        self.server._stop_workers()
+        self.supervisor.wait()
+        for signum, handler in self.handlers:
+            signal.signal(signum, handler)
+
+    @staticmethod
+    def app(environ, start_response):
+        start_response("200 OK", [])
+        return [str(os.getpid())]
+
+    def get_pid(self):
+        url = 'http://127.0.0.1:%s/' % self.port
+        for _i in range(50):
+            try:
+                return int(urllib2.urlopen(url).read())
+            except IOError:
+                eventlet.sleep(0.1)
+
+    def test_workers(self):
+        pids = set(self.get_pid() for _i in range(20))
+        self.assertNotIn(os.getpid(), pids)
+        self.assertTrue(pids <= self.server.children)
+        self.assertEqual(len(self.server.children), 2)
+
+    def test_restart_crashed_worker(self):
+        pid = self.get_pid()
+        os.kill(pid, signal.SIGKILL)
+        for _i in range(50):
+            if pid not in self.server.children and \
+                    len(self.server.children) == 2:
+                break
+            eventlet.sleep(0.1)
+        self.assertNotIn(pid, self.server.children)
+        self.assertEqual(len(self.server.children), 2)
+        self.assertNotEqual(self.get_pid(), pid)
+
+    def wait_for_workers(self):
+        self.get_pid()
+        for _i in range(50):
+            if len(self.server.children) == 2:
+                break
+            eventlet.sleep(0.1)
+        self.assertEqual(len(self.server.children), 2)
+
+    def test_stop(self):
+        self.wait_for_workers()
+        children = set(self.server.children)
+        self.server._stop_workers()
+        self.supervisor.wait()
+        self.assertEqual(self.server.children, set())
+        for pid in children:
+            self.assertRaises(OSError, os.kill, pid, 0)
+
+    def test_stop_before_supervisor_runs(self):
+        # setUp has not yielded to the supervisor yet
+        self.server._stop_workers()
+        with eventlet.Timeout(5):
+            self.supervisor.wait()
+        self.assertEqual(self.server.children, set())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -19,7 +19,6 @@ import functools
 import logging
 import os
 import sys
-from webob import Response
 
 import keystone.logic.types.fault as fault
 
@@ -96,6 +95,7 @@ def get_normalized_request_content(model, req):
 def send_error(code, req, result):
     content = None
 
+    from webob import Response
     resp = Response()
     resp.headers['content-type'] = None
     resp.status = code
@@ -117,6 +117,7 @@ def send_error(code, req, result):
 def send_result(code, req, result=None):
     content = None
 
+    from webob import Response
     resp = Response()
     resp.headers['content-type'] = None
     resp.status = code
@@ -137,6 +138,7 @@ def send_result(code, req, result=None):
 
 
 def send_legacy_result(code, headers):
+    from webob import Response
     resp = Response()
     if 'content-type' not in headers:
         headers['content-type'] = "text/plain"